@@ -0,0 +1,290 @@
+"""
+Load test of the API endpoints: throughput and p50/p95/p99 latency per endpoint, compared with a baseline.
+
+Every query endpoint of routers/ (plus the health checks) is called with parameters sampled from the
+synthetic LDBC-shaped dataset (benchmarks.ldbc_synthetic), by --concurrency concurrent clients, after
+a few warm-up requests. The query cache would turn the run into a cache benchmark, so the API started
+by --start-server runs with QUERY_CACHE_ENABLED=false.
+
+- --seed generates the dataset (unless --data-dir already holds one) and loads it into the stand-in
+  databases, like benchmarks.bench_ingestion (same connection options and scratch databases).
+- --start-server starts the API (uvicorn) on those databases; otherwise --base-url must point to an API
+  already connected to them.
+- The report is written to benchmarks/results/. If the baseline (--baseline) exists, every endpoint
+  is compared with it and the script exits with status 1 on a regression (p95 latency or throughput
+  worse than --tolerance, or new server errors). --update-baseline replaces the baseline with this run.
+  Baselines are only comparable on the same machine, scale factor and concurrency.
+
+Usage (from the project root, with the docker-compose databases reachable on localhost):
+    python -m benchmarks.bench_endpoints --seed --clean-neo4j --start-server --update-baseline
+    python -m benchmarks.bench_endpoints --start-server
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.bench_ingestion import (
+    STAGES, add_database_arguments, configure_environment, prepare_databases, run_stages
+)
+
+
+DEFAULT_BASELINE = os.path.join("benchmarks", "baselines", "endpoints.json")
+
+
+def _person_email(rng, values):
+    return rng.choice(values["emails"])
+
+
+# name -> function(rng, sampled values) returning (path, query parameters)
+ENDPOINTS = {
+    "mongo_health": lambda rng, values: ("/mongo/health", {}),
+    "postgres_health": lambda rng, values: ("/postgres/health", {}),
+    "neo4j_health": lambda rng, values: ("/neo4j/health", {}),
+    "posts_by_email": lambda rng, values: (f"/by-email/{_person_email(rng, values)}", {}),
+    "forums_by_email": lambda rng, values: (f"/forumsEmail/{_person_email(rng, values)}", {}),
+    "find_person_by_email": lambda rng, values: (f"/find-person/by-email/{_person_email(rng, values)}", {}),
+    "groups_by_company": lambda rng, values: (
+        f"/groups/by-company/{rng.choice(values['companies'])}/year/{rng.randint(2000, 2012)}", {}),
+    "second_degree_commenters": lambda rng, values: (
+        f"/second_degree_commenters_on_liked_posts/{_person_email(rng, values)}", {}),
+    "cities_by_active_users": lambda rng, values: ("/find-cities/by-activeuser",
+                                                   {"min_active_people": rng.randint(1, 5)}),
+    "tags_by_city_interest": lambda rng, values: (
+        f"/tags/most-used-by-city-interest/{_person_email(rng, values)}", {}),
+    "common_interests": lambda rng, values: (
+        f"/common_interests_among_active_people/{rng.choice(values['organisations'])}", {}),
+    "forums_by_tagclass": lambda rng, values: (f"/find-forum/by-tagclass/{rng.choice(values['tag_classes'])}",
+                                               {"min_members": rng.randint(1, 3)}),
+}
+
+
+def sample_values(data_dir, samples, seed):
+    """Person emails, company, organisation and tag class names sampled from the dataset"""
+    from db.initialize_db.dataset_manifest import part_files
+    from db.initialize_db.ldbc_csv import read_batches
+
+    def column(entity, section, name, where=None):
+        values = []
+        for path in part_files(entity, os.path.join(data_dir, section), [name]):
+            for batch in read_batches(path, columns=[name] + ([where[0]] if where else [])):
+                rows = batch.to_pylist()
+                values.extend(row[name] for row in rows if where is None or row[where[0]] == where[1])
+        return values
+
+    rng = random.Random(seed)
+    pools = {
+        "emails": [emails[0] for emails in column("Person", "dynamic", "email") if emails],
+        "companies": column("Organisation", "static", "name", ("type", "Company")),
+        "organisations": column("Organisation", "static", "name"),
+        "tag_classes": column("TagClass", "static", "name"),
+    }
+    return {name: rng.sample(pool, min(samples, len(pool))) for name, pool in pools.items()}
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+async def drive_endpoint(client, name, values, requests, concurrency, warmup, seed):
+    """Sends `requests` requests to an endpoint from `concurrency` workers; returns its statistics"""
+    rng = random.Random(f"{seed}:{name}")
+    calls = [ENDPOINTS[name](rng, values) for _ in range(warmup + requests)]
+    for path, params in calls[:warmup]:
+        try:
+            await client.get(path, params=params)
+        except httpx.HTTPError:
+            pass
+
+    pending = iter(calls[warmup:])
+    latencies, status_codes, transport_errors = [], {}, 0
+
+    async def worker():
+        nonlocal transport_errors
+        for path, params in pending:
+            start = time.perf_counter()
+            try:
+                response = await client.get(path, params=params)
+            except httpx.HTTPError:
+                transport_errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+            status_codes[response.status_code] = status_codes.get(response.status_code, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    seconds = time.perf_counter() - start
+
+    latencies.sort()
+    milliseconds = lambda value: round(value * 1000, 2) if value is not None else None
+    server_errors = sum(count for code, count in status_codes.items() if code >= 500) + transport_errors
+    return {
+        "requests": requests,
+        "seconds": round(seconds, 3),
+        "throughput_rps": round(len(latencies) / seconds, 2) if seconds else None,
+        "p50_ms": milliseconds(percentile(latencies, 0.50)),
+        "p95_ms": milliseconds(percentile(latencies, 0.95)),
+        "p99_ms": milliseconds(percentile(latencies, 0.99)),
+        "max_ms": milliseconds(latencies[-1] if latencies else None),
+        "status_codes": {str(code): count for code, count in sorted(status_codes.items())},
+        "server_errors": server_errors,
+        "error_rate": round(server_errors / requests, 4) if requests else 0,
+    }
+
+
+async def run_load_test(base_url, endpoints, values, args):
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        results = {}
+        for name in endpoints:
+            results[name] = await drive_endpoint(client, name, values, args.requests, args.concurrency,
+                                                 args.warmup, args.random_seed)
+            row = results[name]
+            print(f"{name:<28}{row['throughput_rps'] or '-':>10}{row['p50_ms'] or '-':>10}"
+                  f"{row['p95_ms'] or '-':>10}{row['p99_ms'] or '-':>10}{row['server_errors']:>8}")
+        return results
+
+
+def compare_with_baseline(results, baseline, tolerance):
+    """Returns the regressions (list of messages) of the endpoints present in both runs"""
+    regressions = []
+    for name, row in results.items():
+        previous = baseline.get("endpoints", {}).get(name)
+        if not previous:
+            continue
+        if previous["p95_ms"] and row["p95_ms"] and row["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {row['p95_ms']} ms, baseline {previous['p95_ms']} ms")
+        if previous["throughput_rps"] and row["throughput_rps"] is not None \
+                and row["throughput_rps"] < previous["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{name}: {row['throughput_rps']} req/s, baseline {previous['throughput_rps']} req/s")
+        if row["server_errors"] > previous["server_errors"]:
+            regressions.append(f"{name}: {row['server_errors']} server errors, baseline {previous['server_errors']}")
+    return regressions
+
+
+def start_server(port, keep_cache):
+    """Starts the API on the stand-in databases (the environment set by configure_environment)"""
+    env = dict(os.environ)
+    if not keep_cache:
+        env["QUERY_CACHE_ENABLED"] = "false"
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+                              env=env)
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"The API exited with status {server.returncode} while starting")
+        try:
+            if httpx.get(f"{base_url}/", timeout=1).status_code == 200:
+                return server, base_url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    server.terminate()
+    raise RuntimeError("The API did not start within 60 seconds")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", default="benchmarks/data", help="Generated here if it holds no dataset.")
+    parser.add_argument("--scale-factor", type=float, default=0.1)
+    parser.add_argument("--parts", type=int, default=3, help="Part files per entity of the generated dataset.")
+    parser.add_argument("--seed", action="store_true", help="Load the dataset into the stand-in databases first.")
+    parser.add_argument("--start-server", action="store_true", help="Start the API on the stand-in databases.")
+    parser.add_argument("--port", type=int, default=8765, help="Port of the API started by --start-server.")
+    parser.add_argument("--keep-cache", action="store_true", help="Leave the query cache of the started API on.")
+    parser.add_argument("--base-url", default="http://localhost:8000", help="API to test without --start-server.")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS), help="Comma-separated subset of the endpoints.")
+    parser.add_argument("--requests", type=int, default=200, help="Measured requests per endpoint.")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent clients.")
+    parser.add_argument("--warmup", type=int, default=10, help="Unmeasured requests per endpoint.")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Request timeout in seconds.")
+    parser.add_argument("--samples", type=int, default=500, help="Distinct parameter values sampled per kind.")
+    parser.add_argument("--random-seed", type=int, default=42)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true", help="Write this run as the new baseline.")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression (0.25 = 25%%).")
+    parser.add_argument("--report", default=None, help="JSON report path (default: benchmarks/results/...).")
+    add_database_arguments(parser, "maadb_bench_endpoints")
+    args = parser.parse_args()
+
+    endpoints = [name for name in args.endpoints.split(",") if name]
+    unknown = set(endpoints) - set(ENDPOINTS)
+    if unknown:
+        parser.error(f"Unknown endpoint(s): {sorted(unknown)}")
+
+    from benchmarks.ldbc_synthetic import generate_dataset
+    if not os.path.isdir(os.path.join(args.data_dir, "dynamic")):
+        print(f"Generating a scale factor {args.scale_factor} dataset in {args.data_dir}...")
+        generate_dataset(args.data_dir, args.scale_factor, args.parts)
+
+    configure_environment(args)
+    if args.seed:
+        prepare_databases(args, STAGES)
+        failed = [row["stage"] for row in run_stages(args.data_dir, STAGES) if row["status"] != "ok"]
+        if failed:
+            sys.exit(f"Seeding failed at stage(s) {failed}")
+
+    values = sample_values(args.data_dir, args.samples, args.random_seed)
+    server = None
+    base_url = args.base_url
+    if args.start_server:
+        server, base_url = start_server(args.port, args.keep_cache)
+    started_at = datetime.datetime.now(datetime.timezone.utc)
+    print(f"{'endpoint':<28}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    try:
+        results = asyncio.run(run_load_test(base_url, endpoints, values, args))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    report = {
+        "started_at": started_at.isoformat(),
+        "scale_factor": args.scale_factor,
+        "base_url": base_url,
+        "settings": {"requests": args.requests, "concurrency": args.concurrency, "warmup": args.warmup,
+                     "query_cache": args.keep_cache if args.start_server else None},
+        "environment": {"python": platform.python_version(), "machine": platform.machine(),
+                        "cpu_count": os.cpu_count()},
+        "endpoints": results,
+    }
+    path = args.report or os.path.join(
+        "benchmarks", "results", f"endpoints-sf{args.scale_factor}-c{args.concurrency}-{started_at:%Y%m%dT%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {path}")
+
+    if args.update_baseline:
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            regressions = compare_with_baseline(results, json.load(f), args.tolerance)
+        if regressions:
+            print("Regressions against the baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"No regression against {args.baseline} (tolerance {args.tolerance:.0%}).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+Benchmark for the MongoDB side of /find-person/by-email (query 3) on a synthetic heavy user.
+
+Compares the legacy access pattern (full documents, one forum lookup per knowing person) with the
+current one (projected documents, forums fetched in one batch; timed through the router helpers
+fetch_posts_and_comments and compose_person_items), reporting round trips and bytes
+received from MongoDB. The synthetic data is written to a scratch database that is dropped at the end.
+
+Usage (from the project root, with a reachable MongoDB):
+    python -m benchmarks.bench_find_person_forums --friends 500 --posts 300 --forums 80
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+
+import bson
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+
+from models.query_3.model import FullResponseItem
+from routers.parametric_queries import (
+    PERSON_PROJECTION, compose_person_items, fetch_posts_and_comments
+)
+
+
+class RoundTripCounter(monitoring.CommandListener):
+    """Counts commands sent to MongoDB and the size of their replies."""
+
+    def __init__(self):
+        self.round_trips = 0
+        self.reply_bytes = 0
+
+    def reset(self):
+        self.round_trips = 0
+        self.reply_bytes = 0
+
+    def started(self, event):
+        if event.command_name in ("find", "getMore", "aggregate"):
+            self.round_trips += 1
+
+    def succeeded(self, event):
+        if event.command_name in ("find", "getMore", "aggregate"):
+            self.reply_bytes += len(bson.encode(event.reply))
+
+    def failed(self, event):
+        pass
+
+
+def _person(person_id, filler):
+    return {
+        "id": person_id, "firstName": f"First{person_id}", "lastName": f"Last{person_id}",
+        "email": [f"user{person_id}@example.com", f"user{person_id}@mail.example"],
+        "creationDate": "2010-01-01T00:00:00.000+00:00", "birthday": "1990-01-01", "gender": "female",
+        "browserUsed": "Firefox", "locationIP": "10.0.0.1", "language": "en;it", "LocationCityId": 1,
+        "speaks": filler, "notes": filler
+    }
+
+
+async def seed(db, friends, posts, forums, comments_per_friend, filler_size):
+    """Writes a target person with many posts, and friends that comment on them."""
+    rng = random.Random(42)
+    filler = "x" * filler_size
+    target_id, first_friend = 1, 2
+    await db.person.insert_many(
+        [_person(target_id, filler)] + [_person(first_friend + i, filler) for i in range(friends)]
+    )
+    await db.forum.insert_many([
+        {"id": 10_000 + i, "title": f"Forum {i}", "creationDate": "2010-01-01T00:00:00.000+00:00",
+         "ModeratorPersonId": target_id, "description": filler}
+        for i in range(forums)
+    ])
+    await db.post.insert_many([
+        {"id": 100_000 + i, "CreatorPersonId": target_id, "ContainerForumId": 10_000 + rng.randrange(forums),
+         "content": f"Post {i} " + filler, "creationDate": "2011-01-01T00:00:00.000+00:00", "length": filler_size,
+         "browserUsed": "Chrome", "locationIP": "10.0.0.2", "language": "en", "LocationCountryId": 1}
+        for i in range(posts)
+    ])
+    comment_id = 1_000_000
+    comments = []
+    for i in range(friends):
+        for _ in range(comments_per_friend):
+            comments.append({
+                "id": comment_id, "CreatorPersonId": first_friend + i, "ParentPostId": 100_000 + rng.randrange(posts),
+                "content": "Nice post " + filler, "creationDate": "2012-01-01T00:00:00.000+00:00",
+                "length": filler_size, "browserUsed": "Safari", "locationIP": "10.0.0.3", "LocationCountryId": 1
+            })
+            comment_id += 1
+    await db.comment.insert_many(comments)
+    await db.post.create_index("CreatorPersonId")
+    await db.comment.create_index("ParentPostId")
+    await db.person.create_index("id")
+    await db.forum.create_index("id")
+    return target_id, list(range(first_friend, first_friend + friends))
+
+
+def _group(target_posts, comments, known_ids):
+    post_map = {post["id"]: post for post in target_posts}
+    commenter_map = {}
+    for comment in comments:
+        commenter_map.setdefault(comment["CreatorPersonId"], []).append(comment)
+    known_ids = [cid for cid in commenter_map if cid in known_ids]
+    forum_ids_by_person = {
+        cid: sorted({post_map[c["ParentPostId"]]["ContainerForumId"] for c in commenter_map[cid]})
+        for cid in known_ids
+    }
+    return post_map, commenter_map, known_ids, forum_ids_by_person
+
+
+def _items(target_person, people_map, forums_by_person, commenter_map, post_map):
+    return [
+        {
+            "target_person": target_person,
+            "knowing_person": people_map[cid],
+            "comments": [
+                {**c, "post": {**post_map[c["ParentPostId"]], "forum_id": post_map[c["ParentPostId"]]["ContainerForumId"]}}
+                for c in commenter_map[cid]
+            ],
+            "forums": forums
+        }
+        for cid, forums in forums_by_person.items() if cid in people_map
+    ]
+
+
+async def legacy_pattern(db, target_id, friend_ids):
+    target_person = await db.person.find_one({"id": target_id})
+    target_posts = await db.post.find({"CreatorPersonId": target_id}).to_list(length=None)
+    comments = await db.comment.find({"ParentPostId": {"$in": [p["id"] for p in target_posts]}}).to_list(length=None)
+    post_map, commenter_map, known_ids, forum_ids_by_person = _group(target_posts, comments, set(friend_ids))
+    people = await db.person.find({"id": {"$in": known_ids}}).to_list(length=None)
+    people_map = {p["id"]: p for p in people}
+    forums_by_person = {}
+    for cid in known_ids:
+        forums_by_person[cid] = await db.forum.find({"id": {"$in": forum_ids_by_person[cid]}}).to_list(length=None)
+    return _items(target_person, people_map, forums_by_person, commenter_map, post_map)
+
+
+async def current_pattern(db, target_id, friend_ids):
+    """The MongoDB side of the router, through its own helpers (the Neo4j friend lookup is given)."""
+    target_person = await db.person.find_one({"id": target_id}, PERSON_PROJECTION)
+    target_posts, comments = await fetch_posts_and_comments(db, target_id)
+    post_map, commenter_map, known_ids, _ = _group(target_posts, comments, set(friend_ids))
+    known_comments = {cid: commenter_map[cid] for cid in known_ids}
+    return await compose_person_items(db, target_person, known_comments, post_map)
+
+
+async def measure(name, pattern, db, counter, target_id, friend_ids):
+    counter.reset()
+    start = time.perf_counter()
+    items = await pattern(db, target_id, friend_ids)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    response_bytes = len(json.dumps([FullResponseItem(**item).model_dump(mode="json") for item in items]))
+    return {
+        "pattern": name,
+        "round_trips": counter.round_trips,
+        "mongo_reply_bytes": counter.reply_bytes,
+        "response_bytes": response_bytes,
+        "items": len(items),
+        "elapsed_ms": round(elapsed_ms, 1)
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongodb-uri", default=os.getenv("MONGODB_URI", "mongodb://localhost:27017"))
+    parser.add_argument("--database", default="maadb_bench_query3")
+    parser.add_argument("--friends", type=int, default=500)
+    parser.add_argument("--posts", type=int, default=300)
+    parser.add_argument("--forums", type=int, default=80)
+    parser.add_argument("--comments-per-friend", type=int, default=5)
+    parser.add_argument("--filler-size", type=int, default=512, help="Bytes of unused text per document.")
+    args = parser.parse_args()
+
+    counter = RoundTripCounter()
+    client = AsyncIOMotorClient(args.mongodb_uri, event_listeners=[counter])
+    db = client[args.database]
+    await client.drop_database(args.database)
+    try:
+        target_id, friend_ids = await seed(db, args.friends, args.posts, args.forums,
+                                           args.comments_per_friend, args.filler_size)
+        rows = [
+            await measure("before (per-person forum lookups)", legacy_pattern, db, counter, target_id, friend_ids),
+            await measure("after (batched + projected)", current_pattern, db, counter, target_id, friend_ids),
+        ]
+    finally:
+        await client.drop_database(args.database)
+        client.close()
+
+    print(f"{'pattern':<38}{'round trips':>12}{'mongo bytes':>14}{'response bytes':>16}{'items':>8}{'ms':>10}")
+    for row in rows:
+        print(f"{row['pattern']:<38}{row['round_trips']:>12}{row['mongo_reply_bytes']:>14}"
+              f"{row['response_bytes']:>16}{row['items']:>8}{row['elapsed_ms']:>10}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,203 @@
+"""
+Ingestion benchmark: times every init stage on a synthetic LDBC-shaped dataset and writes a JSON report.
+
+The dataset is generated with benchmarks.ldbc_synthetic (unless --data-dir already holds one) and
+loaded into local stand-in databases:
+- MongoDB: a scratch database (--mongodb-uri), dropped before the run;
+- PostgreSQL: a scratch database (--postgres-db), created if missing, whose tables are recreated;
+- Neo4j: the database behind --neo4j-uri. It is emptied before the node stage only with --clean-neo4j,
+  so never point it to an instance holding real data with that flag.
+The loaders read their connection settings from the environment, which is set from the arguments
+before they are imported. Reports are meant to be compared over time (same scale factor and machine).
+
+Usage (from the project root, with the docker-compose databases reachable on localhost):
+    python -m benchmarks.bench_ingestion --scale-factor 0.1 --clean-neo4j
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import time
+import traceback
+
+
+STAGES = ["postgres", "mongodb", "neo4j_nodes", "neo4j_relationships"]
+
+# Dataset entities read by every stage, used for the rows/sec figures (Neo4j: the relationship entities)
+STAGE_ENTITIES = {
+    "postgres": ["static/Place", "static/Organisation", "static/TagClass", "static/Tag"],
+    "mongodb": ["dynamic/Person", "dynamic/Post", "dynamic/Comment", "dynamic/Forum"],
+    "neo4j_nodes": None,
+    "neo4j_relationships": None,
+}
+
+
+def count_rows(data_dir, entity):
+    """Data rows of every part file of an entity (header excluded)"""
+    directory = os.path.join(data_dir, entity)
+    rows = 0
+    for name in os.listdir(directory):
+        if name.startswith("part-") and name.endswith(".csv"):
+            with open(os.path.join(directory, name), "rb") as f:
+                rows += sum(1 for _ in f) - 1
+    return rows
+
+
+def stage_rows(data_dir, stage):
+    entities = STAGE_ENTITIES[stage]
+    if entities is None:
+        from db.initialize_db.init_neo4j_nodes import NODE_SOURCES
+        entities = [f"dynamic/{source[0]}" for source in NODE_SOURCES]
+    return sum(count_rows(data_dir, entity) for entity in entities)
+
+
+def add_database_arguments(parser, scratch_db):
+    """Connection options of the stand-in databases; MongoDB and PostgreSQL use the scratch_db database"""
+    parser.add_argument("--mongodb-uri", default=f"mongodb://localhost:27017/{scratch_db}")
+    parser.add_argument("--postgres-host", default="localhost")
+    parser.add_argument("--postgres-port", type=int, default=5432)
+    parser.add_argument("--postgres-user", default=os.getenv("POSTGRES_USER", "postgres"))
+    parser.add_argument("--postgres-password", default=os.getenv("POSTGRES_PASSWORD", "password"))
+    parser.add_argument("--postgres-db", default=scratch_db)
+    parser.add_argument("--neo4j-uri", default="bolt://localhost:7687")
+    parser.add_argument("--neo4j-user", default=os.getenv("NEO4J_USER", "neo4j"))
+    parser.add_argument("--neo4j-password", default=os.getenv("NEO4J_PASSWORD", "password"))
+    parser.add_argument("--clean-neo4j", action="store_true", help="Delete every Neo4j node before the node stage.")
+
+
+def configure_environment(args):
+    """Points the loaders (which read os.environ at import) to the stand-in databases and dataset"""
+    os.environ.update({
+        "LDBC_DATA_DIR": os.path.abspath(args.data_dir),
+        "NEO4J_IMPORT_DIR": os.path.join(os.path.abspath(args.data_dir), "dynamic"),
+        "MONGODB_URI": args.mongodb_uri,
+        "POSTGRES_DB": args.postgres_db,
+        "POSTGRES_HOST": args.postgres_host,
+        "POSTGRES_PORT": str(args.postgres_port),
+        "POSTGRES_USER": args.postgres_user,
+        "POSTGRES_PASSWORD": args.postgres_password,
+        "NEO4J_URI": args.neo4j_uri,
+        "NEO4J_USER": args.neo4j_user,
+        "NEO4J_PASSWORD": args.neo4j_password,
+    })
+
+
+def prepare_databases(args, stages):
+    import psycopg
+    from neo4j import GraphDatabase
+    from pymongo import MongoClient
+
+    if "mongodb" in stages:
+        client = MongoClient(args.mongodb_uri)
+        client.drop_database(client.get_default_database().name)
+        client.close()
+
+    if "postgres" in stages:
+        with psycopg.connect(host=args.postgres_host, port=args.postgres_port, user=args.postgres_user,
+                             password=args.postgres_password, dbname="postgres", autocommit=True) as conn:
+            exists = conn.execute("SELECT 1 FROM pg_database WHERE datname = %s", (args.postgres_db,)).fetchone()
+            if not exists:
+                conn.execute(f'CREATE DATABASE "{args.postgres_db}"')
+
+    if args.clean_neo4j and "neo4j_nodes" in stages:
+        driver = GraphDatabase.driver(args.neo4j_uri, auth=(args.neo4j_user, args.neo4j_password))
+        with driver.session() as session:
+            session.run("MATCH (n) CALL (n) { DETACH DELETE n } IN TRANSACTIONS OF 10000 ROWS").consume()
+        driver.close()
+
+
+def stage_functions():
+    # Imported here: the loaders read their settings from the environment at import time
+    from db.initialize_db import init_postgres, init_neo4j_nodes, init_neo4j_relationships
+    from db.initialize_db.init_mongodb import load_mongodb
+
+    return {
+        "postgres": init_postgres.main,
+        "mongodb": lambda: load_mongodb(max_workers=min(32, (os.cpu_count() or 4) * 2)),
+        "neo4j_nodes": init_neo4j_nodes.main,
+        "neo4j_relationships": init_neo4j_relationships.main,
+    }
+
+
+def run_stages(data_dir, stages):
+    functions = stage_functions()
+    results = []
+    for stage in stages:
+        rows = stage_rows(data_dir, stage)
+        print(f"=== Benchmark stage {stage} ({rows} rows) ===")
+        start = time.perf_counter()
+        error = None
+        try:
+            functions[stage]()
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            traceback.print_exc()
+        seconds = time.perf_counter() - start
+        results.append({
+            "stage": stage,
+            "status": "failed" if error else "ok",
+            "error": error,
+            "rows": rows,
+            "seconds": round(seconds, 3),
+            "rows_per_sec": round(rows / seconds) if seconds else None
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", default="benchmarks/data", help="Generated here if it holds no dataset.")
+    parser.add_argument("--scale-factor", type=float, default=0.1)
+    parser.add_argument("--parts", type=int, default=3, help="Part files per entity of the generated dataset.")
+    parser.add_argument("--stages", default=",".join(STAGES), help=f"Comma-separated subset of {STAGES}.")
+    parser.add_argument("--report", default=None, help="JSON report path (default: benchmarks/results/...).")
+    add_database_arguments(parser, "maadb_bench_ingestion")
+    args = parser.parse_args()
+
+    stages = [stage for stage in args.stages.split(",") if stage]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"Unknown stage(s): {sorted(unknown)}")
+
+    from benchmarks.ldbc_synthetic import generate_dataset
+    if not os.path.isdir(os.path.join(args.data_dir, "dynamic")):
+        print(f"Generating a scale factor {args.scale_factor} dataset in {args.data_dir}...")
+        generate_dataset(args.data_dir, args.scale_factor, args.parts)
+
+    configure_environment(args)
+    prepare_databases(args, stages)
+    started_at = datetime.datetime.now(datetime.timezone.utc)
+    results = run_stages(args.data_dir, stages)
+
+    from db.initialize_db.dataset_manifest import scan_dataset
+    report = {
+        "started_at": started_at.isoformat(),
+        "scale_factor": args.scale_factor,
+        "dataset": {entity: {"files": info["files"], "bytes": info["bytes"]}
+                    for entity, info in scan_dataset(os.path.abspath(args.data_dir)).items()},
+        "environment": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            **{name: os.getenv(name) for name in ("MONGO_LOAD_ENGINE", "POSTGRES_COPY_FORMAT",
+                                                  "NEO4J_NODE_LOAD_MODE", "NEO4J_REL_LOAD_MODE",
+                                                  "NEO4J_REL_WORKERS")},
+        },
+        "stages": results,
+    }
+    path = args.report or os.path.join(
+        "benchmarks", "results", f"ingestion-sf{args.scale_factor}-{started_at:%Y%m%dT%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{'stage':<22}{'status':>8}{'rows':>12}{'seconds':>10}{'rows/sec':>12}")
+    for row in results:
+        print(f"{row['stage']:<22}{row['status']:>8}{row['rows']:>12}{row['seconds']:>10}{row['rows_per_sec'] or '-':>12}")
+    print(f"Report written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""
+Generator of a synthetic, LDBC SNB-shaped dataset for the ingestion and API benchmarks.
+
+Writes pipe-separated part files with the layout and column schemas of LDBC SNB Datagen Spark
+(data/static/<Entity>/part-*.csv and data/dynamic/<Entity>/part-*.csv), so the init scripts load it
+through dataset_manifest as they load the real data. Sizes follow the scale factor (persons =
+10000 x scale factor, the other entities proportionally); the static part has the sizes of the real
+dataset whatever the scale factor. Values are random but reproducible for a given seed, and every
+foreign key points to an existing entity.
+
+Usage (from the project root):
+    python -m benchmarks.ldbc_synthetic --output benchmarks/data --scale-factor 0.1
+"""
+import argparse
+import os
+import uuid
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pv
+
+
+PERSONS_PER_SCALE_FACTOR = 10_000
+
+# Rows per person (dynamic entities and relationships)
+DYNAMIC_RATIOS = {
+    "Forum": 1,
+    "Post": 10,
+    "Comment": 20,
+    "Person_knows_Person": 10,
+    "Person_likes_Post": 10,
+    "Person_likes_Comment": 10,
+    "Person_hasInterest_Tag": 3,
+    "Forum_hasMember_Person": 10,
+    "Person_studyAt_University": 0.8,
+    "Person_workAt_Company": 1.5,
+}
+
+# Static sizes of the real dataset
+PLACES = {"Continent": 6, "Country": 111, "City": 1343}
+ORGANISATIONS = {"University": 6380, "Company": 1575}
+TAG_CLASSES = 71
+TAGS = 16_080
+
+FIRST_ID = {"Person": 1_000, "Forum": 1_000_000, "Post": 10_000_000, "Comment": 100_000_000}
+
+BROWSERS = ["Firefox", "Chrome", "Safari", "Internet Explorer", "Opera"]
+LANGUAGES = ["en", "it", "de", "fr", "es", "zh"]
+
+
+class Generator:
+    """Writes the dataset of one scale factor; ids and foreign keys are shared between the entities."""
+
+    def __init__(self, output_dir, scale_factor, parts=3, seed=42):
+        self.output_dir = output_dir
+        self.parts = parts
+        self.rng = np.random.default_rng(seed)
+        self.persons = max(10, int(PERSONS_PER_SCALE_FACTOR * scale_factor))
+        self.rows = {entity: max(1, int(self.persons * ratio)) for entity, ratio in DYNAMIC_RATIOS.items()}
+        self.rows_written = {}
+
+    # --- helpers ---
+    def _ids(self, entity, count):
+        return np.arange(FIRST_ID[entity], FIRST_ID[entity] + count, dtype=np.int64)
+
+    def _pick(self, values, count):
+        return values[self.rng.integers(0, len(values), count)]
+
+    def _dates(self, count, start_year=2010, years=3):
+        seconds = self.rng.integers(0, years * 365 * 86400, count)
+        dates = np.datetime64(f"{start_year}-01-01T00:00:00") + seconds.astype("timedelta64[s]")
+        return np.char.add(np.datetime_as_string(dates, unit="ms"), "+00:00")
+
+    def _names(self, prefix, ids):
+        return np.char.add(prefix, ids.astype(str))
+
+    def _write(self, section, entity, columns):
+        """Writes a table as `parts` pipe-separated part files, unquoted like the LDBC files"""
+        table = pa.table(columns)
+        directory = os.path.join(self.output_dir, section, entity)
+        os.makedirs(directory, exist_ok=True)
+        run_id = uuid.uuid4()
+        bounds = np.linspace(0, table.num_rows, self.parts + 1, dtype=int)
+        for part, (start, end) in enumerate(zip(bounds[:-1], bounds[1:])):
+            path = os.path.join(directory, f"part-{part:05d}-{run_id}-c000.csv")
+            # Arrow quotes the header even with quoting_style="none", so it is written here
+            with open(path, "wb") as f:
+                f.write(("|".join(table.column_names) + "\n").encode("utf-8"))
+                pv.write_csv(table.slice(start, end - start), f,
+                             pv.WriteOptions(include_header=False, delimiter="|", quoting_style="none"))
+        self.rows_written[f"{section}/{entity}"] = table.num_rows
+
+    def _relationship(self, entity, count, from_name, from_ids, to_name, to_ids, extra=None):
+        """Random distinct (from, to) pairs"""
+        pairs = np.unique(np.column_stack([self._pick(from_ids, count), self._pick(to_ids, count)]), axis=0)
+        self.rng.shuffle(pairs)
+        columns = {"creationDate": self._dates(len(pairs)), from_name: pairs[:, 0], to_name: pairs[:, 1]}
+        for name, make in (extra or {}).items():
+            columns[name] = make(len(pairs))
+        self._write("dynamic", entity, columns)
+
+    # --- static ---
+    def static(self):
+        place_ids, place_types, parents = [], [], []
+        next_id = 0
+        for place_type, count in PLACES.items():
+            ids = np.arange(next_id, next_id + count)
+            place_ids.append(ids)
+            place_types.append(np.full(count, place_type.lower()))
+            parents.append(np.full(count, None) if not parents else self._pick(place_ids[-2], count))
+            next_id += count
+        self.place_ids = np.concatenate(place_ids)
+        self.city_ids = place_ids[-1]
+        self.country_ids = place_ids[1]
+        self._write("static", "Place", {
+            "id": self.place_ids,
+            "name": self._names("Place_", self.place_ids),
+            "url": self._names("http://dbpedia.org/resource/Place_", self.place_ids),
+            "type": np.concatenate(place_types),
+            "PartOfPlaceId": pa.array(np.concatenate(parents).tolist(), pa.int64()),
+        })
+
+        self.university_ids = np.arange(ORGANISATIONS["University"])
+        self.company_ids = np.arange(ORGANISATIONS["University"], sum(ORGANISATIONS.values()))
+        organisation_ids = np.concatenate([self.university_ids, self.company_ids])
+        self._write("static", "Organisation", {
+            "id": organisation_ids,
+            "type": np.repeat(["University", "Company"], list(ORGANISATIONS.values())),
+            # A few organisations share a name, like the real data (query 8 looks them up by name)
+            "name": self._names("Organisation_", organisation_ids // 2 * 2),
+            "url": self._names("http://dbpedia.org/resource/Organisation_", organisation_ids),
+            "LocationPlaceId": np.concatenate([self._pick(self.city_ids, len(self.university_ids)),
+                                               self._pick(self.country_ids, len(self.company_ids))]),
+        })
+
+        tag_class_ids = np.arange(TAG_CLASSES)
+        self._write("static", "TagClass", {
+            "id": tag_class_ids,
+            "name": np.concatenate([["Thing"], self._names("TagClass_", tag_class_ids[1:])]),
+            "url": self._names("http://dbpedia.org/ontology/TagClass_", tag_class_ids),
+            "SubclassOfTagClassId": pa.array([None] + (tag_class_ids[1:] // 2).tolist(), pa.int64()),
+        })
+
+        self.tag_ids = np.arange(TAGS)
+        self._write("static", "Tag", {
+            "id": self.tag_ids,
+            "name": self._names("Tag_", self.tag_ids),
+            "url": self._names("http://dbpedia.org/resource/Tag_", self.tag_ids),
+            "TypeTagClassId": self._pick(tag_class_ids, TAGS),
+        })
+
+    # --- dynamic ---
+    def dynamic(self):
+        rows = self.rows
+        person_ids = self._ids("Person", self.persons)
+        self._write("dynamic", "Person", {
+            "creationDate": self._dates(self.persons),
+            "id": person_ids,
+            "firstName": self._names("First", person_ids),
+            "lastName": self._names("Last", person_ids),
+            "gender": self._pick(np.array(["male", "female"]), self.persons),
+            "birthday": np.datetime_as_string(np.datetime64("1980-01-01")
+                                              + self.rng.integers(0, 7300, self.persons).astype("timedelta64[D]")),
+            "locationIP": np.char.add(np.char.add("10.0.", (person_ids // 256 % 256).astype(str)),
+                                      np.char.add(".", (person_ids % 256).astype(str))),
+            "browserUsed": self._pick(np.array(BROWSERS), self.persons),
+            "LocationCityId": self._pick(self.city_ids, self.persons),
+            "language": self._pick(np.array(["en", "en;it", "de;en", "zh"]), self.persons),
+            "email": np.char.add(np.char.add("user", person_ids.astype(str)),
+                                 np.char.add("@example.com;", np.char.add(person_ids.astype(str), "@mail.example"))),
+        })
+
+        forum_ids = self._ids("Forum", rows["Forum"])
+        self._write("dynamic", "Forum", {
+            "creationDate": self._dates(len(forum_ids)),
+            "id": forum_ids,
+            "title": self._names("Forum ", forum_ids),
+            "ModeratorPersonId": self._pick(person_ids, len(forum_ids)),
+        })
+
+        post_ids = self._ids("Post", rows["Post"])
+        lengths = self.rng.integers(0, 200, len(post_ids))
+        self._write("dynamic", "Post", {
+            "creationDate": self._dates(len(post_ids), start_year=2011),
+            "id": post_ids,
+            "imageFile": pa.nulls(len(post_ids), pa.string()),
+            "locationIP": np.full(len(post_ids), "10.0.0.2"),
+            "browserUsed": self._pick(np.array(BROWSERS), len(post_ids)),
+            "language": self._pick(np.array(LANGUAGES), len(post_ids)),
+            "content": self._names("Post content ", post_ids),
+            "length": lengths,
+            "CreatorPersonId": self._pick(person_ids, len(post_ids)),
+            "ContainerForumId": self._pick(forum_ids, len(post_ids)),
+            "LocationCountryId": self._pick(self.country_ids, len(post_ids)),
+        })
+
+        comment_ids = self._ids("Comment", rows["Comment"])
+        self._write("dynamic", "Comment", {
+            "creationDate": self._dates(len(comment_ids), start_year=2012),
+            "id": comment_ids,
+            "locationIP": np.full(len(comment_ids), "10.0.0.3"),
+            "browserUsed": self._pick(np.array(BROWSERS), len(comment_ids)),
+            "content": self._names("Comment content ", comment_ids),
+            "length": self.rng.integers(0, 100, len(comment_ids)),
+            "CreatorPersonId": self._pick(person_ids, len(comment_ids)),
+            "LocationCountryId": self._pick(self.country_ids, len(comment_ids)),
+            "ParentPostId": self._pick(post_ids, len(comment_ids)),
+            "ParentCommentId": pa.nulls(len(comment_ids), pa.int64()),
+        })
+
+        self._relationship("Person_knows_Person", rows["Person_knows_Person"],
+                           "Person1Id", person_ids, "Person2Id", person_ids)
+        self._relationship("Person_likes_Post", rows["Person_likes_Post"], "PersonId", person_ids, "PostId", post_ids)
+        self._relationship("Person_likes_Comment", rows["Person_likes_Comment"],
+                           "PersonId", person_ids, "CommentId", comment_ids)
+        self._relationship("Person_hasInterest_Tag", rows["Person_hasInterest_Tag"],
+                           "PersonId", person_ids, "TagId", self.tag_ids)
+        self._relationship("Forum_hasMember_Person", rows["Forum_hasMember_Person"],
+                           "ForumId", forum_ids, "PersonId", person_ids)
+        self._relationship("Forum_hasTag_Tag", len(forum_ids) * 2, "ForumId", forum_ids, "TagId", self.tag_ids)
+        self._relationship("Post_hasTag_Tag", len(post_ids), "PostId", post_ids, "TagId", self.tag_ids)
+        self._relationship("Comment_hasTag_Tag", len(comment_ids) // 2, "CommentId", comment_ids, "TagId", self.tag_ids)
+        self._relationship("Person_studyAt_University", rows["Person_studyAt_University"],
+                           "PersonId", person_ids, "UniversityId", self.university_ids,
+                           {"classYear": lambda n: self.rng.integers(2000, 2013, n)})
+        self._relationship("Person_workAt_Company", rows["Person_workAt_Company"],
+                           "PersonId", person_ids, "CompanyId", self.company_ids,
+                           {"workFrom": lambda n: self.rng.integers(2000, 2013, n)})
+
+
+def generate_dataset(output_dir, scale_factor, parts=3, seed=42):
+    """Writes the static and dynamic sections under output_dir; returns the rows written per entity"""
+    generator = Generator(output_dir, scale_factor, parts, seed)
+    generator.static()
+    generator.dynamic()
+    return generator.rows_written
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default="benchmarks/data", help="Directory that gets static/ and dynamic/.")
+    parser.add_argument("--scale-factor", type=float, default=0.1)
+    parser.add_argument("--parts", type=int, default=3, help="Part files per entity.")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rows = generate_dataset(args.output, args.scale_factor, args.parts, args.seed)
+    for entity, count in rows.items():
+        print(f"{entity:<40}{count:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,16 +9,56 @@ class Settings(BaseSettings):
     postgres_password: str = Field("password", env="POSTGRES_PASSWORD")
     postgres_host: str = Field("localhost", env="POSTGRES_HOST")
     postgres_port: int = Field(5432, env="POSTGRES_PORT")
+    postgres_pool_min_size: int = Field(2, env="POSTGRES_POOL_MIN_SIZE")
+    postgres_pool_max_size: int = Field(20, env="POSTGRES_POOL_MAX_SIZE")
+    postgres_pool_timeout: float = Field(30.0, env="POSTGRES_POOL_TIMEOUT")  # seconds waiting for a connection
+    postgres_pool_max_waiting: int = Field(0, env="POSTGRES_POOL_MAX_WAITING")  # 0: no limit
+    postgres_sync_pool_min_size: int = Field(1, env="POSTGRES_SYNC_POOL_MIN_SIZE")
+    postgres_sync_pool_max_size: int = Field(10, env="POSTGRES_SYNC_POOL_MAX_SIZE")
 
     # MongoDB
     mongodb_uri: str = Field("mongodb://localhost:27017/maadb", env="MONGODB_URI")
     mongo_initdb_root_username: str | None = Field(None, env="MONGO_INITDB_ROOT_USERNAME")
     mongo_initdb_root_password: str | None = Field(None, env="MONGO_INITDB_ROOT_PASSWORD")
+    mongo_max_pool_size: int = Field(100, env="MONGO_MAX_POOL_SIZE")
+    mongo_min_pool_size: int = Field(0, env="MONGO_MIN_POOL_SIZE")
+    mongo_wait_queue_timeout_ms: int = Field(30000, env="MONGO_WAIT_QUEUE_TIMEOUT_MS")
+    mongo_ensure_indexes_on_startup: bool = Field(True, env="MONGO_ENSURE_INDEXES_ON_STARTUP")
 
     # Neo4j
     neo4j_uri: str = Field("bolt://localhost:7687", env="NEO4J_URI")
     neo4j_user: str = Field("neo4j", env="NEO4J_USER")
     neo4j_password: str = Field("password", env="NEO4J_PASSWORD")
+    neo4j_max_connection_pool_size: int = Field(100, env="NEO4J_MAX_CONNECTION_POOL_SIZE")
+    neo4j_connection_acquisition_timeout: float = Field(60.0, env="NEO4J_CONNECTION_ACQUISITION_TIMEOUT")
+
+    # Query response cache
+    query_cache_enabled: bool = Field(True, env="QUERY_CACHE_ENABLED")
+    query_cache_backend: str = Field("memory", env="QUERY_CACHE_BACKEND")  # "memory" or "redis"
+    query_cache_max_entries: int = Field(1024, env="QUERY_CACHE_MAX_ENTRIES")
+    query_cache_ttl_seconds: int = Field(3600, env="QUERY_CACHE_TTL_SECONDS")
+    query_cache_redis_url: str = Field("redis://localhost:6379/0", env="QUERY_CACHE_REDIS_URL")
+    query_cache_generation_check_seconds: float = Field(5.0, env="QUERY_CACHE_GENERATION_CHECK_SECONDS")
+
+    # Admin operations that rewrite or drop data (rebuilds, cache flush) or read the slow query log:
+    # disabled unless a token is set, then the requests must send it in the X-Admin-Token header
+    admin_token: str | None = Field(None, env="ADMIN_TOKEN")
+
+    # Startup: connect every client and prime the Neo4j query plans before serving (utils/prewarm.py)
+    prewarm_on_startup: bool = Field(True, env="PREWARM_ON_STARTUP")
+
+    # Tracing of the database calls (GET /metrics, optional Server-Timing response header)
+    tracing_enabled: bool = Field(True, env="TRACING_ENABLED")
+    server_timing_enabled: bool = Field(False, env="SERVER_TIMING_ENABLED")
+
+    # Slow query log (GET /admin/slow-queries)
+    slow_query_log_enabled: bool = Field(True, env="SLOW_QUERY_LOG_ENABLED")
+    slow_query_threshold_ms: float = Field(500.0, env="SLOW_QUERY_THRESHOLD_MS")
+    slow_query_log_size: int = Field(100, env="SLOW_QUERY_LOG_SIZE")
+    slow_query_capture_plans: bool = Field(True, env="SLOW_QUERY_CAPTURE_PLANS")
+    slow_query_max_captures: int = Field(2, env="SLOW_QUERY_MAX_CAPTURES")
+    # Parameter values (emails, names, ids) are hashed in the log unless enabled
+    slow_query_record_parameters: bool = Field(False, env="SLOW_QUERY_RECORD_PARAMETERS")
 
     model_config = SettingsConfigDict(env_file=".env")
 
@@ -0,0 +1,29 @@
+# Number of members of every forum, stored on the Forum node, served by /forumsEmail (query 2).
+# The counts are a snapshot, not kept up to date on every membership change: the API never writes
+# MEMBER_OF, so there is no write path to hook, and the counts are recomputed only when the
+# relationships are loaded (init_neo4j_relationships) and on demand
+# (POST /admin/neo4j/forum-member-counts/refresh). Anything that writes MEMBER_OF outside those paths
+# must be followed by a refresh: a stale count is served as is until then. Only forums without the
+# property at all (e.g. created after the last refresh) fall back to counting MEMBER_OF.
+MEMBER_COUNT_PROPERTY = "memberCount"
+
+MEMBER_COUNT_EXPRESSION = f"coalesce(f.{MEMBER_COUNT_PROPERTY}, COUNT {{ (f)<-[:MEMBER_OF]-(:Person) }})"
+
+
+# Batched (CALL IN TRANSACTIONS): must run in an auto-commit transaction, i.e. session.run
+REFRESH_MEMBER_COUNTS_QUERY = f"""
+MATCH (f:Forum)
+CALL (f) {{
+    SET f.{MEMBER_COUNT_PROPERTY} = COUNT {{ (f)<-[:MEMBER_OF]-(:Person) }}
+}} IN TRANSACTIONS OF 1000 ROWS
+"""
+
+
+def refresh_forum_member_counts(driver):
+    """
+    Recomputes memberCount on every Forum node (sync driver).
+    Run after (re)loading the MEMBER_OF relationships.
+    """
+    with driver.session() as session:
+        session.run(REFRESH_MEMBER_COUNTS_QUERY).consume()
+
@@ -0,0 +1,77 @@
+"""
+Discovery of the LDBC SNB CSV part files under data/dynamic and data/static.
+
+Spark writes every entity as a directory of part-*.csv files whose number and names change with the
+scale factor and the run, so the loaders take every part file found here instead of hard-coded lists.
+All the part files of an entity must share the same header, holding the columns the loader reads.
+"""
+import glob
+import os
+
+
+LDBC_DATA_DIR = os.getenv("LDBC_DATA_DIR", "/app/data")
+DYNAMIC_DIR = os.path.join(LDBC_DATA_DIR, "dynamic")
+STATIC_DIR = os.path.join(LDBC_DATA_DIR, "static")
+
+PART_FILE_PATTERN = "part-*.csv"
+
+
+def read_header(path):
+    with open(path, "rb") as f:
+        return f.readline().decode("utf-8").strip().split("|")
+
+
+def part_files(entity, directory=DYNAMIC_DIR, required_columns=()):
+    """
+    Returns every part file of an entity (e.g. "Post" under data/dynamic), sorted by name.
+    Raises FileNotFoundError if there is none, ValueError if the headers differ or lack a required column.
+    """
+    paths = sorted(glob.glob(os.path.join(directory, entity, PART_FILE_PATTERN)))
+    if not paths:
+        raise FileNotFoundError(f"No {PART_FILE_PATTERN} file found for {entity} in {directory}")
+
+    header = read_header(paths[0])
+    missing = [column for column in required_columns if column not in header]
+    if missing:
+        raise ValueError(f"{paths[0]}: missing column(s) {missing} (header: {header})")
+    for path in paths[1:]:
+        if read_header(path) != header:
+            raise ValueError(f"{path}: header {read_header(path)} differs from {paths[0]} ({header})")
+    return paths
+
+
+def balance_by_size(paths, workers):
+    """
+    Splits files into at most `workers` groups of similar total size: largest file first, each into
+    the group with the smallest total so far. Empty groups are dropped.
+    """
+    groups = [[] for _ in range(max(1, workers))]
+    totals = [0] * len(groups)
+    for path in sorted(paths, key=os.path.getsize, reverse=True):
+        smallest = totals.index(min(totals))
+        groups[smallest].append(path)
+        totals[smallest] += os.path.getsize(path)
+    return [group for group in groups if group]
+
+
+def scan_dataset(data_dir=LDBC_DATA_DIR):
+    """Returns {"dynamic/Post": {"files": n, "bytes": total size, "header": [...]}, ...} for every entity found"""
+    manifest = {}
+    for section in ("static", "dynamic"):
+        section_dir = os.path.join(data_dir, section)
+        if not os.path.isdir(section_dir):
+            continue
+        for entity in sorted(os.listdir(section_dir)):
+            paths = sorted(glob.glob(os.path.join(section_dir, entity, PART_FILE_PATTERN)))
+            if paths:
+                manifest[f"{section}/{entity}"] = {
+                    "files": len(paths),
+                    "bytes": sum(os.path.getsize(path) for path in paths),
+                    "header": read_header(paths[0])
+                }
+    return manifest
+
+
+if __name__ == "__main__":
+    for entity, info in scan_dataset().items():
+        print(f"{entity:<40} files={info['files']:<4} MB={info['bytes'] / 2 ** 20:<10.1f} {'|'.join(info['header'])}")
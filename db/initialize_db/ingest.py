@@ -0,0 +1,82 @@
+"""
+Resumable ingestion of the three stores.
+
+PostgreSQL, MongoDB and Neo4j have no dependency on each other, so their stages run concurrently;
+within Neo4j, relationships need the nodes, so the two steps run in order. Every step records the
+units it commits in the ingestion manifest (see ingestion_manifest.py): running this script again
+after a failure resumes every step from its last committed unit instead of starting over.
+Set INGEST_RESET=true to forget the checkpoints and load everything again.
+"""
+import os
+import sys
+import time
+import concurrent.futures
+from dotenv import load_dotenv
+
+from db.initialize_db import init_postgres, init_neo4j_nodes, init_neo4j_relationships
+from db.initialize_db.init_mongodb import get_mongo_client, load_mongodb
+from db.initialize_db.ingestion_manifest import Checkpoint
+
+load_dotenv()
+
+INGEST_RESET = os.getenv("INGEST_RESET", "false").lower() == "true"
+
+
+def _load_mongodb(checkpoint):
+    load_mongodb(max_workers=min(32, (os.cpu_count() or 4) * 2), checkpoint=checkpoint)
+
+
+# Independent pipelines, each a list of (step name, loader taking a Checkpoint) run in order
+PIPELINES = {
+    "postgres": [("postgres", init_postgres.main)],
+    "mongodb": [("mongodb", _load_mongodb)],
+    "neo4j": [("neo4j_nodes", init_neo4j_nodes.main),
+              ("neo4j_relationships", init_neo4j_relationships.main)],
+}
+
+
+def run_pipeline(manifest_db, steps, reset=False):
+    """Runs the steps of a pipeline in order; a failed step stops the pipeline. Returns the step timings."""
+    timings = {}
+    for stage, loader in steps:
+        checkpoint = Checkpoint(manifest_db, stage)
+        if reset:
+            checkpoint.reset()
+        print(f"Ingestion step {stage} starting ({checkpoint.completed()} unit(s) already committed)...")
+        start_time = time.time()
+        loader(checkpoint)
+        timings[stage] = round(time.time() - start_time, 2)
+        print(f"Ingestion step {stage} finished in {timings[stage]} seconds.")
+    return timings
+
+
+def main(pipelines=PIPELINES, reset=INGEST_RESET):
+    """Runs every pipeline concurrently. Returns True if all of them completed."""
+    client = get_mongo_client()
+    try:
+        manifest_db = client.get_database()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(pipelines)) as executor:
+            future_to_pipeline = {
+                executor.submit(run_pipeline, manifest_db, steps, reset): name
+                for name, steps in pipelines.items()
+            }
+            results = {}
+            for future in concurrent.futures.as_completed(future_to_pipeline):
+                name = future_to_pipeline[future]
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    results[name] = e
+                    print(f"Ingestion pipeline {name} failed: {e}")
+    finally:
+        client.close()
+
+    print("Ingestion summary:")
+    for name, result in results.items():
+        status = f"FAILED ({result}), rerun to resume" if isinstance(result, Exception) else f"done {result}"
+        print(f"  {name:<10} {status}")
+    return not any(isinstance(result, Exception) for result in results.values())
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,47 @@
+"""
+Checkpoints of the ingestion pipeline (db/initialize_db/ingest.py), stored in a MongoDB collection.
+
+A unit is a piece of work that is either committed atomically or safe to redo: a byte range of a
+MongoDB CSV file (documents already loaded are skipped by the unique id index), a PostgreSQL table
+(one COPY transaction), a Neo4j node label or relationship source (nodes already present are skipped,
+relationships are MERGEd once some exist). A unit is recorded only once it is committed, so resuming
+redoes at most the units that were in flight when the run stopped.
+"""
+import threading
+from datetime import datetime, timezone
+
+
+MANIFEST_COLLECTION = "ingestion_manifest"
+
+
+class Checkpoint:
+    """Completed units of one ingestion stage. Safe to share between the loader threads."""
+
+    def __init__(self, db, stage):
+        self.collection = db[MANIFEST_COLLECTION]
+        self.stage = stage
+        self._lock = threading.Lock()
+        self._done = {doc["unit"] for doc in self.collection.find({"stage": stage}, {"unit": 1})}
+
+    def is_done(self, unit):
+        with self._lock:
+            return unit in self._done
+
+    def mark_done(self, unit, **stats):
+        self.collection.update_one(
+            {"_id": f"{self.stage}:{unit}"},
+            {"$set": {"stage": self.stage, "unit": unit, "finishedAt": datetime.now(timezone.utc), **stats}},
+            upsert=True
+        )
+        with self._lock:
+            self._done.add(unit)
+
+    def completed(self):
+        with self._lock:
+            return len(self._done)
+
+    def reset(self):
+        """Forgets every unit of the stage, so the next run starts over"""
+        self.collection.delete_many({"stage": self.stage})
+        with self._lock:
+            self._done.clear()
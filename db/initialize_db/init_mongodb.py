@@ -1,11 +1,18 @@
-from pymongo import MongoClient, InsertOne, ASCENDING
+from pymongo import MongoClient
 import os
-import pandas as pd
 from dotenv import load_dotenv
 import threading
 import concurrent.futures
 import time
-import numpy as np # For np.nan if needed, though pd.NA or pd.isnull covers it
+
+from db.initialize_db.dataset_manifest import DYNAMIC_DIR, part_files, balance_by_size
+from db.initialize_db.ldbc_csv import read_documents
+from db.initialize_db.mongo_bulk_loader import (
+    byte_range_chunks, byte_range_unit, insert_new_documents, load_collection_with_processes, read_byte_range
+)
+from db.mongo_indexes import check_router_queries, ensure_indexes, has_unique_index
+from db.person_activity import PERSON_ACTIVITY_COLLECTION, activity_updates, rebuild_person_activity
+from utils.cache import invalidate_query_cache
 
 # Load environment variables from .env file
 load_dotenv()
@@ -13,6 +20,19 @@ load_dotenv()
 # Global lock for thread-safe printing
 print_lock = threading.Lock()
 
+# "processes": byte-range parallel loader (mongo_bulk_loader).
+# "threads": one thread per file.
+# Both skip the documents already loaded through the unique id index.
+MONGO_LOAD_ENGINE = os.getenv("MONGO_LOAD_ENGINE", "processes")
+
+# Collection: (entity directory under data/dynamic, columns the queries and person_activity rely on)
+COLLECTIONS = {
+    "person": ("Person", ["id", "email", "LocationCityId"]),
+    "post": ("Post", ["id", "CreatorPersonId"]),
+    "comment": ("Comment", ["id", "CreatorPersonId", "ParentPostId"]),
+    "forum": ("Forum", ["id", "title"]),
+}
+
 
 def thread_safe_print(*args, **kwargs):
     """Thread-safe printing function"""
@@ -32,8 +52,14 @@ def get_mongo_client():
     return client
 
 
-def load_csv_to_mongodb(collection_name, csv_path, id_field="id", chunksize=10000, existing_ids=None):
-    """Loads a single CSV file into MongoDB, thread-safe version with data transformations"""
+def load_csv_to_mongodb(collection_name, csv_path, checkpoint=None):
+    """
+    Loads a single CSV file into MongoDB, thread-safe version with data transformations.
+    The file is read one byte range at a time (the ranges of the processes engine); with a checkpoint,
+    ranges already loaded are skipped without being read and every range is recorded once loaded.
+    The person_activity $inc of a chunk is sent after its insert_many and is not atomic with it:
+    load_mongodb rebuilds the store when a load fails or is resumed.
+    """
     client = get_mongo_client()
     db = client.get_database()
     collection = db[collection_name]
@@ -41,213 +67,214 @@ def load_csv_to_mongodb(collection_name, csv_path, id_field="id", chunksize=1000
     thread_safe_print(f"Starting to load {csv_path} into {collection_name}...")
 
     try:
-        # Create a thread-local copy of existing_ids to avoid race conditions
-        local_existing_ids = set(existing_ids) if existing_ids else set()
-
         # Process the CSV file in chunks
         chunk_number = 0
         total_inserted = 0
 
-        for chunk in pd.read_csv(csv_path, sep="|", chunksize=chunksize, keep_default_na=True, na_filter=True):
-            # keep_default_na=True and na_filter=True are defaults, ensuring standard NA values are recognized.
-            chunk_number += 1
-            # Filter out records that already exist
-            chunk = chunk[~chunk[id_field].isin(local_existing_ids)]
-
-            if not chunk.empty:
-                # Apply transformations based on collection name
-                if collection_name == "person":
-                    if 'email' in chunk.columns:
-                        # Convert semicolon-separated email string to an array of strings.
-                        # Handles NaN/empty strings by converting them to an empty list.
-                        chunk['email'] = chunk['email'].apply(
-                            lambda x: x.split(';') if isinstance(x, str) and x.strip() else []
-                        )
-
-                if collection_name == "post":
-                    columns_to_process_as_string_or_none = ['imageFile', 'content', 'language']
-                    for column_name in columns_to_process_as_string_or_none:
-                        if column_name in chunk.columns:
-                            # Step 1: Convert pandas NaN (float type) to None.
-                            chunk[column_name] = chunk[column_name].astype(object).where(pd.notnull(chunk[column_name]), None)
-                            # Step 2: Ensure non-None values are strings.
-                            # Using .loc to avoid SettingWithCopyWarning and ensure modification happens on the chunk itself.
-                            non_null_mask = chunk[column_name].notnull()
-                            chunk.loc[non_null_mask, column_name] = chunk.loc[non_null_mask, column_name].astype(str)
-
-                requests = [InsertOne(row) for row in chunk.to_dict(orient="records")]
-                result = collection.bulk_write(requests)
-                inserted_count = result.inserted_count
-                total_inserted += inserted_count
-                thread_safe_print(
-                    f"Inserted {inserted_count} new documents into {collection_name} from chunk {chunk_number} of {csv_path}.")
-
-                # Update local existing IDs set
-                local_existing_ids.update(chunk[id_field].tolist())
+        for start, end in byte_range_chunks(csv_path):
+            unit = byte_range_unit(collection_name, csv_path, start, end)
+            if checkpoint and checkpoint.is_done(unit):
+                continue
+            range_rows = range_inserted = 0
+
+            # Typing, null normalization and the email split are done by the Arrow reader
+            for records in read_documents(read_byte_range(csv_path, start, end)):
+                chunk_number += 1
+                range_rows += len(records)
+
+                if records:
+                    # Records that already exist are rejected by the unique id index
+                    new_records = insert_new_documents(collection, records)
+                    inserted_count = len(new_records)
+                    range_inserted += inserted_count
+
+                    # Keep the person_activity counters in sync with the inserted documents
+                    activity_requests = activity_updates(collection_name, new_records)
+                    if activity_requests:
+                        db[PERSON_ACTIVITY_COLLECTION].bulk_write(activity_requests, ordered=False)
+                    thread_safe_print(
+                        f"Inserted {inserted_count} new documents into {collection_name} from chunk {chunk_number} of {csv_path}.")
+
+            total_inserted += range_inserted
+            if checkpoint:
+                checkpoint.mark_done(unit, rows=range_rows, inserted=range_inserted)
 
         thread_safe_print(f"Finished loading {csv_path} into {collection_name}. Total inserted: {total_inserted}")
         return csv_path, total_inserted
 
     except Exception as e:
         thread_safe_print(f"Error while processing {csv_path}: {e}")
-        # You might want to log the traceback here for more detailed error info
         import traceback
         thread_safe_print(traceback.format_exc())
-        return csv_path, 0
+        raise
     finally:
         client.close()
 
 
-def get_existing_ids(collection_name, id_field="id"):
-    """Get existing IDs from a collection"""
-    client = get_mongo_client()
-    db = client.get_database()
-    collection = db[collection_name]
+def _load_file_group(collection_name, csv_paths, checkpoint=None):
+    """Loads a group of CSV files one after the other; returns (documents inserted, files failed)"""
+    total_inserted = failed_files = 0
+    for csv_path in csv_paths:
+        try:
+            path, inserted = load_csv_to_mongodb(collection_name, csv_path, checkpoint)
+            total_inserted += inserted
+        except Exception as e:
+            failed_files += 1
+            thread_safe_print(f"CSV {csv_path} generated an exception: {e}")
+    return total_inserted, failed_files
 
-    thread_safe_print(f"Fetching existing IDs for {collection_name}...")
 
-    try:
-        existing_ids = set()
-        cursor = collection.find({}, {id_field: 1})
-
-        count_existing = 0
-        for doc in cursor:
-            existing_ids.add(doc[id_field])
-            count_existing += 1
-
-        thread_safe_print(f"Found {count_existing} existing documents in {collection_name}.")
-        return existing_ids
-
-    finally:
-        client.close()
-
-
-def load_collection_with_threads(collection_name, csv_paths, id_field="id", max_workers=None):
-    """Loads CSV files into a MongoDB collection using thread pool"""
+def load_collection_with_threads(collection_name, csv_paths, max_workers=None, checkpoint=None):
+    """
+    Loads CSV files into a MongoDB collection using thread pool; files are balanced by size across
+    the threads. With a checkpoint (ingestion_manifest.Checkpoint), the byte ranges already loaded
+    are skipped, so an interrupted file resumes from its first range not recorded.
+    """
     thread_safe_print(f"######################################################################")
     thread_safe_print(f"################# STARTING LOAD INTO: {collection_name.upper()} #################")
     thread_safe_print(f"######################################################################")
 
     start_time = time.time()
 
-    # Get existing IDs once to avoid duplicate loading
-    existing_ids = get_existing_ids(collection_name, id_field)
-
-    # Use a thread pool to load files concurrently
-    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-        # Submit tasks for each CSV file
-        future_to_csv = {
-            executor.submit(
-                load_csv_to_mongodb,
-                collection_name,
-                csv_path,
-                id_field,
-                10000,  # chunksize
-                existing_ids
-            ): csv_path for csv_path in csv_paths
-        }
-
-        # Process results as they complete
-        total_inserted = 0
-        for future in concurrent.futures.as_completed(future_to_csv):
-            csv_path = future_to_csv[future]
-            try:
-                path, inserted = future.result()
-                total_inserted += inserted
-            except Exception as e:
-                thread_safe_print(f"CSV {csv_path} generated an exception: {e}")
+    # Use a thread pool to load groups of files of similar total size concurrently
+    groups = balance_by_size(csv_paths, max_workers or min(32, (os.cpu_count() or 1) + 4))
+    total_inserted = 0
+    failed_files = 0
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, len(groups))) as executor:
+        futures = [executor.submit(_load_file_group, collection_name, group, checkpoint) for group in groups]
+        for future in concurrent.futures.as_completed(futures):
+            inserted, failed = future.result()
+            total_inserted += inserted
+            failed_files += failed
 
     end_time = time.time()
     duration = end_time - start_time
+    rows_per_sec = round(total_inserted / duration) if duration else None
 
     thread_safe_print(f"++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++")
     thread_safe_print(f"+++++++ {collection_name.upper()} COLLECTION UPDATED SUCCESSFULLY +++++++")
-    thread_safe_print(f"+++++++ Total inserted: {total_inserted}, Time: {duration:.2f} seconds +++++++")
+    thread_safe_print(f"+++++++ Total inserted: {total_inserted}, Time: {duration:.2f} seconds, "
+                      f"Rows/sec: {rows_per_sec} +++++++")
     thread_safe_print(f"++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++")
+    return {
+        "collection": collection_name,
+        "engine": "threads",
+        "rows": total_inserted,
+        "inserted": total_inserted,
+        "failed_files": failed_files,
+        "seconds": round(duration, 2),
+        "rows_per_sec": rows_per_sec
+    }
+
+
+def load_collection(collection_name, csv_paths, max_workers=None, checkpoint=None):
+    """Loads a collection with the engine selected by MONGO_LOAD_ENGINE"""
+    client = get_mongo_client()
+    try:
+        if not has_unique_index(client.get_database()[collection_name], "id"):
+            thread_safe_print(f"WARNING: {collection_name} has no unique index on id: "
+                              f"documents already loaded will be inserted again.")
+    finally:
+        client.close()
+
+    if MONGO_LOAD_ENGINE == "processes":
+        mongodb_uri = os.getenv("MONGODB_URI", "mongodb://mongodb:27017/maadb")
+        return load_collection_with_processes(collection_name, csv_paths, mongodb_uri,
+                                              max_workers=max_workers or os.cpu_count(), checkpoint=checkpoint)
+    return load_collection_with_threads(collection_name, csv_paths, max_workers=max_workers,
+                                        checkpoint=checkpoint)
 
 
 def create_indexes():
-    """Create indexes for collections"""
+    """Create the indexes declared in db.mongo_indexes (skips the ones that already exist)"""
     thread_safe_print("Creating indexes...")
     client = get_mongo_client()
     db = client.get_database()
 
     try:
-        db.person.create_index([("id", ASCENDING)], name="person_id_index")
-        thread_safe_print("Created index for person collection.")
-
-        db.post.create_index([("id", ASCENDING)], name="post_id_index")
-        thread_safe_print("Created index for post collection.")
-
-        db.comment.create_index([("id", ASCENDING)], name="comment_id_index")
-        thread_safe_print("Created index for comment collection.")
-
-        db.forum.create_index([("id", ASCENDING)], name="forum_id_index")
-        thread_safe_print("Created index for forum collection.")
-
-        thread_safe_print("All indexes created successfully.")
+        created = ensure_indexes(db)
+        for name in created:
+            thread_safe_print(f"Created index {name}.")
+
+        thread_safe_print(f"All indexes created successfully ({len(created)} new).")
+
+        try:
+            for check in check_router_queries(db):
+                thread_safe_print(f"  query {check['query']} on {check['collection']}: {check['status']} "
+                                  f"(plan indexes: {check['plan_indexes']})")
+        except Exception as e:
+            thread_safe_print(f"WARNING: Could not explain the router queries: {e}")
     finally:
         client.close()
 
 
-def load_mongodb(max_workers=None):
+def load_mongodb(max_workers=None, checkpoint=None):
     """
     Initializes MongoDB database by loading data from CSV files and creates indexes.
+    Also maintains the person_activity store used by the active-users query: incrementally on a first
+    load into empty collections, rebuilt once loading is done on a reload, a resumed load or a failure.
+    Raises RuntimeError if any file or byte range failed to load (the others are kept).
 
     Args:
-        max_workers: Maximum number of threads to use. If None, defaults to
-                     min(32, os.cpu_count() + 4) as per ThreadPoolExecutor
+        max_workers: Maximum number of threads (or processes, with MONGO_LOAD_ENGINE=processes) to use.
+                     If None, defaults to min(32, os.cpu_count() + 4) threads as per ThreadPoolExecutor,
+                     or os.cpu_count() processes
+        checkpoint: Optional ingestion_manifest.Checkpoint used to resume an interrupted load
     """
     thread_safe_print("Initializing MongoDB from CSV and creating indexes...")
 
     # Create indexes first
     create_indexes()
 
-    # Define file paths for each collection (ensure these paths are correct for your environment)
-    person_files = [
-        "app/data/dynamic/Person/part-00000-dd2f2cde-5db9-4c99-ae95-2edc4a618386-c000.csv",
-        "app/data/dynamic/Person/part-00001-dd2f2cde-5db9-4c99-ae95-2edc4a618386-c000.csv",
-        "app/data/dynamic/Person/part-00002-dd2f2cde-5db9-4c99-ae95-2edc4a618386-c000.csv"
-    ]
-    post_files = [
-        "app/data/dynamic/Post/part-00000-b97b8177-f70d-47ee-9a1f-2a70ca3f97c4-c000.csv",
-        "app/data/dynamic/Post/part-00001-b97b8177-f70d-47ee-9a1f-2a70ca3f97c4-c000.csv",
-        "app/data/dynamic/Post/part-00003-b97b8177-f70d-47ee-9a1f-2a70ca3f97c4-c000.csv",
-        "app/data/dynamic/Post/part-00006-b97b8177-f70d-47ee-9a1f-2a70ca3f97c4-c000.csv"
-    ]
-    comment_files = [
-        "app/data/dynamic/Comment/part-00000-833bf12c-c29e-47ce-b45b-08899b08abd3-c000.csv",
-        "app/data/dynamic/Comment/part-00001-833bf12c-c29e-47ce-b45b-08899b08abd3-c000.csv",
-        "app/data/dynamic/Comment/part-00002-833bf12c-c29e-47ce-b45b-08899b08abd3-c000.csv",
-        "app/data/dynamic/Comment/part-00003-833bf12c-c29e-47ce-b45b-08899b08abd3-c000.csv",
-        "app/data/dynamic/Comment/part-00004-833bf12c-c29e-47ce-b45b-08899b08abd3-c000.csv",
-        "app/data/dynamic/Comment/part-00005-833bf12c-c29e-47ce-b45b-08899b08abd3-c000.csv",
-        "app/data/dynamic/Comment/part-00006-833bf12c-c29e-47ce-b45b-08899b08abd3-c000.csv",
-        "app/data/dynamic/Comment/part-00007-833bf12c-c29e-47ce-b45b-08899b08abd3-c000.csv",
-        "app/data/dynamic/Comment/part-00008-833bf12c-c29e-47ce-b45b-08899b08abd3-c000.csv",
-    ]
-    forum_files = [
-        "app/data/dynamic/Forum/part-00000-a997c396-dbaf-4755-b9d6-7f3d6066961a-c000.csv",
-        "app/data/dynamic/Forum/part-00001-a997c396-dbaf-4755-b9d6-7f3d6066961a-c000.csv",
-        "app/data/dynamic/Forum/part-00002-a997c396-dbaf-4755-b9d6-7f3d6066961a-c000.csv",
-       
-      
-    ]
+    # person_activity is maintained incrementally while loading, with a $inc sent after each insert_many.
+    # The two writes are not atomic: if a load failed or was interrupted between them, the documents
+    # are in the collection but their activity was never counted, and a resumed load skips them as
+    # duplicates. So the store is rebuilt from scratch unless the source collections start out empty
+    # and every unit loads successfully (also when they were loaded before the store existed).
+    client = get_mongo_client()
+    try:
+        db = client.get_database()
+        rebuild_activity = any(db[name].estimated_document_count() > 0 for name in ("person", "post", "comment"))
+    finally:
+        client.close()
 
     # Load all collections - the heaviest operations are performed in parallel
     total_start_time = time.time()
 
-    load_collection_with_threads("person", person_files, max_workers=max_workers)
-    load_collection_with_threads("post", post_files, max_workers=max_workers)
-    load_collection_with_threads("comment", comment_files, max_workers=max_workers)
-    load_collection_with_threads("forum", forum_files, max_workers=max_workers)
+    try:
+        # Every part file found under data/dynamic is loaded (see dataset_manifest.py)
+        load_stats = [
+            load_collection(collection_name, part_files(entity, DYNAMIC_DIR, required_columns),
+                            max_workers=max_workers, checkpoint=checkpoint)
+            for collection_name, (entity, required_columns) in COLLECTIONS.items()
+        ]
+
+        failed = {stats["collection"]: stats.get("failed_ranges", 0) + stats.get("failed_files", 0)
+                  for stats in load_stats}
+        if rebuild_activity or any(failed.values()):
+            thread_safe_print(f"Rebuilding {PERSON_ACTIVITY_COLLECTION} from the loaded posts and comments...")
+            client = get_mongo_client()
+            try:
+                rebuild_person_activity(client.get_database())
+            finally:
+                client.close()
+            thread_safe_print(f"{PERSON_ACTIVITY_COLLECTION} rebuilt.")
+    finally:
+        # Also when a collection failed: some of its documents may already be inserted
+        invalidate_query_cache()
 
     total_end_time = time.time()
     total_duration = total_end_time - total_start_time
 
     thread_safe_print("MongoDB import complete.")
+    for stats in load_stats:
+        thread_safe_print(f"  {stats['collection']:<10} engine={stats['engine']:<10} inserted={stats['inserted']:<10} "
+                          f"time={stats['seconds']}s rows/sec={stats['rows_per_sec']}")
     thread_safe_print(f"Total execution time: {total_duration:.2f} seconds")
 
+    if any(failed.values()):
+        raise RuntimeError(f"MongoDB import incomplete, failed units per collection: {failed}")
+
 
 if __name__ == "__main__":
     recommended_workers = min(32, (os.cpu_count() or 4) * 2) # Ensure os.cpu_count() is available
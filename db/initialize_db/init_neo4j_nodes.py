@@ -1,7 +1,26 @@
 import os
+import time
+import numpy as np
 from dotenv import load_dotenv
 from neo4j import GraphDatabase
 
+from db.initialize_db.dataset_manifest import DYNAMIC_DIR, part_files
+from db.initialize_db.ldbc_csv import read_batches
+from utils.cache import invalidate_query_cache
+
+load_dotenv()
+
+# "bulk": distinct ids per label extracted in Python, nodes created with batched UNWIND ... CREATE.
+# "load_csv": LOAD CSV with a MERGE per row and node (the original loader).
+# "admin_csv": only writes the node CSVs for neo4j-admin database import (cold start).
+NEO4J_NODE_LOAD_MODE = os.getenv("NEO4J_NODE_LOAD_MODE", "bulk")
+
+# ./data/dynamic, mounted as /import in the Neo4j container, as seen from the app container
+NEO4J_IMPORT_DIR = os.getenv("NEO4J_IMPORT_DIR", DYNAMIC_DIR)
+ADMIN_IMPORT_SUBDIR = "admin_import"
+
+NODE_BATCH_SIZE = 10000
+
 constraints = [
     "CREATE CONSTRAINT person_id IF NOT EXISTS FOR (p:Person) REQUIRE p.id IS UNIQUE",
     "CREATE CONSTRAINT post_id IF NOT EXISTS FOR (p:Post) REQUIRE p.id IS UNIQUE",
@@ -12,6 +31,17 @@ constraints = [
     "CREATE CONSTRAINT company_id IF NOT EXISTS FOR (c:Company) REQUIRE c.id IS UNIQUE"
 ]
 
+def source_files(entity, required_columns=()):
+    """
+    Every part file of a relationship entity (see dataset_manifest.py), relative to the
+    Neo4j import directory, as used in the file:/// URLs of LOAD CSV.
+    """
+    return [
+        os.path.relpath(path, NEO4J_IMPORT_DIR)
+        for path in part_files(entity, NEO4J_IMPORT_DIR, required_columns)
+    ]
+
+
 def create_constraints(driver):
     with driver.session() as session:
         for c in constraints:
@@ -52,93 +82,131 @@ def create_single_node(driver, files, entity, id_field):
             except Exception as e:
                 print(f"Error processing file {file}: {e}")
 
-def main():
-    load_dotenv()
-    uri = os.getenv("NEO4J_URI")
-    user = os.getenv("NEO4J_USER")
-    password = os.getenv("NEO4J_PASSWORD")
-    driver = GraphDatabase.driver(uri, auth=(user, password))
-
-    create_constraints(driver)
-    create_nodes(driver, knows_files, "Person", "Person", "Person1Id", "Person2Id")
-    create_nodes(driver, likes_post_files, "Person", "Post", "PersonId", "PostId")
-    create_nodes(driver, likes_comment_files, "Person", "Comment", "PersonId", "CommentId")
-    create_nodes(driver, has_interest_files, "Person", "Tag", "PersonId", "TagId")
-    create_nodes(driver, member_of_files, "Forum", "Person", "ForumId", "PersonId")
-    create_nodes(driver, forum_has_tag_files, "Forum", "Tag", "ForumId", "TagId")
-    create_nodes(driver, post_has_tag_files, "Post", "Tag", "PostId", "TagId")
-    create_nodes(driver, comment_has_tag_files, "Comment", "Tag", "CommentId", "TagId")
-    create_nodes(driver, study_at_files, "Person", "University", "PersonId", "UniversityId")
-    create_nodes(driver, work_at_files, "Person", "Company", "PersonId", "CompanyId")
-
-    driver.close()
-
-# Files
-knows_files = [
-    "Person_knows_Person/part-00000-229ad475-a3b7-4391-b675-22ef679b777a-c000.csv",
-    "Person_knows_Person/part-00002-229ad475-a3b7-4391-b675-22ef679b777a-c000.csv",
-    "Person_knows_Person/part-00003-229ad475-a3b7-4391-b675-22ef679b777a-c000.csv"
-]
-
-likes_post_files = [
-    "Person_likes_Post/part-00000-1db05b26-d9eb-4e65-be18-f0d7bf575214-c000.csv",
-    "Person_likes_Post/part-00001-1db05b26-d9eb-4e65-be18-f0d7bf575214-c000.csv",
-    "Person_likes_Post/part-00004-1db05b26-d9eb-4e65-be18-f0d7bf575214-c000.csv",
-    "Person_likes_Post/part-00003-1db05b26-d9eb-4e65-be18-f0d7bf575214-c000.csv"
-]
-
-likes_comment_files = [
-    "Person_likes_Comment/part-00000-954d02cd-1f9b-478b-9d9d-db930cdfc2a0-c000.csv",
-    "Person_likes_Comment/part-00003-954d02cd-1f9b-478b-9d9d-db930cdfc2a0-c000.csv",
-    "Person_likes_Comment/part-00001-954d02cd-1f9b-478b-9d9d-db930cdfc2a0-c000.csv",
-    "Person_likes_Comment/part-00006-954d02cd-1f9b-478b-9d9d-db930cdfc2a0-c000.csv"
-]
-
-has_interest_files = [
-    "Person_hasInterest_Tag/part-00000-2041dc2e-354d-4676-ae8d-30d68582065d-c000.csv",
-    "Person_hasInterest_Tag/part-00002-2041dc2e-354d-4676-ae8d-30d68582065d-c000.csv",
-    "Person_hasInterest_Tag/part-00001-2041dc2e-354d-4676-ae8d-30d68582065d-c000.csv"
-]
+def distinct_node_ids(sources, skip_labels=()):
+    """
+    Extracts the distinct ids of every label from the relationship files, reading only the id columns.
+    Labels in skip_labels are left out, and files referencing only those labels are not read.
+    Returns {label: sorted numpy int64 array}.
+    """
+    chunks_by_label = {}
+    for entity, entity1, entity2, id_field1, id_field2 in sources:
+        wanted = [(label, field) for label, field in ((entity1, id_field1), (entity2, id_field2))
+                  if label not in skip_labels]
+        if not wanted:
+            continue
+        columns = list(dict.fromkeys(field for _, field in wanted))
+        for file in source_files(entity, columns):
+            print(f"Reading node ids from file: {file}")
+            for batch in read_batches(os.path.join(NEO4J_IMPORT_DIR, file), columns=columns):
+                for label, field in wanted:
+                    ids = batch.column(field).drop_null().to_numpy()
+                    chunks_by_label.setdefault(label, []).append(np.unique(ids))
+    return {label: np.unique(np.concatenate(chunks)) for label, chunks in chunks_by_label.items()}
+
+
+def existing_node_ids(driver, label):
+    with driver.session() as session:
+        result = session.run(f"MATCH (n:{label}) RETURN n.id AS id")
+        return np.fromiter((record["id"] for record in result), dtype=np.int64)
 
-member_of_files = [
-    "Forum_hasMember_Person/part-00000-093f0797-e3d2-4e9a-aadf-c0c957b6c78b-c000.csv",
-    "Forum_hasMember_Person/part-00007-093f0797-e3d2-4e9a-aadf-c0c957b6c78b-c000.csv",
-    "Forum_hasMember_Person/part-00003-093f0797-e3d2-4e9a-aadf-c0c957b6c78b-c000.csv",
-    "Forum_hasMember_Person/part-00004-093f0797-e3d2-4e9a-aadf-c0c957b6c78b-c000.csv",
-    "Forum_hasMember_Person/part-00006-093f0797-e3d2-4e9a-aadf-c0c957b6c78b-c000.csv",
-    "Forum_hasMember_Person/part-00001-093f0797-e3d2-4e9a-aadf-c0c957b6c78b-c000.csv"
-]
 
-forum_has_tag_files = [
-    "Forum_hasTag_Tag/part-00000-1e403b78-d38e-4ba4-86a6-ebe2a8716214-c000.csv",
-    "Forum_hasTag_Tag/part-00002-1e403b78-d38e-4ba4-86a6-ebe2a8716214-c000.csv",
-    "Forum_hasTag_Tag/part-00001-1e403b78-d38e-4ba4-86a6-ebe2a8716214-c000.csv"
-]
+def _create_node_batch(tx, label, ids):
+    tx.run(f"UNWIND $ids AS id CREATE (:{label} {{id: id}})", ids=ids).consume()
 
-post_has_tag_files = [
-    "Post_hasTag_Tag/part-00000-a181a312-c991-4be8-a0f6-b834b5e7a007-c000.csv",
-    "Post_hasTag_Tag/part-00002-a181a312-c991-4be8-a0f6-b834b5e7a007-c000.csv",
-    "Post_hasTag_Tag/part-00003-a181a312-c991-4be8-a0f6-b834b5e7a007-c000.csv"
-]
 
-comment_has_tag_files = [
-    "Comment_hasTag_Tag/part-00000-6d6a9272-6c6e-48d9-a422-097c72739bdf-c000.csv",
-    "Comment_hasTag_Tag/part-00001-6d6a9272-6c6e-48d9-a422-097c72739bdf-c000.csv",
-    "Comment_hasTag_Tag/part-00005-6d6a9272-6c6e-48d9-a422-097c72739bdf-c000.csv",
-    "Comment_hasTag_Tag/part-00003-6d6a9272-6c6e-48d9-a422-097c72739bdf-c000.csv",
-    "Comment_hasTag_Tag/part-00006-6d6a9272-6c6e-48d9-a422-097c72739bdf-c000.csv"
-]
+def create_nodes_bulk(driver, label, ids, batch_size=NODE_BATCH_SIZE):
+    """Creates a node per id with batched UNWIND ... CREATE; the ids must not exist yet (unique constraint)"""
+    with driver.session() as session:
+        for start in range(0, len(ids), batch_size):
+            session.execute_write(_create_node_batch, label, ids[start:start + batch_size].tolist())
+
+
+def load_nodes_bulk(driver, sources, checkpoint=None):
+    """
+    Creates the nodes referenced by the relationship files, skipping the ones already in the database.
+    With a checkpoint (ingestion_manifest.Checkpoint), labels already loaded are skipped without
+    reading their ids. Raises RuntimeError if any label failed to load (the others are kept).
+    """
+    labels = {label for _, entity1, entity2, _, _ in sources for label in (entity1, entity2)}
+    done = {label for label in labels if checkpoint and checkpoint.is_done(label)}
+    failed = []
+    for label, ids in distinct_node_ids(sources, skip_labels=done).items():
+        start_time = time.time()
+        try:
+            new_ids = np.setdiff1d(ids, existing_node_ids(driver, label), assume_unique=True)
+            create_nodes_bulk(driver, label, new_ids)
+            duration = time.time() - start_time
+            print(f"Created {len(new_ids)} {label} nodes ({len(ids) - len(new_ids)} already present) "
+                  f"in {duration:.2f} seconds ({round(len(new_ids) / duration) if duration else len(new_ids)} nodes/sec).")
+            if checkpoint:
+                checkpoint.mark_done(label, created=len(new_ids))
+        except Exception as e:
+            failed.append(label)
+            print(f"Error creating {label} nodes: {e}")
+    if failed:
+        raise RuntimeError(f"Neo4j node import incomplete, failed labels: {failed}")
+
+
+def write_admin_import_csvs(sources):
+    """
+    Writes a node CSV per label in the admin_import subdirectory of the Neo4j import directory, for
+    neo4j-admin database import, and prints the command to run in the Neo4j container, with the
+    database stopped. Returns the written paths.
+    """
+    output_dir = os.path.join(NEO4J_IMPORT_DIR, ADMIN_IMPORT_SUBDIR)
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for label, ids in distinct_node_ids(sources).items():
+        path = os.path.join(output_dir, f"{label}.csv")
+        # With --id-type=INTEGER the id column is stored as an integer "id" property
+        np.savetxt(path, ids, fmt="%d", header=f"id:ID({label})", comments="")
+        paths.append(path)
+        print(f"Wrote {len(ids)} {label} ids to {path}")
+
+    nodes_args = " ".join(
+        f"--nodes={os.path.splitext(os.path.basename(path))[0]}=/import/{ADMIN_IMPORT_SUBDIR}/{os.path.basename(path)}"
+        for path in paths
+    )
+    print("Run in the Neo4j container (database stopped), then this script again to create the constraints:")
+    print(f"  neo4j-admin database import full --id-type=INTEGER --overwrite-destination {nodes_args} neo4j")
+    return paths
+
+
+def main(checkpoint=None):
+    if NEO4J_NODE_LOAD_MODE == "admin_csv":
+        write_admin_import_csvs(NODE_SOURCES)
+        return
 
-study_at_files = [
-    "Person_studyAt_University/part-00000-773dbdd3-733c-447e-90ed-2679590b2d7f-c000.csv",
-    "Person_studyAt_University/part-00002-773dbdd3-733c-447e-90ed-2679590b2d7f-c000.csv",
-    "Person_studyAt_University/part-00001-773dbdd3-733c-447e-90ed-2679590b2d7f-c000.csv"
-]
+    uri = os.getenv("NEO4J_URI")
+    user = os.getenv("NEO4J_USER")
+    password = os.getenv("NEO4J_PASSWORD")
+    driver = GraphDatabase.driver(uri, auth=(user, password))
 
-work_at_files = [
-    "Person_workAt_Company/part-00000-bce1dbfa-615a-4937-9a34-ad626a3c454a-c000.csv",
-    "Person_workAt_Company/part-00002-bce1dbfa-615a-4937-9a34-ad626a3c454a-c000.csv",
-    "Person_workAt_Company/part-00001-bce1dbfa-615a-4937-9a34-ad626a3c454a-c000.csv"
+    try:
+        create_constraints(driver)
+        if NEO4J_NODE_LOAD_MODE == "load_csv":
+            for entity, *source in NODE_SOURCES:
+                create_nodes(driver, source_files(entity), *source)
+        else:
+            load_nodes_bulk(driver, NODE_SOURCES, checkpoint)
+    finally:
+        driver.close()
+        # Also when a stage failed: some of its nodes or relationships may already be written
+        invalidate_query_cache()
+
+# (entity, entity1, entity2, id_field1, id_field2): the nodes referenced by every relationship entity,
+# whose part files are discovered under the Neo4j import directory
+NODE_SOURCES = [
+    ("Person_knows_Person", "Person", "Person", "Person1Id", "Person2Id"),
+    ("Person_likes_Post", "Person", "Post", "PersonId", "PostId"),
+    ("Person_likes_Comment", "Person", "Comment", "PersonId", "CommentId"),
+    ("Person_hasInterest_Tag", "Person", "Tag", "PersonId", "TagId"),
+    ("Forum_hasMember_Person", "Forum", "Person", "ForumId", "PersonId"),
+    ("Forum_hasTag_Tag", "Forum", "Tag", "ForumId", "TagId"),
+    ("Post_hasTag_Tag", "Post", "Tag", "PostId", "TagId"),
+    ("Comment_hasTag_Tag", "Comment", "Tag", "CommentId", "TagId"),
+    ("Person_studyAt_University", "Person", "University", "PersonId", "UniversityId"),
+    ("Person_workAt_Company", "Person", "Company", "PersonId", "CompanyId"),
 ]
 
 if __name__ == "__main__":
@@ -1,9 +1,25 @@
 import os
+import time
+import concurrent.futures
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
 from dotenv import load_dotenv
 from neo4j import GraphDatabase
 
-from db.initialize_db.init_neo4j_nodes import likes_post_files, likes_comment_files, has_interest_files, member_of_files, \
-    forum_has_tag_files, post_has_tag_files, comment_has_tag_files, study_at_files, work_at_files, knows_files
+from db.initialize_db.init_neo4j_nodes import NEO4J_IMPORT_DIR, source_files
+from db.initialize_db.ldbc_csv import read_batches
+from db.forum_member_count import refresh_forum_member_counts
+from utils.cache import invalidate_query_cache
+
+load_dotenv()
+
+# "parallel": rows read in Python, partitioned so that concurrent sessions never share an endpoint node.
+# "load_csv": LOAD CSV one file at a time with a MERGE per row (the original loader).
+NEO4J_REL_LOAD_MODE = os.getenv("NEO4J_REL_LOAD_MODE", "parallel")
+NEO4J_REL_WORKERS = int(os.getenv("NEO4J_REL_WORKERS", "4"))
+
+REL_BATCH_SIZE = 10000
 
 
 def create_relationships(driver, files, from_entity, to_entity, from_field, to_field, rel_type, props=None):
@@ -29,29 +45,213 @@ def create_relationships(driver, files, from_entity, to_entity, from_field, to_f
                 print(f"Error processing relationship file {file}: {e}")
 
 
-def main():
-    load_dotenv()
+def read_relationship_rows(files, from_field, to_field, props=None, import_dir=NEO4J_IMPORT_DIR):
+    """
+    Reads the endpoint ids, creationDate and properties of a relationship type into an Arrow Table,
+    without duplicate rows (LOAD CSV + MERGE used to collapse them too) and without missing endpoints.
+    """
+    columns = [from_field, to_field, "creationDate"] + list(props or [])
+    batches = [
+        batch
+        for file in files
+        for batch in read_batches(os.path.join(import_dir, file), columns=columns)
+    ]
+    if not batches:
+        return pa.table({column: [] for column in columns})
+    table = pa.Table.from_batches(batches)
+    table = table.filter(pc.and_(pc.is_valid(table[from_field]), pc.is_valid(table[to_field])))
+    return table.group_by(columns, use_threads=False).aggregate([])
+
+
+def partition_by_endpoints(table, from_field, to_field, workers, same_label=False):
+    """
+    Splits the rows into rounds of partitions whose endpoint nodes are disjoint: within a round no node,
+    source or target, appears in two partitions, so the concurrent sessions of a round never wait on each
+    other's node locks (e.g. on the Forum end of MEMBER_OF). Nodes are keyed by id modulo K and every
+    (source key, target key) cell goes to one round:
+    - different labels (K = workers): cell (a, b) goes to round (b - a) mod K, a Latin square, so every
+      round has K partitions with distinct source keys and distinct target keys;
+    - same label (e.g. KNOWS, K = 2 * workers): both ends share the key space, so the unordered pairs
+      {a, b} are scheduled as a round-robin tournament (K - 1 rounds of K / 2 disjoint pairs) followed
+      by a round of the cells a == b.
+    Returns a list of rounds, each a list of non-empty partitions sorted by source id.
+    """
+    source_ids = table[from_field].to_numpy()
+    order = np.argsort(source_ids, kind="stable")
+    table = table.take(order)
+    if same_label:
+        keys = 2 * workers
+        a = table[from_field].to_numpy() % keys
+        b = table[to_field].to_numpy() % keys
+        low, high = np.minimum(a, b), np.maximum(a, b)
+        last = keys - 1  # circle method: key `last` is fixed, the others rotate
+        # Round r pairs (r, last) and (r + i, r - i) mod last: low + high = 2r, and keys / 2 is 1/2 mod last
+        rounds = np.where(high == last, low, (low + high) * (keys // 2) % last)
+        rounds = np.where(low == high, last, rounds)
+        cells = low
+    else:
+        keys = workers
+        a = table[from_field].to_numpy() % keys
+        b = table[to_field].to_numpy() % keys
+        rounds = (b - a) % keys
+        cells = a
+    schedule = []
+    for round_number in range(keys):
+        in_round = rounds == round_number
+        partitions = [table.filter(pa.array(in_round & (cells == cell))) for cell in range(keys)]
+        partitions = [partition for partition in partitions if partition.num_rows]
+        if partitions:
+            schedule.append(partitions)
+    return schedule
+
+
+def relationship_exists(driver, from_entity, to_entity, rel_type):
+    with driver.session() as session:
+        record = session.run(f"MATCH (:{from_entity})-[r:{rel_type}]->(:{to_entity}) RETURN r LIMIT 1").single()
+        return record is not None
+
+
+def _write_relationship_batch(tx, query, rows):
+    tx.run(query, rows=rows).consume()
+
+
+def _write_partition(driver, query, partition):
+    # Partitions of a round share no node; execute_write still retries any other transient error
+    with driver.session() as session:
+        for start in range(0, partition.num_rows, REL_BATCH_SIZE):
+            session.execute_write(_write_relationship_batch, query,
+                                  partition.slice(start, REL_BATCH_SIZE).to_pylist())
+    return partition.num_rows
+
+
+def load_relationships_parallel(driver, files, from_entity, to_entity, from_field, to_field, rel_type, props=None,
+                                workers=NEO4J_REL_WORKERS):
+    """
+    Loads a relationship type with concurrent sessions, one per partition of partition_by_endpoints;
+    the rounds of partitions are written one after the other.
+    Relationships are CREATEd when none of this type exists yet between the two labels, MERGEd otherwise.
+    Returns the load statistics, including relationships/sec.
+    """
+    start_time = time.time()
+    table = read_relationship_rows(files, from_field, to_field, props)
+    create = not relationship_exists(driver, from_entity, to_entity, rel_type)
+
+    if create:
+        prop_str = ''.join(f", {k}: row.{k}" for k in props or [])
+        write = f"CREATE (a)-[r:{rel_type} {{creationDate: row.creationDate{prop_str}}}]->(b)"
+    else:
+        # MERGE cannot match on null properties (e.g. a missing workFrom), so they are SET instead
+        set_str = ''.join(f" SET r.{k} = row.{k}" for k in props or [])
+        write = f"MERGE (a)-[r:{rel_type} {{creationDate: row.creationDate}}]->(b){set_str}"
+    query = f"""
+    UNWIND $rows AS row
+    MATCH (a:{from_entity} {{id: row.{from_field}}})
+    MATCH (b:{to_entity} {{id: row.{to_field}}})
+    {write}
+    """
+
+    rows = 0
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        for partitions in partition_by_endpoints(table, from_field, to_field, workers,
+                                                 same_label=from_entity == to_entity):
+            futures = [executor.submit(_write_partition, driver, query, partition) for partition in partitions]
+            rows += sum(future.result() for future in concurrent.futures.as_completed(futures))
+
+    duration = time.time() - start_time
+    stats = {
+        "rel_type": rel_type,
+        "from": from_entity,
+        "to": to_entity,
+        "mode": "create" if create else "merge",
+        "rows": rows,
+        "seconds": round(duration, 2),
+        "rows_per_sec": round(rows / duration) if duration else None
+    }
+    print(f"Loaded {rows} {from_entity}-[{rel_type}]->{to_entity} relationships ({stats['mode']}) "
+          f"in {duration:.2f} seconds ({stats['rows_per_sec']} relationships/sec).")
+    return stats
+
+
+def print_throughput(load_stats):
+    """Prints the rows and relationships/sec per relationship type"""
+    by_type = {}
+    for stats in load_stats:
+        rows, seconds = by_type.get(stats["rel_type"], (0, 0))
+        by_type[stats["rel_type"]] = (rows + stats["rows"], seconds + stats["seconds"])
+    print("Neo4j relationship import complete.")
+    for rel_type, (rows, seconds) in by_type.items():
+        print(f"  {rel_type:<13} rows={rows:<10} time={seconds:.2f}s "
+              f"relationships/sec={round(rows / seconds) if seconds else None}")
+
+
+def relationship_unit(source):
+    """Checkpoint unit of a RELATIONSHIP_SOURCES entry (see ingestion_manifest.py)"""
+    _, from_entity, to_entity, _, _, rel_type, *_ = source
+    return f"{from_entity}-{rel_type}->{to_entity}"
+
+
+def main(checkpoint=None):
+    """
+    Loads every relationship type and refreshes the forum member counts.
+    With a checkpoint (ingestion_manifest.Checkpoint), relationship sources already loaded are skipped.
+    Raises RuntimeError if any relationship source failed to load (the others are kept).
+    """
     uri = os.getenv("NEO4J_URI")
     user = os.getenv("NEO4J_USER")
     password = os.getenv("NEO4J_PASSWORD")
     driver = GraphDatabase.driver(uri, auth=(user, password))
 
-    # Reuse file lists
-    create_relationships(driver, post_has_tag_files, "Post", "Tag", "PostId", "TagId", "HAS_TAG")
-    create_relationships(driver, knows_files, "Person", "Person", "Person1Id", "Person2Id", "KNOWS")
-    create_relationships(driver, likes_post_files, "Person", "Post", "PersonId", "PostId", "LIKES")
-    create_relationships(driver, likes_comment_files, "Person", "Comment", "PersonId", "CommentId", "LIKES")
-    create_relationships(driver, has_interest_files, "Person", "Tag", "PersonId", "TagId", "HAS_INTEREST")
-    create_relationships(driver, member_of_files, "Person", "Forum", "PersonId", "ForumId", "MEMBER_OF")
-    create_relationships(driver, forum_has_tag_files, "Forum", "Tag", "ForumId", "TagId", "HAS_TAG")
-    create_relationships(driver, post_has_tag_files, "Post", "Tag", "PostId", "TagId", "HAS_TAG")
-    create_relationships(driver, comment_has_tag_files, "Comment", "Tag", "CommentId", "TagId", "HAS_TAG")
-    create_relationships(driver, study_at_files, "Person", "University", "PersonId", "UniversityId", "STUDY_AT",
-                         ["classYear"])
-    create_relationships(driver, work_at_files, "Person", "Company", "PersonId", "CompanyId", "WORK_AT", ["workFrom"])
-
-    driver.close()
+    failed = []
+    try:
+        if NEO4J_REL_LOAD_MODE == "load_csv":
+            for entity, *source in RELATIONSHIP_SOURCES:
+                create_relationships(driver, source_files(entity), *source)
+        else:
+            load_stats = []
+            for source in RELATIONSHIP_SOURCES:
+                unit = relationship_unit(source)
+                if checkpoint and checkpoint.is_done(unit):
+                    continue
+                entity, from_entity, to_entity, from_field, to_field, rel_type, *props = source
+                try:
+                    files = source_files(entity, [from_field, to_field, "creationDate"] + (props[0] if props else []))
+                    stats = load_relationships_parallel(driver, files, *source[1:])
+                    load_stats.append(stats)
+                    if checkpoint:
+                        checkpoint.mark_done(unit, rows=stats["rows"])
+                except Exception as e:
+                    failed.append(unit)
+                    print(f"Error loading {rel_type} relationships from {entity}: {e}")
+            print_throughput(load_stats)
+
+        try:
+            refresh_forum_member_counts(driver)
+            print("Forum member counts refreshed.")
+        except Exception as e:
+            failed.append("forum_member_counts")
+            print(f"Error refreshing forum member counts: {e}")
+    finally:
+        driver.close()
+        # Also when a stage failed: some of its nodes or relationships may already be written
+        invalidate_query_cache()
+    if failed:
+        raise RuntimeError(f"Neo4j relationship import incomplete, failed: {failed}")
+
 
+# (entity, from_entity, to_entity, from_field, to_field, rel_type[, props]) of every relationship type;
+# the part files of the entity are discovered under the Neo4j import directory
+RELATIONSHIP_SOURCES = [
+    ("Person_knows_Person", "Person", "Person", "Person1Id", "Person2Id", "KNOWS"),
+    ("Person_likes_Post", "Person", "Post", "PersonId", "PostId", "LIKES"),
+    ("Person_likes_Comment", "Person", "Comment", "PersonId", "CommentId", "LIKES"),
+    ("Person_hasInterest_Tag", "Person", "Tag", "PersonId", "TagId", "HAS_INTEREST"),
+    ("Forum_hasMember_Person", "Person", "Forum", "PersonId", "ForumId", "MEMBER_OF"),
+    ("Forum_hasTag_Tag", "Forum", "Tag", "ForumId", "TagId", "HAS_TAG"),
+    ("Post_hasTag_Tag", "Post", "Tag", "PostId", "TagId", "HAS_TAG"),
+    ("Comment_hasTag_Tag", "Comment", "Tag", "CommentId", "TagId", "HAS_TAG"),
+    ("Person_studyAt_University", "Person", "University", "PersonId", "UniversityId", "STUDY_AT", ["classYear"]),
+    ("Person_workAt_Company", "Person", "Company", "PersonId", "CompanyId", "WORK_AT", ["workFrom"]),
+]
 
 if __name__ == "__main__":
     main()
@@ -1,11 +1,24 @@
 import os
-import pandas as pd
-import psycopg2
+import time
+import concurrent.futures
+import numpy as np
+import psycopg
 from dotenv import load_dotenv
-from io import StringIO
+
+from db.initialize_db.dataset_manifest import STATIC_DIR, part_files
+from db.initialize_db.ldbc_csv import read_batches, copy_buffer
+from db.postgres_indexes import ensure_indexes, index_report
+from utils.cache import invalidate_query_cache
 
 load_dotenv()
 
+# "csv": Arrow writes every batch as CSV text into the COPY stream (no per-row Python work).
+# "binary": rows are sent in PostgreSQL binary format (no text parsing on the server side).
+COPY_FORMAT = os.getenv("POSTGRES_COPY_FORMAT", "csv")
+
+# Binary COPY types of the column types used in TABLES
+BINARY_COPY_TYPES = {"INTEGER": "int4", "TEXT": "text"}
+
 DB_PARAMS = {
     "dbname": os.getenv("POSTGRES_DB", "maadb"),
     "user": os.getenv("POSTGRES_USER", "postgres"),
@@ -14,6 +27,7 @@ DB_PARAMS = {
     "port": os.getenv("POSTGRES_PORT", "5432")
 }
 
+# Table: columns, entity directory of the part files under data/static, foreign keys
 TABLES = {
     "place": {
         "columns": {
@@ -23,7 +37,7 @@ TABLES = {
             "type": "TEXT",
             "PartOfPlaceId": "INTEGER"
         },
-        "csv": ["/app/data/static/Place/part-00000-5d3b389c-4734-4de7-a476-66a0fe967afc-c000.csv"],
+        "entity": "Place",
         "fk": ['ALTER TABLE place ADD FOREIGN KEY ("PartOfPlaceId") REFERENCES place(id);']
     },
     "organization": {
@@ -34,7 +48,7 @@ TABLES = {
             "url": "TEXT",
             "LocationPlaceId": "INTEGER"
         },
-        "csv": ["/app/data/static/Organisation/part-00000-1b7378fc-ddc5-45ae-a217-23037b649081-c000.csv"],
+        "entity": "Organisation",
         "fk": ['ALTER TABLE organization ADD FOREIGN KEY ("LocationPlaceId") REFERENCES place(id);']
     },
     "tagclass": {
@@ -44,7 +58,7 @@ TABLES = {
             "url": "TEXT",
             "SubclassOfTagClassId": "INTEGER"
         },
-        "csv": ["/app/data/static/TagClass/part-00000-4dea37c1-863e-4d43-adfe-95d3ae0a86a9-c000.csv"],
+        "entity": "TagClass",
         "fk": ['ALTER TABLE tagclass ADD FOREIGN KEY ("SubclassOfTagClassId") REFERENCES tagclass(id);']
     },
     "tag": {
@@ -54,48 +68,75 @@ TABLES = {
             "url": "TEXT",
             "TypeTagClassId": "INTEGER"
         },
-        "csv": ["/app/data/static/Tag/part-00000-4bdec47c-71f2-4e9a-9b75-2a8f7b011870-c000.csv"],
+        "entity": "Tag",
         "fk": ['ALTER TABLE tag ADD FOREIGN KEY ("TypeTagClassId") REFERENCES tagclass(id);']
     }
 }
 
 
 def connect():
-    return psycopg2.connect(**DB_PARAMS)
+    return psycopg.connect(**DB_PARAMS)
 
 
-def create_tables(cursor):
-    for table, config in TABLES.items():
+def create_tables(cursor, tables=TABLES):
+    for table, config in tables.items():
         cursor.execute(f"DROP TABLE IF EXISTS {table} CASCADE;")
         columns = ", ".join(f'"{col}" {type_}' for col, type_ in config["columns"].items())
         cursor.execute(f"CREATE TABLE {table} ({columns});")
 
 
-def load_csvs(cursor, table, config):
-    int_columns = [col for col, type_ in config["columns"].items() if type_.startswith("INTEGER")]
-
-    for path in config["csv"]:
-        print(f"Loading {path} into {table}")
-        for chunk in pd.read_csv(path, sep="|", chunksize=1000):
-            if chunk.empty:
-                continue
-
-            chunk.drop_duplicates(subset=["id"], inplace=True)
-
-            # Convert float-looking integers (like 64.0) to actual integers
-            for col in int_columns:
-                if col in chunk.columns:
-                    chunk[col] = pd.to_numeric(chunk[col], errors='coerce')
-                    chunk[col] = chunk[col].dropna().astype('Int64')  # Nullable integers
-
-            buffer = StringIO()
-            chunk.to_csv(buffer, sep="|", header=False, index=False, na_rep="NULL")
-            buffer.seek(0)
-
-            cursor.copy_expert(f"""
-                COPY {table} ({', '.join(f'"{col}"' for col in chunk.columns)})
-                FROM STDIN WITH (FORMAT CSV, DELIMITER '|', NULL 'NULL');
-            """, buffer)
+def _new_rows(batch, copied_ids):
+    """Keeps the first row of every id not copied yet: the primary key would reject the whole COPY"""
+    ids = batch.column("id").to_numpy(zero_copy_only=False)
+    _, first_rows = np.unique(ids, return_index=True)
+    keep = np.zeros(len(ids), dtype=bool)
+    keep[first_rows] = True
+    keep &= ~np.isin(ids, copied_ids)
+    return batch.filter(keep), np.concatenate([copied_ids, ids[keep]])
+
+
+def load_csvs(cursor, table, config, copy_format=COPY_FORMAT):
+    """
+    Streams every part file of a table (see dataset_manifest.py) into a single COPY ... FROM STDIN,
+    batch by batch. Returns the number of rows copied.
+    """
+    # Integer columns are typed (nullable) by the Arrow reader, empty fields are nulls
+    columns = list(config["columns"])
+    paths = part_files(config["entity"], STATIC_DIR, columns)
+    column_list = ", ".join(f'"{col}"' for col in columns)
+    if copy_format == "binary":
+        copy_sql = f"COPY {table} ({column_list}) FROM STDIN WITH (FORMAT BINARY)"
+    else:
+        copy_sql = f"COPY {table} ({column_list}) FROM STDIN WITH (FORMAT CSV, DELIMITER '|')"
+
+    rows = 0
+    copied_ids = np.array([], dtype=np.int64)
+    with cursor.copy(copy_sql) as copy:
+        if copy_format == "binary":
+            copy.set_types([BINARY_COPY_TYPES[config["columns"][col].split()[0]] for col in columns])
+        for path in paths:
+            print(f"Loading {path} into {table}")
+            for batch in read_batches(path):
+                batch, copied_ids = _new_rows(batch.select(columns), copied_ids)
+                if copy_format == "binary":
+                    for row in zip(*(batch.column(col).to_pylist() for col in columns)):
+                        copy.write_row(row)
+                else:
+                    copy.write(copy_buffer(batch).getvalue())
+                rows += batch.num_rows
+    return rows
+
+
+def load_table(table, config):
+    """Loads one table on its own connection and transaction (tables have no FK until the end)"""
+    start_time = time.time()
+    with connect() as conn:
+        with conn.cursor() as cursor:
+            rows = load_csvs(cursor, table, config)
+    duration = time.time() - start_time
+    print(f"Loaded {rows} rows into {table} in {duration:.2f} seconds "
+          f"({round(rows / duration) if duration else rows} rows/sec, {COPY_FORMAT} COPY).")
+    return table, rows
 
 
 def add_foreign_keys(cursor):
@@ -104,19 +145,56 @@ def add_foreign_keys(cursor):
             cursor.execute(constraint)
 
 
-def main():
+def main(checkpoint=None):
+    """
+    Recreates and loads the static tables, then adds the foreign keys and indexes.
+    With a checkpoint (ingestion_manifest.Checkpoint), tables already loaded are kept as they are.
+    Raises RuntimeError if any table failed to load.
+    """
     print("Starting PostgreSQL import...")
-    with connect() as conn:
-        cursor = conn.cursor()
-        create_tables(cursor)
-        conn.commit()
-
-        for table, config in TABLES.items():
-            load_csvs(cursor, table, config)
-        conn.commit()
-
-        add_foreign_keys(cursor)
-        conn.commit()
+    tables = {
+        table: config for table, config in TABLES.items()
+        if not (checkpoint and checkpoint.is_done(table))
+    }
+    try:
+        with connect() as conn:
+            cursor = conn.cursor()
+            create_tables(cursor, tables)
+            conn.commit()
+
+        # Foreign keys are added after loading, so the tables are independent and load in parallel
+        failed = []
+        if tables:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=len(tables)) as executor:
+                future_to_table = {
+                    executor.submit(load_table, table, config): table for table, config in tables.items()
+                }
+                for future in concurrent.futures.as_completed(future_to_table):
+                    try:
+                        table, rows = future.result()
+                        if checkpoint:
+                            checkpoint.mark_done(table, rows=rows)
+                    except Exception as e:
+                        failed.append(future_to_table[future])
+                        print(f"Table {future_to_table[future]} generated an exception: {e}")
+        if failed:
+            raise RuntimeError(f"PostgreSQL import incomplete, failed tables: {failed}")
+
+        with connect() as conn:
+            cursor = conn.cursor()
+            if not (checkpoint and checkpoint.is_done("foreign_keys")):
+                add_foreign_keys(cursor)
+            created = ensure_indexes(cursor)
+            conn.commit()
+            if checkpoint:
+                checkpoint.mark_done("foreign_keys")
+            print(f"PostgreSQL indexes checked, {len(created)} created: {created}")
+
+            for check in index_report(conn)["queries"]:
+                print(f"  query {check['query']}: {check['status']} (plan indexes: {check['plan_indexes']})")
+    finally:
+        # Also when a table failed: the tables were already dropped and recreated
+        invalidate_query_cache()
     print("PostgreSQL import complete.")
 
 
@@ -0,0 +1,97 @@
+"""
+Arrow-backed reader for the LDBC SNB pipe-separated CSV files, shared by the init scripts.
+
+Parsing, column typing, null normalization and the email list split run in Arrow compute (C++),
+in batches of about block_size bytes, instead of per-row Python code on pandas chunks:
+- "id" and every "...Id" column is an int64 (nullable, so no float ids when a value is missing),
+  "length" too; every other column is a string, dates included, as they are stored today.
+- An empty field is null (None in MongoDB, NULL in PostgreSQL).
+- person.email is split on ';' into a list of strings (an empty list when missing).
+"""
+import io
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pv
+
+
+DEFAULT_BLOCK_SIZE = 4 * 1024 * 1024
+
+INTEGER_COLUMNS = {"length", "classYear", "workFrom"}
+
+_EMAIL_LIST_TYPE = pa.list_(pa.string())
+
+
+def _is_integer_column(name):
+    return name == "id" or name.endswith("Id") or name in INTEGER_COLUMNS
+
+
+def _header_names(source):
+    if isinstance(source, bytes):
+        header = source[:source.index(b"\n")]
+    else:
+        with open(source, "rb") as f:
+            header = f.readline()
+    return header.decode("utf-8").strip().split("|")
+
+
+def open_ldbc_csv(source, block_size=DEFAULT_BLOCK_SIZE, columns=None):
+    """
+    Opens a streaming reader over an LDBC CSV file, given its path or its bytes (header included).
+    Column types are derived from the header, see the module docstring.
+    If columns is given, only those columns are converted and returned.
+    """
+    column_types = {
+        name: pa.int64() if _is_integer_column(name) else pa.string()
+        for name in _header_names(source)
+    }
+    stream = pa.BufferReader(source) if isinstance(source, bytes) else source
+    return pv.open_csv(
+        stream,
+        read_options=pv.ReadOptions(block_size=block_size),
+        parse_options=pv.ParseOptions(delimiter="|"),
+        convert_options=pv.ConvertOptions(column_types=column_types, null_values=[""],
+                                          strings_can_be_null=True, include_columns=columns)
+    )
+
+
+def normalize(data):
+    """
+    Splits the email column of a RecordBatch or Table, if any, into a list of strings
+    (empty list when missing).
+    """
+    names = data.schema.names
+    if "email" not in names:
+        return data
+    email_lists = pc.fill_null(pc.split_pattern(data.column("email"), ";"), pa.scalar([], _EMAIL_LIST_TYPE))
+    columns = [email_lists if name == "email" else data.column(name) for name in names]
+    return type(data).from_arrays(columns, names=names)
+
+
+def read_batches(source, block_size=DEFAULT_BLOCK_SIZE, columns=None):
+    """Yields the normalized RecordBatches of an LDBC CSV file (path or bytes), optionally only some columns"""
+    for batch in open_ldbc_csv(source, block_size, columns):
+        if batch.num_rows:
+            yield normalize(batch)
+
+
+def read_documents(source, block_size=DEFAULT_BLOCK_SIZE):
+    """Yields lists of BSON-ready documents (dicts with None for nulls), one list per batch"""
+    for batch in read_batches(source, block_size):
+        yield batch.to_pylist()
+
+
+def read_table(source, block_size=DEFAULT_BLOCK_SIZE):
+    """Reads a whole LDBC CSV file into a normalized Table (for the small static files)"""
+    return normalize(open_ldbc_csv(source, block_size).read_all())
+
+
+def copy_buffer(data):
+    """
+    Writes a Table or RecordBatch as CSV for PostgreSQL COPY ... WITH (FORMAT CSV, DELIMITER '|'):
+    nulls become unquoted empty fields, which COPY reads as NULL.
+    """
+    buffer = io.BytesIO()
+    pv.write_csv(data, buffer, pv.WriteOptions(include_header=False, delimiter="|"))
+    buffer.seek(0)
+    return buffer
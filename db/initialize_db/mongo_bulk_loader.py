@@ -0,0 +1,180 @@
+"""
+Process-pool bulk loader for the MongoDB collections.
+
+Every CSV file is split into byte ranges aligned on line boundaries, so a collection is parsed by as
+many processes as there are ranges instead of one thread per file. Each worker process keeps a single
+MongoClient (its own connection pool) and sends unordered insert_many batches.
+
+Documents already in the collection are skipped by the unique id index (see db/mongo_indexes.py)
+instead of being looked up in memory, so memory use does not grow with the collection size.
+"""
+import concurrent.futures
+import multiprocessing
+import os
+import time
+
+from pymongo import MongoClient
+from pymongo.errors import BulkWriteError
+
+from db.initialize_db.ldbc_csv import DEFAULT_BLOCK_SIZE, read_documents
+from db.person_activity import PERSON_ACTIVITY_COLLECTION, activity_updates
+
+
+DEFAULT_CHUNK_BYTES = 32 * 1024 * 1024
+
+DUPLICATE_KEY_ERROR = 11000
+
+# MongoClient of the current worker process, created by _init_worker
+_worker_client = None
+
+
+def insert_new_documents(collection, records):
+    """
+    Inserts records with an unordered insert_many. Records whose id is already in the collection are
+    rejected by the unique id index and skipped; any other write error is raised.
+    Returns the records actually inserted.
+    """
+    if not records:
+        return []
+    try:
+        collection.insert_many(records, ordered=False)
+        return records
+    except BulkWriteError as e:
+        write_errors = e.details.get("writeErrors", [])
+        if not write_errors or any(error["code"] != DUPLICATE_KEY_ERROR for error in write_errors):
+            raise
+        rejected = {error["index"] for error in write_errors}
+        return [record for position, record in enumerate(records) if position not in rejected]
+
+
+def byte_range_chunks(csv_path, chunk_bytes=DEFAULT_CHUNK_BYTES):
+    """
+    Splits a CSV file into (start, end) byte ranges of about chunk_bytes, excluding the header line.
+    Every range starts right after a newline, so it holds whole rows; this assumes no quoted field
+    spans several lines, which holds for the LDBC pipe-separated files.
+    """
+    size = os.path.getsize(csv_path)
+    ranges = []
+    with open(csv_path, "rb") as f:
+        f.readline()
+        start = f.tell()
+        while start < size:
+            f.seek(min(start + chunk_bytes, size))
+            f.readline()  # Move to the end of the row the boundary fell into
+            end = f.tell()
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def read_byte_range(csv_path, start, end):
+    """The header line of a CSV file followed by one of its byte ranges, ready for read_documents"""
+    with open(csv_path, "rb") as f:
+        header = f.readline()
+        f.seek(start)
+        return header + f.read(end - start)
+
+
+def _init_worker(mongodb_uri):
+    global _worker_client
+    _worker_client = MongoClient(
+        mongodb_uri,
+        connectTimeoutMS=120000,  # 120 seconds connection timeout
+        socketTimeoutMS=180000  # 180 seconds socket (read/write) timeout
+    )
+
+
+def _load_byte_range(collection_name, csv_path, start, end, block_size):
+    """
+    Parses one byte range of a CSV file and inserts it; returns (rows parsed, documents inserted).
+    The person_activity $inc of a batch is sent after its insert_many and is not atomic with it:
+    init_mongodb.load_mongodb rebuilds the store when a range fails or a load is resumed.
+    """
+    db = _worker_client.get_database()
+    rows = inserted = 0
+    for records in read_documents(read_byte_range(csv_path, start, end), block_size):
+        rows += len(records)
+        new_records = insert_new_documents(db[collection_name], records)
+        inserted += len(new_records)
+
+        # Keep the person_activity counters in sync with the inserted documents
+        activity_requests = activity_updates(collection_name, new_records)
+        if activity_requests:
+            db[PERSON_ACTIVITY_COLLECTION].bulk_write(activity_requests, ordered=False)
+    return rows, inserted
+
+
+def byte_range_unit(collection_name, csv_path, start, end):
+    """Checkpoint unit of a byte range (see ingestion_manifest.py)"""
+    return f"{collection_name}:{csv_path}:{start}-{end}"
+
+
+def load_collection_with_processes(collection_name, csv_paths, mongodb_uri, max_workers=None,
+                                   chunk_bytes=DEFAULT_CHUNK_BYTES, block_size=DEFAULT_BLOCK_SIZE,
+                                   checkpoint=None):
+    """
+    Loads CSV files into a MongoDB collection with a process pool working on byte ranges,
+    skipping the documents already loaded. Returns the load statistics, including rows/sec.
+
+    Args:
+        max_workers: Number of worker processes. If None, defaults to os.cpu_count()
+        checkpoint: Optional ingestion_manifest.Checkpoint; byte ranges already done are skipped
+                    and every range is recorded once loaded
+    """
+    print(f"######################################################################")
+    print(f"################# STARTING LOAD INTO: {collection_name.upper()} (processes) #################")
+    print(f"######################################################################")
+
+    start_time = time.time()
+    tasks = [
+        (csv_path, start, end)
+        for csv_path in csv_paths
+        for start, end in byte_range_chunks(csv_path, chunk_bytes)
+    ]
+    print(f"{len(csv_paths)} file(s) split into {len(tasks)} byte range(s) for {collection_name}.")
+    if checkpoint:
+        tasks = [task for task in tasks if not checkpoint.is_done(byte_range_unit(collection_name, *task))]
+        print(f"{len(tasks)} byte range(s) of {collection_name} left to load.")
+
+    rows = inserted = failed_ranges = 0
+    # spawn: pymongo clients must not be inherited through fork
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers,
+                                                mp_context=multiprocessing.get_context("spawn"),
+                                                initializer=_init_worker,
+                                                initargs=(mongodb_uri,)) as executor:
+        future_to_range = {
+            executor.submit(_load_byte_range, collection_name, csv_path, start, end, block_size):
+                (csv_path, start, end)
+            for csv_path, start, end in tasks
+        }
+        for future in concurrent.futures.as_completed(future_to_range):
+            csv_path, start, end = future_to_range[future]
+            try:
+                range_rows, range_inserted = future.result()
+                rows += range_rows
+                inserted += range_inserted
+                if checkpoint:
+                    checkpoint.mark_done(byte_range_unit(collection_name, csv_path, start, end),
+                                         rows=range_rows, inserted=range_inserted)
+            except Exception as e:
+                failed_ranges += 1
+                print(f"Byte range {start}-{end} of {csv_path} generated an exception: {e}")
+
+    duration = time.time() - start_time
+    stats = {
+        "collection": collection_name,
+        "engine": "processes",
+        "rows": rows,
+        "inserted": inserted,
+        "duplicates": rows - inserted,
+        "failed_ranges": failed_ranges,
+        "seconds": round(duration, 2),
+        "rows_per_sec": round(rows / duration) if duration else None
+    }
+
+    print(f"++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++")
+    print(f"+++++++ {collection_name.upper()} COLLECTION UPDATED SUCCESSFULLY +++++++")
+    print(f"+++++++ Total inserted: {inserted}, Already present: {stats['duplicates']}, "
+          f"Time: {duration:.2f} seconds, Rows/sec: {stats['rows_per_sec']} +++++++")
+    print(f"++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++")
+    return stats
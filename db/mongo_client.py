@@ -1,5 +1,42 @@
 from motor.motor_asyncio import AsyncIOMotorClient
 from config import settings
+from db.pools import MongoPoolListener, mongo_pool_options, watch_pool
+from utils.tracing import MongoCommandTracer
 
-client = AsyncIOMotorClient(settings.mongodb_uri)
-db = client.get_default_database()
+mongo_pool_listener = watch_pool("mongo", MongoPoolListener(settings.mongo_max_pool_size))
+
+# Created in the application lifespan (open_mongo_client), in every worker process;
+# read them as mongo_client.client / mongo_client.db, not imported by name
+client = None
+db = None
+
+
+def create_mongo_client():
+    """Motor client with the pool size and wait queue timeout of the settings (see db/pools.py)"""
+    return AsyncIOMotorClient(
+        settings.mongodb_uri,
+        **mongo_pool_options(),
+        event_listeners=[mongo_pool_listener] + ([MongoCommandTracer()] if settings.tracing_enabled else [])
+    )
+
+
+def open_mongo_client():
+    """Creates the client of this process; it connects in the background, see connect_mongo_client"""
+    global client, db
+    client = create_mongo_client()
+    db = client.get_default_database()
+
+
+async def connect_mongo_client():
+    """Waits for a first connection (the pool then keeps MONGO_MIN_POOL_SIZE connections open)"""
+    await client.admin.command("ping")
+    print(f"MongoDB client connected (maxPoolSize={settings.mongo_max_pool_size}).")
+
+
+# Function to close the client on application shutdown
+def close_mongo_client():
+    global client, db
+    if client is not None:
+        client.close()
+        client = db = None
+        print("MongoDB client closed.")
@@ -0,0 +1,270 @@
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+
+# Secondary indexes derived from the filters, lookups and groupings used by the query routers.
+# "used_by" lists the router queries (see routers/*.py) that rely on each index; ROUTER_QUERIES below
+# repeats those filters and sorts, and index_report explains them to check that the plans use the indexes.
+# The id indexes are unique: reloading a CSV relies on them to skip documents already loaded.
+INDEX_SPECS = [
+    # --- person ---
+    {"collection": "person", "name": "person_id_index",
+     "keys": [("id", ASCENDING)], "options": {"unique": True}, "used_by": [3, 4, 5, 6]},
+    # email is an array field, so this is a multikey index
+    {"collection": "person", "name": "email_index",
+     "keys": [("email", ASCENDING)], "used_by": [1, 2, 3, 5, 7]},
+    # Compound index on city + id: covers the "people in the same city" projection of query 7
+    {"collection": "person", "name": "location_city_id_index",
+     "keys": [("LocationCityId", ASCENDING), ("id", ASCENDING)], "used_by": [7]},
+
+    # --- post ---
+    {"collection": "post", "name": "post_id_index",
+     "keys": [("id", ASCENDING)], "options": {"unique": True}, "used_by": [3, 5]},
+    # Compound index on creator + id: covers the per-creator $group of query 8
+    {"collection": "post", "name": "post_creator_id_index",
+     "keys": [("CreatorPersonId", ASCENDING), ("id", ASCENDING)], "used_by": [1, 3, 8]},
+
+    # --- comment ---
+    {"collection": "comment", "name": "comment_id_index",
+     "keys": [("id", ASCENDING)], "options": {"unique": True}, "used_by": [5]},
+    {"collection": "comment", "name": "comment_parent_post_creator_index",
+     "keys": [("ParentPostId", ASCENDING), ("CreatorPersonId", ASCENDING)], "used_by": [3, 5]},
+    {"collection": "comment", "name": "comment_creator_index",
+     "keys": [("CreatorPersonId", ASCENDING)], "used_by": [5]},
+
+    # --- forum ---
+    {"collection": "forum", "name": "forum_id_index",
+     "keys": [("id", ASCENDING)], "options": {"unique": True}, "used_by": [2, 3, 4, 9]},
+
+    # --- person_activity (see db/person_activity.py) ---
+    # Unique, required by the $merge stages that rebuild the store
+    {"collection": "person_activity", "name": "person_activity_id_index",
+     "keys": [("id", ASCENDING)], "options": {"unique": True}, "used_by": []},
+    # Covers the active-people-per-city aggregation of query 6
+    {"collection": "person_activity", "name": "person_activity_count_city_index",
+     "keys": [("activityCount", ASCENDING), ("LocationCityId", ASCENDING)], "used_by": [6]},
+]
+
+
+# Filters, sorts and $match stages of the router queries, with sample values, and the indexes their
+# winning plan must use. Keep them in step with routers/*.py.
+_SAMPLE_EMAIL = "sample@example.com"
+_SAMPLE_IDS = [0, 1]
+
+ROUTER_QUERIES = [
+    {"query": 1, "collection": "person", "indexes": ["email_index"],
+     "filter": {"email": {"$in": [_SAMPLE_EMAIL]}}},
+    {"query": 1, "collection": "post", "indexes": ["post_creator_id_index"],
+     "filter": {"CreatorPersonId": 0, "id": {"$gt": 0}}, "sort": [("id", ASCENDING)]},
+    {"query": 2, "collection": "forum", "indexes": ["forum_id_index"],
+     "filter": {"id": {"$in": _SAMPLE_IDS}}},
+    {"query": 3, "collection": "post", "indexes": ["post_creator_id_index"],
+     "filter": {"CreatorPersonId": 0}},
+    {"query": 3, "collection": "comment", "indexes": ["comment_parent_post_creator_index"],
+     "filter": {"ParentPostId": {"$in": _SAMPLE_IDS}}},
+    {"query": 3, "collection": "person", "indexes": ["person_id_index"],
+     "filter": {"id": {"$in": _SAMPLE_IDS}}},
+    {"query": 5, "collection": "comment", "indexes": ["comment_parent_post_creator_index"],
+     "filter": {"CreatorPersonId": {"$in": _SAMPLE_IDS}, "ParentPostId": {"$in": _SAMPLE_IDS}}},
+    {"query": 6, "collection": "person_activity", "indexes": ["person_activity_count_city_index"],
+     "pipeline": [{"$match": {"activityCount": {"$gte": 5}, "LocationCityId": {"$ne": None}}},
+                  {"$group": {"_id": "$LocationCityId", "activeUserCount": {"$sum": 1}}}]},
+    {"query": 7, "collection": "person", "indexes": ["location_city_id_index"],
+     "filter": {"LocationCityId": 0}, "projection": {"id": 1, "_id": 0}},
+    {"query": 8, "collection": "post", "indexes": ["post_creator_id_index"],
+     "pipeline": [{"$match": {"CreatorPersonId": {"$in": _SAMPLE_IDS}}},
+                  {"$group": {"_id": "$CreatorPersonId", "post_count": {"$sum": 1}}}]},
+    {"query": 9, "collection": "forum", "indexes": ["forum_id_index"],
+     "filter": {"id": {"$in": _SAMPLE_IDS}}, "sort": [("id", ASCENDING)]},
+]
+
+
+def _index_key(keys):
+    return tuple(
+        (field, direction if isinstance(direction, str) else int(direction))
+        for field, direction in keys
+    )
+
+
+def _existing_index_keys(collection):
+    """Returns {key tuple: index name} for the indexes currently defined on a collection."""
+    return {
+        _index_key(info["key"]): name
+        for name, info in collection.index_information().items()
+    }
+
+
+def _unique_index_keys(collection):
+    return {
+        _index_key(info["key"])
+        for info in collection.index_information().values()
+        if info.get("unique")
+    }
+
+
+def _convert_to_unique(db, collection_name, index_name):
+    """
+    Makes an existing index unique in place (collMod, MongoDB 6.0+). Fails, leaving the index
+    as it was, when the collection already holds duplicate values.
+    """
+    db.command("collMod", collection_name, index={"name": index_name, "prepareUnique": True})
+    try:
+        db.command("collMod", collection_name, index={"name": index_name, "unique": True})
+    except OperationFailure:
+        db.command("collMod", collection_name, index={"name": index_name, "prepareUnique": False})
+        raise
+
+
+def index_models(collection_name):
+    """IndexModels of the INDEX_SPECS of one collection"""
+    return [
+        IndexModel(spec["keys"], name=spec["name"], **spec.get("options", {}))
+        for spec in INDEX_SPECS
+        if spec["collection"] == collection_name
+    ]
+
+
+def ensure_indexes(db):
+    """
+    Creates every index in INDEX_SPECS that does not exist yet (sync pymongo Database).
+    Indexes already present with the same keys are left untouched, so this is safe to run
+    at every startup; the only exception is an index declared unique that exists as non-unique,
+    which is converted in place. Returns the names of the indexes that were created or converted.
+    """
+    created = []
+    specs_by_collection = {}
+    for spec in INDEX_SPECS:
+        specs_by_collection.setdefault(spec["collection"], []).append(spec)
+
+    for collection_name, specs in specs_by_collection.items():
+        collection = db[collection_name]
+        existing = _existing_index_keys(collection)
+        missing = [
+            IndexModel(spec["keys"], name=spec["name"], **spec.get("options", {}))
+            for spec in specs
+            if _index_key(spec["keys"]) not in existing
+        ]
+        if missing:
+            created.extend(collection.create_indexes(missing))
+
+        unique_keys = _unique_index_keys(collection)
+        for spec in specs:
+            key = _index_key(spec["keys"])
+            if spec.get("options", {}).get("unique") and key in existing and key not in unique_keys:
+                try:
+                    _convert_to_unique(db, collection_name, existing[key])
+                    created.append(existing[key])
+                except OperationFailure as e:
+                    print(f"WARNING: Could not make index {existing[key]} on {collection_name} unique "
+                          f"(duplicate values?): {e}")
+
+    return created
+
+
+def has_unique_index(collection, field):
+    """True if the collection has a unique index on the given field alone (sync pymongo Collection)."""
+    return ((field, 1),) in _unique_index_keys(collection)
+
+
+def _index_usage(collection):
+    """Returns {index name: ops since server start} using $indexStats, or None if not permitted."""
+    try:
+        return {
+            stat["name"]: stat["accesses"]["ops"]
+            for stat in collection.aggregate([{"$indexStats": {}}])
+        }
+    except OperationFailure:
+        return None
+
+
+def _plan_index_names(explain, in_winning_plan=False):
+    """Collects the indexName of every stage of the winning plans found in an explain output"""
+    names = set()
+    if isinstance(explain, dict):
+        if in_winning_plan and "indexName" in explain:
+            names.add(explain["indexName"])
+        for key, value in explain.items():
+            names |= _plan_index_names(value, in_winning_plan or key == "winningPlan")
+    elif isinstance(explain, list):
+        for value in explain:
+            names |= _plan_index_names(value, in_winning_plan)
+    return names
+
+
+def _explain(db, check):
+    if "pipeline" in check:
+        return db.command("explain", {"aggregate": check["collection"], "pipeline": check["pipeline"], "cursor": {}},
+                          verbosity="queryPlanner")
+    cursor = db[check["collection"]].find(check["filter"], check.get("projection"))
+    if check.get("sort"):
+        cursor = cursor.sort(check["sort"])
+    return cursor.explain()
+
+
+def check_router_queries(db):
+    """Explains every ROUTER_QUERIES entry (sync pymongo Database) and reports the indexes its plan uses"""
+    checks = []
+    for check in ROUTER_QUERIES:
+        used = _plan_index_names(_explain(db, check))
+        missing = [name for name in check["indexes"] if name not in used]
+        checks.append({
+            "query": check["query"],
+            "collection": check["collection"],
+            "expected_indexes": check["indexes"],
+            "plan_indexes": sorted(used),
+            "status": "uses indexes" if not missing else f"not using {', '.join(missing)}"
+        })
+    return checks
+
+
+def index_report(db):
+    """
+    Compares INDEX_SPECS with the indexes defined on the database (sync pymongo Database).
+    Every expected index is reported as "present", "unused" (present but never used since
+    the server started), "not unique" (declared unique but created without the option) or "missing".
+    Indexes not declared in INDEX_SPECS are listed as extra. Every router query of ROUTER_QUERIES is
+    explained and reported with the indexes its winning plan uses. Nothing is changed.
+    """
+    report = {"expected": [], "extra": []}
+    collection_names = sorted({spec["collection"] for spec in INDEX_SPECS})
+
+    for collection_name in collection_names:
+        collection = db[collection_name]
+        existing = _existing_index_keys(collection)
+        unique_keys = _unique_index_keys(collection)
+        usage = _index_usage(collection) or {}
+        declared_keys = set()
+
+        for spec in (s for s in INDEX_SPECS if s["collection"] == collection_name):
+            key = _index_key(spec["keys"])
+            declared_keys.add(key)
+            actual_name = existing.get(key)
+            ops = usage.get(actual_name) if actual_name else None
+            if actual_name is None:
+                status = "missing"
+            elif spec.get("options", {}).get("unique") and key not in unique_keys:
+                status = "not unique"
+            elif ops == 0:
+                status = "unused"
+            else:
+                status = "present"
+            report["expected"].append({
+                "collection": collection_name,
+                "name": spec["name"],
+                "keys": [field for field, _ in spec["keys"]],
+                "used_by_queries": spec["used_by"],
+                "status": status,
+                "ops": ops
+            })
+
+        for key, name in existing.items():
+            if key not in declared_keys and name != "_id_":
+                report["extra"].append({
+                    "collection": collection_name,
+                    "name": name,
+                    "keys": [field for field, _ in key],
+                    "ops": usage.get(name)
+                })
+
+    report["queries"] = check_router_queries(db)
+    return report
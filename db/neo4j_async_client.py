@@ -0,0 +1,41 @@
+from neo4j import AsyncGraphDatabase
+from config import settings
+from db.pools import Neo4jPoolWatcher, neo4j_pool_options, watch_pool
+from utils.tracing import TracedAsyncDriver
+
+# Async driver used by the query routers, so Cypher calls never block the event loop.
+# Created in the application lifespan (open_async_driver), in every worker process;
+# read it as neo4j_async_client.async_driver, not imported by name
+async_driver = None
+
+
+def create_async_driver():
+    """Async driver with the pool size and acquisition timeout of the settings, traced if enabled"""
+    driver = AsyncGraphDatabase.driver(
+        settings.neo4j_uri,
+        auth=(settings.neo4j_user, settings.neo4j_password),
+        **neo4j_pool_options()
+    )
+    watch_pool("neo4j", Neo4jPoolWatcher(driver, settings.neo4j_max_connection_pool_size))
+    return TracedAsyncDriver(driver) if settings.tracing_enabled else driver
+
+
+def open_async_driver():
+    """Creates the driver of this process; it connects on first use, see connect_async_driver"""
+    global async_driver
+    async_driver = create_async_driver()
+
+
+async def connect_async_driver():
+    """Opens a first connection, failing early if Neo4j is unreachable"""
+    await async_driver.verify_connectivity()
+    print(f"Neo4j async driver connected (max pool size={settings.neo4j_max_connection_pool_size}).")
+
+
+# Function to close the async driver on application shutdown
+async def close_async_driver():
+    global async_driver
+    if async_driver is not None:
+        await async_driver.close()
+        async_driver = None
+        print("Neo4j async driver closed.")
@@ -1,8 +1,31 @@
 from neo4j import GraphDatabase
 from config import settings
+from db.pools import Neo4jPoolWatcher, neo4j_pool_options, watch_pool
 
-driver = GraphDatabase.driver(
-    settings.neo4j_uri,
-    auth=(settings.neo4j_user, settings.neo4j_password)
-)
+# Sync driver of the health check, created in the application lifespan (open_driver);
+# read it as neo4j_client.driver, not imported by name
+driver = None
 
+
+def create_driver():
+    driver = GraphDatabase.driver(
+        settings.neo4j_uri,
+        auth=(settings.neo4j_user, settings.neo4j_password),
+        **neo4j_pool_options()
+    )
+    watch_pool("neo4j_sync", Neo4jPoolWatcher(driver, settings.neo4j_max_connection_pool_size))
+    return driver
+
+
+def open_driver():
+    global driver
+    driver = create_driver()
+
+
+# Function to close the driver on application shutdown
+def close_driver():
+    global driver
+    if driver is not None:
+        driver.close()
+        driver = None
+        print("Neo4j driver closed.")
@@ -0,0 +1,90 @@
+from collections import Counter
+
+from pymongo import UpdateOne
+
+from db.mongo_indexes import index_models
+
+
+# Materialized per-person activity counters, served by /find-cities/by-activeuser (query 6).
+# One document per person: {id, postCount, commentCount, activityCount, LocationCityId}
+PERSON_ACTIVITY_COLLECTION = "person_activity"
+# Scratch collection of rebuild_person_activity, renamed over PERSON_ACTIVITY_COLLECTION when complete
+PERSON_ACTIVITY_BUILD_COLLECTION = "person_activity_rebuild"
+
+# A person is "active" with at least this many posts + comments
+ACTIVE_USER_MIN_ACTIVITY = 5
+
+_COUNTER_FIELDS = {"post": "postCount", "comment": "commentCount"}
+
+
+def activity_updates(collection_name, records):
+    """
+    Builds the upserts that keep person_activity in sync with a batch of documents just inserted
+    into post, comment or person. Returns an empty list for the other collections.
+    """
+    if collection_name in _COUNTER_FIELDS:
+        counter_field = _COUNTER_FIELDS[collection_name]
+        counts = Counter(r["CreatorPersonId"] for r in records if r.get("CreatorPersonId") is not None)
+        return [
+            UpdateOne(
+                {"id": person_id},
+                {"$inc": {counter_field: count, "activityCount": count}},
+                upsert=True
+            )
+            for person_id, count in counts.items()
+        ]
+
+    if collection_name == "person":
+        return [
+            UpdateOne(
+                {"id": r["id"]},
+                {"$set": {"LocationCityId": r.get("LocationCityId")}},
+                upsert=True
+            )
+            for r in records
+        ]
+
+    return []
+
+
+def rebuild_person_activity(db):
+    """
+    Recomputes person_activity from scratch with server-side $merge pipelines (sync pymongo Database).
+    Used when the post/comment/person collections were loaded before the store existed.
+    The counters are aggregated into a scratch collection (with the person_activity indexes) that then
+    replaces the live one with renameCollection(dropTarget=True), so the active-users query keeps
+    reading the previous counters until the rebuild is complete.
+    """
+    build = db[PERSON_ACTIVITY_BUILD_COLLECTION]
+    build.drop()
+    # The unique index on id is required by the $merge stages
+    build.create_indexes(index_models(PERSON_ACTIVITY_COLLECTION))
+
+    for collection_name, counter_field in _COUNTER_FIELDS.items():
+        other_field = "commentCount" if counter_field == "postCount" else "postCount"
+        db[collection_name].aggregate([
+            {"$group": {"_id": "$CreatorPersonId", "count": {"$sum": 1}}},
+            {"$project": {"_id": 0, "id": "$_id", counter_field: "$count", other_field: {"$literal": 0},
+                          "activityCount": "$count"}},
+            {"$merge": {
+                "into": PERSON_ACTIVITY_BUILD_COLLECTION,
+                "on": "id",
+                "whenMatched": [{"$set": {
+                    counter_field: "$$new." + counter_field,
+                    "activityCount": {"$add": ["$" + other_field, "$$new." + counter_field]}
+                }}],
+                "whenNotMatched": "insert"
+            }}
+        ])
+
+    db.person.aggregate([
+        {"$project": {"_id": 0, "id": 1, "LocationCityId": 1}},
+        {"$merge": {
+            "into": PERSON_ACTIVITY_BUILD_COLLECTION,
+            "on": "id",
+            "whenMatched": [{"$set": {"LocationCityId": "$$new.LocationCityId"}}],
+            "whenNotMatched": "discard"
+        }}
+    ])
+
+    build.rename(PERSON_ACTIVITY_COLLECTION, dropTarget=True)
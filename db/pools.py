@@ -0,0 +1,265 @@
+"""
+Connection pools of the API: sizes and timeouts from config.Settings, and their telemetry.
+
+- mongo: the Motor client (MONGO_MAX_POOL_SIZE, MONGO_MIN_POOL_SIZE, MONGO_WAIT_QUEUE_TIMEOUT_MS);
+- neo4j: the async driver of the query routers, neo4j_sync: the driver of the health check
+  (NEO4J_MAX_CONNECTION_POOL_SIZE, NEO4J_CONNECTION_ACQUISITION_TIMEOUT);
+- postgres: the psycopg 3 async pool of the query routers (POSTGRES_POOL_MIN_SIZE, POSTGRES_POOL_MAX_SIZE,
+  POSTGRES_POOL_TIMEOUT, POSTGRES_POOL_MAX_WAITING), postgres_sync: the psycopg2 pool of the health
+  check (POSTGRES_SYNC_POOL_MIN_SIZE, POSTGRES_SYNC_POOL_MAX_SIZE).
+
+Every pool is watched and exported on GET /metrics (snapshot on GET /admin/pools):
+- maadb_pool_connections{pool,state="in_use"|"idle"} and maadb_pool_max_size{pool};
+- maadb_pool_waiting{pool}: requests waiting for a connection right now;
+- maadb_pool_wait_seconds_total and maadb_pool_acquisitions_total{pool}: time spent acquiring
+  connections and number of acquisitions (average wait = ratio of their rates);
+- maadb_pool_acquire_failures_total{pool}: acquisitions that failed, e.g. on the acquisition timeout.
+Values a driver does not expose are left out.
+"""
+import inspect
+import threading
+import time
+
+from pymongo import monitoring
+
+from config import settings
+from utils.tracing import METRICS, CallbackMetric
+
+
+POOLS = {}  # pool name -> watcher with a snapshot() method
+
+
+def watch_pool(name, watcher):
+    POOLS[name] = watcher
+    return watcher
+
+
+def pool_snapshots():
+    """{pool name: {"in_use", "idle", "max_size", "waiting", "wait_seconds_total", ...}}"""
+    return {name: watcher.snapshot() for name, watcher in POOLS.items()}
+
+
+# --- Settings ---
+def mongo_pool_options():
+    return {
+        "maxPoolSize": settings.mongo_max_pool_size,
+        "minPoolSize": settings.mongo_min_pool_size,
+        "waitQueueTimeoutMS": settings.mongo_wait_queue_timeout_ms,
+    }
+
+
+def neo4j_pool_options():
+    return {
+        "max_connection_pool_size": settings.neo4j_max_connection_pool_size,
+        "connection_acquisition_timeout": settings.neo4j_connection_acquisition_timeout,
+    }
+
+
+def postgres_pool_options():
+    return {
+        "min_size": settings.postgres_pool_min_size,
+        "max_size": settings.postgres_pool_max_size,
+        "timeout": settings.postgres_pool_timeout,
+        "max_waiting": settings.postgres_pool_max_waiting,
+    }
+
+
+# --- Watchers ---
+class _AcquisitionCounters:
+    """Acquisitions in progress and their cumulated time, for drivers that only tell when they start and end."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.wait_seconds_total = 0.0
+        self.acquisitions_total = 0
+        self.acquire_failures_total = 0
+
+    def started(self):
+        with self._lock:
+            self.waiting += 1
+
+    def finished(self, seconds, failed=False):
+        with self._lock:
+            self.waiting -= 1
+            self.wait_seconds_total += seconds
+            if failed:
+                self.acquire_failures_total += 1
+            else:
+                self.acquisitions_total += 1
+
+    def counters(self):
+        with self._lock:
+            return {
+                "waiting": self.waiting,
+                "wait_seconds_total": round(self.wait_seconds_total, 6),
+                "acquisitions_total": self.acquisitions_total,
+                "acquire_failures_total": self.acquire_failures_total,
+            }
+
+
+class MongoPoolListener(monitoring.ConnectionPoolListener):
+    """Connection pool events of a MongoDB client (every server of the deployment summed up)."""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._acquisitions = _AcquisitionCounters()
+        self._lock = threading.Lock()
+        self._open = 0
+        self._in_use = 0
+
+    def snapshot(self):
+        with self._lock:
+            in_use, idle = self._in_use, max(self._open - self._in_use, 0)
+        return {"in_use": in_use, "idle": idle, "max_size": self.max_size, **self._acquisitions.counters()}
+
+    def connection_created(self, event):
+        with self._lock:
+            self._open += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self._open -= 1
+
+    def connection_check_out_started(self, event):
+        self._acquisitions.started()
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self._in_use += 1
+        self._acquisitions.finished(event.duration or 0.0)
+
+    def connection_check_out_failed(self, event):
+        self._acquisitions.finished(event.duration or 0.0, failed=True)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self._in_use -= 1
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+
+class Neo4jPoolWatcher:
+    """
+    Pool of a Neo4j driver (sync or async). The driver exposes no pool statistics, so this reads its
+    internal pool and times its acquire(); if a driver version changes them, the values are left out.
+    """
+
+    def __init__(self, driver, max_size):
+        self.max_size = max_size
+        self._acquisitions = _AcquisitionCounters()
+        self._pool = getattr(driver, "_pool", None)
+        acquire = getattr(self._pool, "acquire", None)
+        if acquire is None:
+            self._pool = None
+        elif inspect.iscoroutinefunction(acquire):
+            async def timed_acquire(*args, **kwargs):
+                self._acquisitions.started()
+                start = time.perf_counter()
+                try:
+                    connection = await acquire(*args, **kwargs)
+                except BaseException:
+                    self._acquisitions.finished(time.perf_counter() - start, failed=True)
+                    raise
+                self._acquisitions.finished(time.perf_counter() - start)
+                return connection
+            self._pool.acquire = timed_acquire
+        else:
+            def timed_acquire(*args, **kwargs):
+                self._acquisitions.started()
+                start = time.perf_counter()
+                try:
+                    connection = acquire(*args, **kwargs)
+                except BaseException:
+                    self._acquisitions.finished(time.perf_counter() - start, failed=True)
+                    raise
+                self._acquisitions.finished(time.perf_counter() - start)
+                return connection
+            self._pool.acquire = timed_acquire
+
+    def snapshot(self):
+        if self._pool is None:
+            return {"in_use": None, "idle": None, "max_size": self.max_size, "waiting": None,
+                    "wait_seconds_total": None, "acquisitions_total": None, "acquire_failures_total": None}
+        try:
+            addresses = list(self._pool.connections)
+            total = sum(len(self._pool.connections.get(address, ())) for address in addresses)
+            in_use = sum(self._pool.in_use_connection_count(address) for address in addresses)
+        except (AttributeError, TypeError):
+            total = in_use = None
+        return {"in_use": in_use, "idle": total - in_use if total is not None else None, "max_size": self.max_size,
+                **self._acquisitions.counters()}
+
+
+class PostgresPoolWatcher:
+    """psycopg_pool pool: its own statistics (counters since the pool was created)."""
+
+    def __init__(self, pool):
+        self._pool = pool
+
+    def snapshot(self):
+        stats = self._pool.get_stats()
+        # Before open() pool_size already counts the min_size connections to be created
+        size = 0 if self._pool.closed else stats["pool_size"]
+        return {
+            "in_use": max(size - stats["pool_available"], 0),
+            "idle": stats["pool_available"],
+            "max_size": stats["pool_max"],
+            "waiting": stats.get("requests_waiting", 0),
+            "wait_seconds_total": stats.get("requests_wait_ms", 0) / 1000,
+            "acquisitions_total": stats.get("requests_num", 0),
+            "acquire_failures_total": stats.get("requests_errors", 0),
+        }
+
+
+class Psycopg2PoolWatcher:
+    """psycopg2 SimpleConnectionPool: it never waits (getconn fails when the pool is exhausted)."""
+
+    def __init__(self, pool):
+        self._pool = pool
+
+    def snapshot(self):
+        return {"in_use": len(self._pool._used), "idle": len(self._pool._pool), "max_size": self._pool.maxconn,
+                "waiting": 0, "wait_seconds_total": None, "acquisitions_total": None,
+                "acquire_failures_total": None}
+
+
+# --- Metrics ---
+def _collect(*keys):
+    def collect():
+        samples = []
+        for name, snapshot in pool_snapshots().items():
+            for key in keys:
+                if snapshot.get(key) is not None:
+                    samples.append(((name, key) if len(keys) > 1 else (name,), snapshot[key]))
+        return samples
+    return collect
+
+
+METRICS.extend([
+    CallbackMetric("maadb_pool_connections", "Connections of the pool, by state.", "gauge",
+                   ("pool", "state"), _collect("in_use", "idle")),
+    CallbackMetric("maadb_pool_max_size", "Maximum number of connections of the pool.", "gauge",
+                   ("pool",), _collect("max_size")),
+    CallbackMetric("maadb_pool_waiting", "Requests waiting for a connection.", "gauge",
+                   ("pool",), _collect("waiting")),
+    CallbackMetric("maadb_pool_wait_seconds_total", "Time spent acquiring connections.", "counter",
+                   ("pool",), _collect("wait_seconds_total")),
+    CallbackMetric("maadb_pool_acquisitions_total", "Connections acquired from the pool.", "counter",
+                   ("pool",), _collect("acquisitions_total")),
+    CallbackMetric("maadb_pool_acquire_failures_total", "Failed connection acquisitions (e.g. timeouts).",
+                   "counter", ("pool",), _collect("acquire_failures_total")),
+])
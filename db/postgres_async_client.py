@@ -0,0 +1,101 @@
+import asyncio
+import contextlib
+
+from psycopg import AsyncConnection
+from psycopg.conninfo import make_conninfo
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
+from config import settings
+from db.pools import PostgresPoolWatcher, postgres_pool_options, watch_pool
+from utils.tracing import TracedAsyncCursor
+
+
+# Connection string for psycopg 3
+CONNINFO = make_conninfo(
+    dbname=settings.postgres_db,
+    user=settings.postgres_user,
+    password=settings.postgres_password,
+    host=settings.postgres_host,
+    port=settings.postgres_port
+)
+
+# Rows are returned as dicts; the cursors trace every query (see utils/tracing.py)
+POOL_CONNECTION_KWARGS = {"row_factory": dict_row}
+if settings.tracing_enabled:
+    POOL_CONNECTION_KWARGS["cursor_factory"] = TracedAsyncCursor
+
+# Created and opened in the application lifespan (open_postgres_async_pool), in every worker process;
+# read it as postgres_async_client.postgres_async_pool, not imported by name
+postgres_async_pool = None
+
+
+def create_postgres_async_pool():
+    """Async pool with the sizes and timeouts of the settings, not opened yet"""
+    pool = AsyncConnectionPool(
+        conninfo=CONNINFO,
+        **postgres_pool_options(),
+        kwargs=POOL_CONNECTION_KWARGS,
+        open=False
+    )
+    watch_pool("postgres", PostgresPoolWatcher(pool))
+    return pool
+
+
+async def open_postgres_async_pool():
+    global postgres_async_pool
+    postgres_async_pool = create_postgres_async_pool()
+    await postgres_async_pool.open()
+    print(f"PostgreSQL async connection pool opened "
+          f"(min={settings.postgres_pool_min_size}, max={settings.postgres_pool_max_size}).")
+
+
+class LazyAsyncConnection:
+    """
+    Stands for a pool connection that is only checked out on first use, so an endpoint answered
+    from the query cache never takes one. Supports what the routers use: cursor(), commit(), rollback().
+    """
+
+    def __init__(self, exit_stack):
+        self._exit_stack = exit_stack
+        self._lock = asyncio.Lock()  # stages of a request may run concurrently
+        self._conn = None
+
+    async def connection(self) -> AsyncConnection:
+        async with self._lock:
+            if self._conn is None:
+                self._conn = await self._exit_stack.enter_async_context(postgres_async_pool.connection())
+        return self._conn
+
+    @contextlib.asynccontextmanager
+    async def cursor(self, *args, **kwargs):
+        conn = await self.connection()
+        async with conn.cursor(*args, **kwargs) as cursor:
+            yield cursor
+
+    async def commit(self):
+        if self._conn is not None:
+            await self._conn.commit()
+
+    async def rollback(self):
+        if self._conn is not None:
+            await self._conn.rollback()
+
+
+async def get_async_db_connection():
+    """
+    FastAPI dependency that provides an async PostgreSQL connection (psycopg 3) from the pool,
+    checked out on first use (see LazyAsyncConnection). Rows are returned as dicts. The transaction
+    is committed, or rolled back on error, and the connection is returned to the pool when the
+    request is done.
+    """
+    async with contextlib.AsyncExitStack() as exit_stack:
+        yield LazyAsyncConnection(exit_stack)
+
+
+# Function to close the pool on application shutdown
+async def close_postgres_async_pool():
+    global postgres_async_pool
+    if postgres_async_pool is not None:
+        await postgres_async_pool.close()
+        postgres_async_pool = None
+        print("PostgreSQL async connection pool closed.")
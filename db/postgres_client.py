@@ -1,6 +1,7 @@
 import psycopg2
 from psycopg2 import pool
 from config import settings
+from db.pools import Psycopg2PoolWatcher, watch_pool
 
 
 # Connection parameters for psycopg2
@@ -12,11 +13,19 @@ DB_ARGS = {
     "port": settings.postgres_port
 }
 
-try:
-    postgres_pool = psycopg2.pool.SimpleConnectionPool(minconn=1, maxconn=10, **DB_ARGS)
-except psycopg2.OperationalError as e:
-    print(f"CRITICAL: Failed to initialize PostgreSQL connection pool (psycopg2): {e}")
-    postgres_pool = None
+# Created in the application lifespan (the pool connects as soon as it is created)
+postgres_pool = None
+
+
+def open_postgres_pool():
+    global postgres_pool
+    try:
+        postgres_pool = psycopg2.pool.SimpleConnectionPool(minconn=settings.postgres_sync_pool_min_size,
+                                                           maxconn=settings.postgres_sync_pool_max_size, **DB_ARGS)
+        watch_pool("postgres_sync", Psycopg2PoolWatcher(postgres_pool))
+    except psycopg2.OperationalError as e:
+        print(f"CRITICAL: Failed to initialize PostgreSQL connection pool (psycopg2): {e}")
+        postgres_pool = None
 
 # This is now a generator function suitable for FastAPI's "dependency with yield"
 def get_db_connection():
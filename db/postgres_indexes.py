@@ -0,0 +1,109 @@
+import psycopg
+
+
+# Secondary indexes derived from the lookups and joins used by the query routers.
+# "used_by" lists the router queries (see routers/*.py) that rely on each index.
+# Names match the ones of the former manual setup, so existing indexes are recognized.
+INDEX_SPECS = [
+    {"table": "organization", "name": "idx_organization_name",
+     "columns": ["name"], "used_by": [4, 8]},
+    {"table": "tagclass", "name": "idx_tagclass_name",
+     "columns": ["name"], "used_by": [9]},
+    # FK side of tag -> tagclass: the tags of a class are looked up by TypeTagClassId
+    {"table": "tag", "name": "idx_tag_class_id",
+     "columns": ["TypeTagClassId"], "used_by": [9]},
+]
+
+# Router queries checked by EXPLAIN, with a sample parameter and the indexes the plan must use
+ROUTER_QUERIES = [
+    {"query": 4, "indexes": ["idx_organization_name"], "params": ("UniTO",),
+     "sql": "SELECT id FROM organization WHERE name = %s"},
+    {"query": 8, "indexes": ["idx_organization_name"], "params": ("UniTO",),
+     "sql": 'SELECT id, "LocationPlaceId" FROM organization WHERE name = %s'},
+    {"query": 9, "indexes": ["idx_tagclass_name", "idx_tag_class_id"], "params": ("Thing",),
+     "sql": '''
+        SELECT t.id
+        FROM "tag" t
+        JOIN "tagclass" tc ON t."TypeTagClassId" = tc.id
+        WHERE tc.name = %s
+     '''},
+]
+
+
+def ensure_indexes(cursor):
+    """
+    Creates every index in INDEX_SPECS that does not exist yet (sync psycopg cursor).
+    Returns the names of the indexes that were created.
+    """
+    existing = _existing_index_names(cursor)
+    created = []
+    for spec in INDEX_SPECS:
+        if spec["name"] in existing:
+            continue
+        columns = ", ".join(f'"{col}"' for col in spec["columns"])
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS {spec["name"]} ON {spec["table"]} ({columns});')
+        created.append(spec["name"])
+    return created
+
+
+def _existing_index_names(cursor):
+    cursor.execute("SELECT indexname FROM pg_indexes WHERE schemaname = current_schema()")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def _plan_index_names(plan):
+    """Collects the "Index Name" of every node of an EXPLAIN (FORMAT JSON) plan"""
+    names = set()
+    if "Index Name" in plan:
+        names.add(plan["Index Name"])
+    for child in plan.get("Plans", []):
+        names |= _plan_index_names(child)
+    return names
+
+
+def _explain(conn, sql, params):
+    # Client-side binding: EXPLAIN must see the literal values, not server-side parameters
+    with psycopg.ClientCursor(conn) as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        return cursor.fetchone()[0][0]["Plan"]
+
+
+def index_report(conn):
+    """
+    Checks INDEX_SPECS and ROUTER_QUERIES against the database (sync psycopg connection).
+    Every expected index is "present" or "missing"; every router query is explained and reported
+    with the indexes its plan uses. The static tables are small enough for the planner to prefer a
+    sequential scan, so plans are computed with enable_seqscan off: the check tells whether an index
+    is usable by the query, not whether it is chosen on the current data. Nothing is changed.
+    """
+    with conn.cursor() as cursor:
+        existing = _existing_index_names(cursor)
+    report = {
+        "indexes": [
+            {
+                "table": spec["table"],
+                "name": spec["name"],
+                "columns": spec["columns"],
+                "used_by_queries": spec["used_by"],
+                "status": "present" if spec["name"] in existing else "missing"
+            }
+            for spec in INDEX_SPECS
+        ],
+        "queries": []
+    }
+
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+        for check in ROUTER_QUERIES:
+            used = _plan_index_names(_explain(conn, check["sql"], check["params"]))
+            missing = [name for name in check["indexes"] if name not in used]
+            report["queries"].append({
+                "query": check["query"],
+                "expected_indexes": check["indexes"],
+                "plan_indexes": sorted(used),
+                "status": "uses indexes" if not missing else f"not using {', '.join(missing)}"
+            })
+    finally:
+        conn.rollback()
+    return report
@@ -3,6 +3,15 @@
 # Ensure Python can find the db directory by modifying the PYTHONPATH
 export PYTHONPATH=/app:$PYTHONPATH
 
+# INIT_ALL runs the resumable ingestion of every store (stores loaded concurrently, see
+# db/initialize_db/ingest.py); rerun it after a failure to resume. INGEST_RESET=true starts over.
+if [ "$INIT_ALL" = "true" ]; then
+  echo "Initializing database..."
+  echo "Ingestion of all the stores starting..."
+  python db/initialize_db/ingest.py || echo "Ingestion incomplete: restart with INIT_ALL=true to resume."
+  echo "Ingestion finished."
+fi
+
 # Check if INIT_DB is set to true, and if so, run the database initialization script
 if [ "$INIT_POSTGRES" = "true" ]; then
   echo "Initializing database..."
@@ -31,13 +40,33 @@ fi
 echo -e "\033[1;32m#### Database initialization complete. ####\033[0m"
 
 
-# Start FastAPI
-echo "Starting FastAPI (with reload)..."
-uvicorn main:app --host 0.0.0.0 --port 8000 --reload &
+# APP_MODE=production: several uvicorn workers without file watching; otherwise a single worker with reload.
+# Every worker opens its own pools and pre-warms them (utils/prewarm.py) before accepting requests.
+if [ "$APP_MODE" = "production" ]; then
+  # One worker per CPU available to the container, unless WEB_CONCURRENCY is set
+  WORKERS=${WEB_CONCURRENCY:-$(nproc)}
+  # The pools are per worker: keep WORKERS x POSTGRES_POOL_MAX_SIZE under PostgreSQL max_connections (100)
+  if [ -z "$POSTGRES_POOL_MAX_SIZE" ]; then
+    POOL_SIZE=$(( 80 / WORKERS ))
+    export POSTGRES_POOL_MAX_SIZE=$(( POOL_SIZE > 20 ? 20 : (POOL_SIZE < 2 ? 2 : POOL_SIZE) ))
+  fi
+  echo "Starting FastAPI (production, $WORKERS workers, PostgreSQL pool max $POSTGRES_POOL_MAX_SIZE per worker)..."
+  uvicorn main:app --host 0.0.0.0 --port 8000 --workers "$WORKERS" --timeout-graceful-shutdown 30 &
+else
+  echo "Starting FastAPI (with reload)..."
+  uvicorn main:app --host 0.0.0.0 --port 8000 --reload &
+fi
 
-# Start Streamlit
-echo "Starting Streamlit..."
-streamlit run frontend/app.py --server.address=0.0.0.0 --server.port=8501 &
+# Start Streamlit (RUN_FRONTEND=false to serve the API only)
+if [ "$RUN_FRONTEND" != "false" ]; then
+  echo "Starting Streamlit..."
+  if [ "$APP_MODE" = "production" ]; then
+    streamlit run frontend/app.py --server.address=0.0.0.0 --server.port=8501 \
+      --server.fileWatcherType=none --server.runOnSave=false &
+  else
+    streamlit run frontend/app.py --server.address=0.0.0.0 --server.port=8501 &
+  fi
+fi
 
 # Keep the container running and let both background processes handle reloads
 wait
\ No newline at end of file
@@ -9,6 +9,8 @@ import urllib.parse  # For URL encoding company name if needed
 # --- CONFIGURATION ---
 # Ensure this matches the port your FastAPI app is running on.
 FASTAPI_BASE_URL = "http://localhost:8000"
+# Items requested per page from the paginated endpoints ("Load more" fetches the next page)
+PAGE_SIZE = 100
 
 st.set_page_config(page_title="Progetto MAADB", layout="wide")
 st.title("📊 Progetto MAADB Dashboard")
@@ -81,7 +83,8 @@ elif main_menu == "📈 Analytical Queries":
 
 
 # --- Helper function for API requests ---
-def make_api_request(endpoint: str, method: str = "GET", params: dict = None, data: dict = None):
+def make_api_request(endpoint: str, method: str = "GET", params: dict = None, data: dict = None,
+                     return_headers: bool = False):
     """Helper function to make API requests and handle common errors."""
     url = f"{FASTAPI_BASE_URL}{endpoint}"  # Construct full URL here
     try:
@@ -95,6 +98,8 @@ def make_api_request(endpoint: str, method: str = "GET", params: dict = None, da
             return None
 
         response.raise_for_status()  # Raise an exception for HTTP errors (4xx or 5xx)
+        if return_headers:
+            return response.json(), response.headers
         return response.json()
 
     except requests.exceptions.HTTPError as e:
@@ -114,6 +119,47 @@ def make_api_request(endpoint: str, method: str = "GET", params: dict = None, da
     return None
 
 
+# --- Helper functions for paginated endpoints ---
+def load_page(endpoint: str, state_key: str, params: dict = None, first: bool = False):
+    """
+    Fetches one page of a paginated endpoint and appends it to st.session_state[state_key].
+    With first=True a new search starts; otherwise the page after the stored cursor is loaded.
+    """
+    state = st.session_state.get(state_key)
+    if first or state is None:
+        state = {"endpoint": endpoint, "params": params, "items": [], "cursor": None}
+
+    page_params = {**(params or {}), "limit": PAGE_SIZE}
+    if state["cursor"]:
+        page_params["cursor"] = state["cursor"]
+
+    result = make_api_request(state["endpoint"], params=page_params, return_headers=True)
+    if result is None:
+        if first:
+            st.session_state.pop(state_key, None)
+        return
+    items, headers = result
+    state["items"].extend(items)
+    state["cursor"] = headers.get("X-Next-Cursor")
+    st.session_state[state_key] = state
+
+
+def loaded_items(state_key: str, endpoint: str, params: dict = None):
+    """Items loaded so far for this search, or None if no search was run for these inputs."""
+    state = st.session_state.get(state_key)
+    if state and state["endpoint"] == endpoint and state["params"] == params:
+        return state["items"]
+    return None
+
+
+def load_more_button(state_key: str):
+    """Shows a "Load more" button while the last loaded page says there are more items."""
+    state = st.session_state.get(state_key)
+    if state and state["cursor"]:
+        st.button("Load more ⏬", key=f"{state_key}_more", on_click=load_page,
+                  args=(state["endpoint"], state_key, state["params"]))
+
+
 # --- Page Content based on Action ---
 if action == "-- Select an option --":
     st.markdown("Please select an option from the sidebar!") 
@@ -154,69 +200,78 @@ elif action == "Post of a Person":
     st.markdown("ℹ️ This query allows you to view posts created by a person") 
     email_input = st.text_input("Enter the email address of the user:", placeholder="e.g., Tissa47@gmx.com")
 
+    # The endpoint path in FastAPI is /by-email/{user_email}
+    api_endpoint = f"/by-email/{email_input}"
+
     if st.button("Search Posts 🚀"):
         if email_input:
-            # The endpoint path in FastAPI is /by-email/{user_email}
-            api_endpoint = f"/by-email/{email_input}"
-
-            posts = make_api_request(api_endpoint)
-
-            if posts is not None:  # Check if request was successful (posts can be an empty list)
-                if posts:  # If posts list is not empty
-                    st.success(f"✅ Found {len(posts)} post(s) for '{email_input}':")
-                    display_posts = []
-                    for post in posts:
-                        display_posts.append({
-                            "Post ID": post.get("id"),
-                            "Content": post.get("content", "N/A"),
-                            "Creation Date": post.get("creationDate"),
-                            "Language": post.get("language", "N/A"),  # Assuming this is a string like "pl;en"
-                            "Length": post.get("length", "N/A")
-                        })
-                    df = pd.DataFrame(display_posts)
-                    st.dataframe(df, use_container_width=True)
-                else:  # posts is an empty list
-                    st.warning(
-                        f"🤷 No posts found for user with email '{email_input}'. They might exist but have not posted "
-                        f"anything."
-                    )
-            # Error handling (including 404 for "Person not found") is done within make_api_request.
+            load_page(api_endpoint, "q1_posts", first=True)
         else:
             st.warning("Doh! Please enter an email address to search.")
 
+    if email_input:
+        posts = loaded_items("q1_posts", api_endpoint)
+
+        if posts is not None:  # Check if request was successful (posts can be an empty list)
+            if posts:  # If posts list is not empty
+                st.success(f"✅ Found {len(posts)} post(s) for '{email_input}':")
+                display_posts = []
+                for post in posts:
+                    display_posts.append({
+                        "Post ID": post.get("id"),
+                        "Content": post.get("content", "N/A"),
+                        "Creation Date": post.get("creationDate"),
+                        "Language": post.get("language", "N/A"),  # Assuming this is a string like "pl;en"
+                        "Length": post.get("length", "N/A")
+                    })
+                df = pd.DataFrame(display_posts)
+                st.dataframe(df, use_container_width=True)
+                load_more_button("q1_posts")
+            else:  # posts is an empty list
+                st.warning(
+                    f"🤷 No posts found for user with email '{email_input}'. They might exist but have not posted "
+                    f"anything."
+                )
+        # Error handling (including 404 for "Person not found") is done within make_api_request.
+
 
 # --- 2. Find Forums by Email Action ---
 elif action == "Forum of a Person":
     st.markdown("ℹ️ This query allows you to find all forums a person belongs to") 
     input = st.text_input("Enter the email address of the user:", placeholder="e.g., Tissa47@gmx.com")
 
+    endpoint = f"/forumsEmail/{input}"
+
     if st.button("Search Forums 🔍"):
         if input:
-            endpoint = f"/forumsEmail/{input}"
-            forums = make_api_request(endpoint)
-
-            if forums is not None:
-                if forums:
-                    st.success(f"✅ Found {len(forums)} forum(s) linked to '{input}':")
-                    df = pd.DataFrame(forums)
-                    st.dataframe(df, use_container_width=True)
-                    st.write(" ")
-                    if not df.empty:
-                        chart = alt.Chart(df).mark_bar().encode(
-                            x=alt.X("forum_id:N", title="Forum ID"),
-                            y=alt.Y("member_count:Q", title="Member Count"),
-                            tooltip=["forum_id", "member_count", "title"]
-                        ).properties(
-                            title="📊 Member Count per Forum",
-                            width=600,
-                            height=400
-                        )
-                        st.altair_chart(chart, use_container_width=True)
-                else:
-                    st.warning(f"No forums found for user '{input}'.")
+            load_page(endpoint, "q2_forums", first=True)
         else:
             st.warning("Please enter a valid email address.")
 
+    if input:
+        forums = loaded_items("q2_forums", endpoint)
+
+        if forums is not None:
+            if forums:
+                st.success(f"✅ Found {len(forums)} forum(s) linked to '{input}':")
+                df = pd.DataFrame(forums)
+                st.dataframe(df, use_container_width=True)
+                st.write(" ")
+                if not df.empty:
+                    chart = alt.Chart(df).mark_bar().encode(
+                        x=alt.X("forum_id:N", title="Forum ID"),
+                        y=alt.Y("member_count:Q", title="Member Count"),
+                        tooltip=["forum_id", "member_count", "title"]
+                    ).properties(
+                        title="📊 Member Count per Forum",
+                        width=600,
+                        height=400
+                    )
+                    st.altair_chart(chart, use_container_width=True)
+                load_more_button("q2_forums")
+            else:
+                st.warning(f"No forums found for user '{input}'.")
+
 
 # --- 3. Find Persons who Know and Commented Action ---
 elif action == "Friends who Comment":
@@ -367,63 +422,74 @@ elif action == "Active second-degree Connections":
     st.markdown("ℹ️ This query allows you to find second degree connection of a person who have commented posts that the person likes")
     input = st.text_input("Enter the email address of the user:", placeholder="e.g., Tissa47@gmx.com")
 
+    endpoint = f"/second_degree_commenters_on_liked_posts/{input}"
+
     if st.button("Search Connections 🔍"):
         if input:
-            endpoint = f"/second_degree_commenters_on_liked_posts/{input}"
-            results = make_api_request(endpoint)
-
-            if results is not None:
-                if results:
-                    st.success(f"✅ Found {len(results)} comment(s) from 2nd degree connections related to liked posts:")
-                    df = pd.DataFrame(results)
-                    st.dataframe(df, use_container_width=True)
-                else:
-                    st.warning(f"No matching results found for user '{input}'.")
+            load_page(endpoint, "q5_comments", first=True)
         else:
             st.warning("Please enter a valid email address.")
 
+    if input:
+        results = loaded_items("q5_comments", endpoint)
+
+        if results is not None:
+            if results:
+                st.success(f"✅ Found {len(results)} comment(s) from 2nd degree connections related to liked posts:")
+                df = pd.DataFrame(results)
+                st.dataframe(df, use_container_width=True)
+                load_more_button("q5_comments")
+            else:
+                st.warning(f"No matching results found for user '{input}'.")
+
 
 # --- 6. Find Cities of active people ---
 elif action == "Cities with active People":
     st.markdown("ℹ️ This query allows you to find all the cities from which a minimum number of active people come (i.e. who have created or commented at least 5/post comments).")
     min_active_input = st.number_input("Minimum number of active users (who posted or commented at least 5 times):", min_value=1, value=10, step=1)
     
+    api_endpoint = "/find-cities/by-activeuser"
+    api_params = {"min_active_people": min_active_input}
+
     if st.button("Search Cities 🏙️"):
         if min_active_input:
-            api_endpoint = f"/find-cities/by-activeuser?min_active_people={min_active_input}"
-            cities = make_api_request(api_endpoint)
-
-            if cities is not None:  # Check if request was successful (cities can be an empty list)
-                if cities:
-                    st.success(f"✅ Found {len(cities)} city/cities with at least {min_active_input} active users:")
-
-                    df = pd.DataFrame(cities)
-                    df.rename(columns={
-                        "cityId": "City ID",
-                        "cityName": "City Name",
-                        "activeUserCount": "Active Users"
-                    }, inplace=True)
-
-                    if len(df) > 50:
-                        # Show table only if more than 50 cities found
-                        st.dataframe(df, use_container_width=True)
-                        st.write(" ")
-                    else:
-                        chart = alt.Chart(df).mark_bar().encode(
-                            x=alt.X("City Name:N", title="City Name", sort='-y'),
-                            y=alt.Y("Active Users:Q", title="Active Users"),
-                            tooltip=["City Name", "Active Users", "City ID"]
-                        ).properties(
-                            title="📊 Active Users per City",
-                            width=600,
-                            height=400
-                        )
-                        st.altair_chart(chart, use_container_width=True)
-                else:
-                    st.warning(f"🤷 No cities found with at least {min_active_input} active users.")
+            load_page(api_endpoint, "q6_cities", params=api_params, first=True)
         else:
             st.warning("Doh! Please enter a minimum active number of users to search.")
 
+    if min_active_input:
+        cities = loaded_items("q6_cities", api_endpoint, params=api_params)
+
+        if cities is not None:  # Check if request was successful (cities can be an empty list)
+            if cities:
+                st.success(f"✅ Found {len(cities)} city/cities with at least {min_active_input} active users:")
+
+                df = pd.DataFrame(cities)
+                df.rename(columns={
+                    "cityId": "City ID",
+                    "cityName": "City Name",
+                    "activeUserCount": "Active Users"
+                }, inplace=True)
+
+                if len(df) > 50:
+                    # Show table only if more than 50 cities found
+                    st.dataframe(df, use_container_width=True)
+                    st.write(" ")
+                else:
+                    chart = alt.Chart(df).mark_bar().encode(
+                        x=alt.X("City Name:N", title="City Name", sort='-y'),
+                        y=alt.Y("Active Users:Q", title="Active Users"),
+                        tooltip=["City Name", "Active Users", "City ID"]
+                    ).properties(
+                        title="📊 Active Users per City",
+                        width=600,
+                        height=400
+                    )
+                    st.altair_chart(chart, use_container_width=True)
+                load_more_button("q6_cities")
+            else:
+                st.warning(f"🤷 No cities found with at least {min_active_input} active users.")
+
 
 
 # --- 7. Favorite Tags for Location ---
@@ -541,47 +607,53 @@ elif action == "Forums with interest in TagClass":
     tagclass_input = st.text_input("Enter the name of the tagClass:", placeholder="e.g., SoccerPlayer")
     min_members_input = st.number_input("Minimum number of interested members:", min_value=1, value=5, step=1)
     
+    api_endpoint = f"/find-forum/by-tagclass/{tagclass_input}"
+    api_params = {"min_members": min_members_input}
+
     if st.button("Search Forums 🔍"):
         if tagclass_input:
-            api_endpoint = f"/find-forum/by-tagclass/{tagclass_input}?min_members={min_members_input}"
-            forums = make_api_request(api_endpoint)
-
-            if forums is not None:
-                if forums:
-                    st.success(f"✅ Found {len(forums)} forum(s) with at least {min_members_input} interested members in tagClass '{tagclass_input}':")
-
-                    display_forums = []
-                    for forum in forums:
-                        display_forums.append({
-                            "Forum ID": forum.get("id"),
-                            "Title": forum.get("title", "N/A"),
-                            "Creation Date": forum.get("creationDate", "N/A"),
-                            "Moderator ID": forum.get("ModeratorPersonId", "N/A"),
-                            "Interested Members": forum.get("interested_members", "N/A")
-                        })
-
-                    df = pd.DataFrame(display_forums)
-
-                    # Convert 'Creation Date' to datetime
-                    df["Creation Date"] = pd.to_datetime(df["Creation Date"], dayfirst=True, errors="coerce")
-
-                    # Show table (if results are not too many)
-                    if len(df) > 20:
-                        chart = alt.Chart(df).mark_circle(size=80).encode(
-                            x=alt.X("Creation Date:T", title="Forum Creation Date"),
-                            y=alt.Y("Interested Members:Q", title="Interested Members"),
-                            color=alt.Color("Moderator ID:N", title="Moderator ID"),
-                            tooltip=["Forum ID", "Title", "Interested Members", "Creation Date", "Moderator ID"]
-                        ).properties(
-                            title="📈 Forums by Creation Date and Interested Members",
-                            width=700,
-                            height=450
-                        ).interactive()
-
-                        st.altair_chart(chart, use_container_width=True)
-                    else:
-                        st.dataframe(df, use_container_width=True)
-                else:
-                    st.warning(f"🤷  No forums found with at least {min_members_input} interested members in tagClass '{tagclass_input}'.")
+            load_page(api_endpoint, "q9_forums", params=api_params, first=True)
         else:
             st.warning("Doh! Please enter a tag class to search.")
+
+    if tagclass_input:
+        forums = loaded_items("q9_forums", api_endpoint, params=api_params)
+
+        if forums is not None:
+            if forums:
+                st.success(f"✅ Found {len(forums)} forum(s) with at least {min_members_input} interested members in tagClass '{tagclass_input}':")
+
+                display_forums = []
+                for forum in forums:
+                    display_forums.append({
+                        "Forum ID": forum.get("id"),
+                        "Title": forum.get("title", "N/A"),
+                        "Creation Date": forum.get("creationDate", "N/A"),
+                        "Moderator ID": forum.get("ModeratorPersonId", "N/A"),
+                        "Interested Members": forum.get("interested_members", "N/A")
+                    })
+
+                df = pd.DataFrame(display_forums)
+
+                # Convert 'Creation Date' to datetime
+                df["Creation Date"] = pd.to_datetime(df["Creation Date"], dayfirst=True, errors="coerce")
+
+                # Show table (if results are not too many)
+                if len(df) > 20:
+                    chart = alt.Chart(df).mark_circle(size=80).encode(
+                        x=alt.X("Creation Date:T", title="Forum Creation Date"),
+                        y=alt.Y("Interested Members:Q", title="Interested Members"),
+                        color=alt.Color("Moderator ID:N", title="Moderator ID"),
+                        tooltip=["Forum ID", "Title", "Interested Members", "Creation Date", "Moderator ID"]
+                    ).properties(
+                        title="📈 Forums by Creation Date and Interested Members",
+                        width=700,
+                        height=450
+                    ).interactive()
+
+                    st.altair_chart(chart, use_container_width=True)
+                else:
+                    st.dataframe(df, use_container_width=True)
+                load_more_button("q9_forums")
+            else:
+                st.warning(f"🤷  No forums found with at least {min_members_input} interested members in tagClass '{tagclass_input}'.")
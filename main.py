@@ -1,19 +1,76 @@
-from fastapi import FastAPI
-from routers import connections_health, parametric_queries, analytical_queries
+import asyncio
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
+from routers import connections_health, parametric_queries, analytical_queries, admin
+from config import settings
+from db import mongo_client
+from db.mongo_client import open_mongo_client, close_mongo_client
+from db.mongo_indexes import ensure_indexes
+from db.neo4j_async_client import open_async_driver, close_async_driver
+from db.neo4j_client import open_driver, close_driver
+from db.postgres_async_client import open_postgres_async_pool, close_postgres_async_pool
+from db.postgres_client import open_postgres_pool, close_postgres_pool
+from utils.cache import open_query_cache, close_query_cache
+from utils.prewarm import prewarm
+from utils.slow_queries import slow_query_log
+from utils.tracing import trace_request, render_metrics
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Clients are created here rather than at import, in every worker process
+    open_mongo_client()
+    open_async_driver()
+    open_driver()
+    await open_postgres_async_pool()
+    await asyncio.to_thread(open_postgres_pool)
+    open_query_cache()
+    # The plans of slow queries are captured on this loop, also for the calls traced in Motor's threads
+    slow_query_log.bind(asyncio.get_running_loop())
+    if settings.prewarm_on_startup:
+        await prewarm()
+    if settings.mongo_ensure_indexes_on_startup:
+        try:
+            created = await asyncio.to_thread(ensure_indexes, mongo_client.db.delegate)
+            print(f"MongoDB indexes checked, {len(created)} created: {created}")
+        except Exception as e:
+            print(f"WARNING: Could not ensure MongoDB indexes at startup: {e}")
+    yield
+    await close_query_cache()
+    await close_postgres_async_pool()
+    await close_async_driver()
+    close_postgres_pool()
+    close_driver()
+    close_mongo_client()
 
 
 app = FastAPI(
     title="MAADB API",
     description="API for interacting with MAADB databases.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 
+@app.middleware("http")
+async def trace_database_calls(request: Request, call_next):
+    return await trace_request(request, call_next)
+
+
 app.include_router(connections_health.router, tags=["Health Checks"])
 app.include_router(parametric_queries.router, tags=["Parametric Queries"])
 app.include_router(analytical_queries.router, tags=["Analytical Queries"])
+app.include_router(admin.router, tags=["Admin"])
 
 
 @app.get("/")
 async def root():
-    return {"message": "Welcome to MAADB API. Visit /docs for documentation."}
\ No newline at end of file
+    return {"message": "Welcome to MAADB API. Visit /docs for documentation."}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Latency histograms of the HTTP requests and of the database calls, in the Prometheus text format"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,149 @@
+import asyncio
+import secrets
+
+import psycopg
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+
+from config import settings
+from db.forum_member_count import MEMBER_COUNT_PROPERTY, REFRESH_MEMBER_COUNTS_QUERY
+from db import mongo_client
+from db.mongo_indexes import index_report
+from db import neo4j_async_client
+from db.postgres_async_client import CONNINFO
+from db.pools import pool_snapshots
+from db.postgres_indexes import index_report as postgres_index_report
+from db.person_activity import PERSON_ACTIVITY_COLLECTION, rebuild_person_activity
+from utils import cache
+from utils.slow_queries import slow_query_log
+
+
+router = APIRouter(prefix="/admin")
+
+
+def require_admin_token(x_admin_token: str | None = Header(None)):
+    """
+    Guard of the admin operations that rewrite or drop data or expose query values (slow query log):
+    they are disabled unless ADMIN_TOKEN is set, and the request must then send it in the X-Admin-Token header.
+    """
+    if not settings.admin_token:
+        raise HTTPException(status_code=403, detail="Admin operations are disabled (no ADMIN_TOKEN)")
+    if not secrets.compare_digest((x_admin_token or "").encode(), settings.admin_token.encode()):
+        raise HTTPException(status_code=401, detail="Missing or invalid X-Admin-Token header")
+
+
+# --- MongoDB index report ---
+@router.get("/mongo/indexes", tags=["MongoDB"])
+async def get_mongo_index_report():
+    """
+    Reports which of the indexes required by the query routers are present, unused or missing,
+    plus any extra index defined on the collections, and whether the plan of each router query uses them.
+    """
+    try:
+        # index_report works on the sync pymongo Database wrapped by Motor, so run it in a thread
+        return await asyncio.to_thread(index_report, mongo_client.db.delegate)
+    except Exception as e:
+        print(f"Unexpected error in /admin/mongo/indexes: {e}")
+        raise HTTPException(status_code=500, detail=f"Could not build the MongoDB index report: {e}")
+
+
+# --- PostgreSQL index report ---
+def _postgres_index_report():
+    with psycopg.connect(CONNINFO) as conn:
+        return postgres_index_report(conn)
+
+
+@router.get("/postgres/indexes", tags=["PostgreSQL"])
+async def get_postgres_index_report():
+    """
+    Reports which of the indexes required by the query routers are present or missing, and
+    whether the EXPLAIN plan of each router query uses them.
+    """
+    try:
+        # The report uses a short-lived sync connection (SET LOCAL + rollback), so run it in a thread
+        return await asyncio.to_thread(_postgres_index_report)
+    except Exception as e:
+        print(f"Unexpected error in /admin/postgres/indexes: {e}")
+        raise HTTPException(status_code=500, detail=f"Could not build the PostgreSQL index report: {e}")
+
+
+# --- person_activity rebuild ---
+@router.post("/mongo/person-activity/rebuild", tags=["MongoDB"], dependencies=[Depends(require_admin_token)])
+async def rebuild_person_activity_store():
+    """
+    Recomputes the person_activity counters from the post, comment and person collections.
+    Needed only when the data was loaded without init_mongodb (e.g. restored from a backup).
+    The store is rebuilt aside and swapped in when complete, so queries keep the old counters meanwhile.
+    """
+    try:
+        await asyncio.to_thread(rebuild_person_activity, mongo_client.db.delegate)
+        count = await mongo_client.db[PERSON_ACTIVITY_COLLECTION].estimated_document_count()
+        return {"status": f"{PERSON_ACTIVITY_COLLECTION} rebuilt", "documents": count}
+    except Exception as e:
+        print(f"Unexpected error in /admin/mongo/person-activity/rebuild: {e}")
+        raise HTTPException(status_code=500, detail=f"Could not rebuild {PERSON_ACTIVITY_COLLECTION}: {e}")
+
+
+# --- Forum member counts ---
+@router.post("/neo4j/forum-member-counts/refresh", tags=["Neo4j"], dependencies=[Depends(require_admin_token)])
+async def refresh_forum_member_counts_property():
+    """
+    Recomputes the memberCount property of every Forum node from the MEMBER_OF relationships.
+    Needed when the data was loaded without init_neo4j_relationships (e.g. restored from a backup)
+    or MEMBER_OF was changed outside the API: the stored counts are not updated otherwise.
+    """
+    try:
+        async with neo4j_async_client.async_driver.session(database="neo4j") as session:
+            result = await session.run(REFRESH_MEMBER_COUNTS_QUERY)
+            await result.consume()
+        return {"status": f"Forum {MEMBER_COUNT_PROPERTY} refreshed"}
+    except Exception as e:
+        print(f"Unexpected error in /admin/neo4j/forum-member-counts/refresh: {e}")
+        raise HTTPException(status_code=500, detail=f"Could not refresh forum {MEMBER_COUNT_PROPERTY}: {e}")
+
+
+# --- Query cache ---
+@router.get("/cache", tags=["Cache"])
+async def get_query_cache_stats():
+    """
+    Returns hit, miss, eviction and expiration counters of the query response cache.
+    """
+    return await cache.query_cache.stats()
+
+
+@router.delete("/cache", tags=["Cache"], dependencies=[Depends(require_admin_token)])
+async def clear_query_cache():
+    """
+    Drops every cached response of this API process.
+    """
+    await cache.query_cache.clear()
+    return {"status": "Query cache cleared"}
+
+
+# --- Slow query log ---
+@router.get("/slow-queries", tags=["Tracing"], dependencies=[Depends(require_admin_token)])
+async def get_slow_queries(limit: int = Query(None, ge=1, description="Maximum number of entries to return.")):
+    """
+    Returns the last database calls slower than SLOW_QUERY_THRESHOLD_MS (newest first), with their
+    statement, parameters and plan. A plan still being captured is null with a null planError.
+    Parameter values are hashed unless SLOW_QUERY_RECORD_PARAMETERS is enabled.
+    """
+    return {"thresholdMs": settings.slow_query_threshold_ms, "entries": slow_query_log.entries(limit)}
+
+
+@router.delete("/slow-queries", tags=["Tracing"], dependencies=[Depends(require_admin_token)])
+async def clear_slow_queries():
+    """
+    Empties the slow query log of this API process.
+    """
+    slow_query_log.clear()
+    return {"status": "Slow query log cleared"}
+
+
+# --- Connection pools ---
+@router.get("/pools", tags=["Pools"])
+async def get_pool_stats():
+    """
+    Returns connections in use and idle, requests waiting for a connection and the cumulated
+    acquisition time of every connection pool of this API process (also exported on /metrics).
+    """
+    return pool_snapshots()
@@ -1,18 +1,26 @@
-from fastapi import APIRouter, HTTPException, Path, Query, Depends
-
-import psycopg2
-from psycopg2.extras import DictCursor
-
-from db.mongo_client import db
-from db.neo4j_client import driver
-from db.postgres_client import get_db_connection
+from fastapi import APIRouter, HTTPException, Path, Query, Depends, Request, Response
+from pymongo import ASCENDING
+
+import psycopg
+
+from db import mongo_client
+from db.person_activity import PERSON_ACTIVITY_COLLECTION, ACTIVE_USER_MIN_ACTIVITY
+from db import neo4j_async_client
+from db.postgres_async_client import LazyAsyncConnection, get_async_db_connection
+from utils.cache import cached_endpoint
+from utils.orchestration import run_concurrently
+from utils.pagination import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, LIMIT_DESCRIPTION, CURSOR_DESCRIPTION,
+    decode_cursor, split_page, set_next_cursor
+)
+from utils.streaming import wants_ndjson, ndjson_response
 
 from models.query_6.model import FindCities
 from models.query_7.model import MostUsedTagsResponse, TagUsage
 from models.query_8.model import TagResponse
 from models.query_9.model import FindForumResponse
 
-from typing import List, Annotated
+from typing import List, Annotated, Optional
 
 
 router = APIRouter()
@@ -23,48 +31,43 @@ router = APIRouter()
             response_model=List[FindCities],
             summary="Find cities with at least N active users",
             tags=["Cities"])
+@cached_endpoint("cities_by_active_users")
 async def get_cities_with_active_users(
+    response: Response,
     min_active_people: int = Query(..., ge=1, description="Minimum number of active users per city."),
-    pg_conn: psycopg2.extensions.connection = Depends(get_db_connection)
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description=LIMIT_DESCRIPTION),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    pg_conn: LazyAsyncConnection = Depends(get_async_db_connection)
 ):
+    """Cities are paged by city id."""
+    after = decode_cursor(cursor, "cityId")
     try:
-        # 1. Aggregate user's posts
-        post_counts = await db.post.aggregate([
-            {"$group": {"_id": "$CreatorPersonId", "postCount": {"$sum": 1}}}
-        ]).to_list(length=None)
-
-        # 2. Aggregate user's comments
-        comment_counts = await db.comment.aggregate([
-            {"$group": {"_id": "$CreatorPersonId", "commentCount": {"$sum": 1}}}
-        ]).to_list(length=None)
-
-        # 3. Combine posts + comments
-        activity_map = {}
-        for doc in post_counts:
-            activity_map[doc["_id"]] = doc["postCount"]
-        for doc in comment_counts:
-            activity_map[doc["_id"]] = activity_map.get(doc["_id"], 0) + doc["commentCount"]
-
-        # 4. Filter active users (at least 5 activities)
-        active_user_ids = [uid for uid, count in activity_map.items() if count >= 5]
-        if not active_user_ids:
-            return []
-
-        # 5. Find LocationCityId of active people
-        city_counts = {}
-        async for person in db.person.find({"id": {"$in": active_user_ids}}, {"LocationCityId": 1}):
-            city_id = person.get("LocationCityId")
-            if city_id is not None:
-                city_counts[city_id] = city_counts.get(city_id, 0) + 1
-
-        # 6. Filter cities with at least min_active_people active users
-        filtered_city_ids = [cid for cid, count in city_counts.items() if count >= min_active_people]
+        # 1. Count active people per city on the precomputed person_activity store
+        city_filter = {
+            "activityCount": {"$gte": ACTIVE_USER_MIN_ACTIVITY},
+            "LocationCityId": {"$ne": None}
+        }
+        if after["cityId"] is not None:
+            city_filter["LocationCityId"]["$gt"] = after["cityId"]
+        city_counts_cursor = mongo_client.db[PERSON_ACTIVITY_COLLECTION].aggregate([
+            {"$match": city_filter},
+            {"$group": {"_id": "$LocationCityId", "activeUserCount": {"$sum": 1}}},
+            {"$match": {"activeUserCount": {"$gte": min_active_people}}},
+            {"$sort": {"_id": 1}},
+            {"$limit": limit + 1}
+        ])
+        city_count_docs = [doc async for doc in city_counts_cursor]
+        city_count_docs, next_cursor = split_page(city_count_docs, limit, lambda doc: {"cityId": doc["_id"]})
+        city_counts = {doc["_id"]: doc["activeUserCount"] for doc in city_count_docs}
+
+        # 2. Cities with at least min_active_people active users
+        filtered_city_ids = list(city_counts.keys())
         if not filtered_city_ids:
             return []
         
-        # 7. Get cities names from PostgreSQL
-        with pg_conn.cursor(cursor_factory=DictCursor) as cur:
-            cur.execute(
+        # 3. Get cities names from PostgreSQL
+        async with pg_conn.cursor() as cur:
+            await cur.execute(
                 '''
                 SELECT id, name
                 FROM "place"
@@ -72,9 +75,9 @@ async def get_cities_with_active_users(
                 ''',
                 (filtered_city_ids,)
             )
-            city_names = {row["id"]: row["name"] for row in cur.fetchall()}
+            city_names = {row["id"]: row["name"] for row in await cur.fetchall()}
 
-        # 8. Final results
+        # 4. Final results
         result = []
         for city_id in filtered_city_ids:
             result.append({
@@ -82,6 +85,7 @@ async def get_cities_with_active_users(
                 "cityName": city_names.get(city_id, "Unknown"),
                 "activeUserCount": city_counts[city_id]
             })
+        set_next_cursor(response, next_cursor)
         return result
 
     except Exception as e:
@@ -90,19 +94,29 @@ async def get_cities_with_active_users(
 
 
 # --- 7. Endpoint for finding Most Used Tags by City Interest ---
+CITY_TAG_INTERESTS_QUERY = """
+MATCH (p:Person)-[:HAS_INTEREST]->(t:Tag)
+WHERE p.id IN $personIds
+RETURN t.id AS tagId, count(t) AS interestCount
+ORDER BY interestCount DESC, t.id ASC
+LIMIT $limit
+"""
+
+
 @router.get(
     "/tags/most-used-by-city-interest/{user_email}",
     response_model=MostUsedTagsResponse,
     summary="Find most used tags (by interest) for users in the same city as the given user",
     tags=["Complex Queries", "Tags"]
 )
+@cached_endpoint("tags_by_city_interest")
 async def get_tags_by_city_interest(
         user_email: Annotated[str, Path(description="Email address of the user to find city from.")],
         top_n: Annotated[int, Query(description="Number of top tags to return.", ge=1, le=100)] = 10,
-        pg_conn: psycopg2.extensions.connection = Depends(get_db_connection)
+        pg_conn: LazyAsyncConnection = Depends(get_async_db_connection)
 ):
     try:
-        person_doc = await db.person.find_one(
+        person_doc = await mongo_client.db.person.find_one(
             {"email": user_email},
             {"LocationCityId": 1, "id": 1, "_id": 0}
         )
@@ -115,35 +129,34 @@ async def get_tags_by_city_interest(
             return MostUsedTagsResponse(user_email=user_email, tags=[],
                                         message=f"User '{user_email}' found, but LocationCityId is missing.")
 
-        try:
-            with pg_conn.cursor(cursor_factory=DictCursor) as cursor:
-                cursor.execute("SELECT name FROM place WHERE id = %s", (city_id,))
-                city_record = cursor.fetchone()
-                city_name_display = city_record["name"] if city_record else f"Unknown City (ID: {city_id})"
-        except Exception as e:
-            print(f"Error fetching city name for ID {city_id}: {e}")
-            city_name_display = f"Error for City ID: {city_id}"
+        async def fetch_city_name():
+            try:
+                async with pg_conn.cursor() as cursor:
+                    await cursor.execute("SELECT name FROM place WHERE id = %s", (city_id,))
+                    city_record = await cursor.fetchone()
+                    return city_record["name"] if city_record else f"Unknown City (ID: {city_id})"
+            except Exception as e:
+                print(f"Error fetching city name for ID {city_id}: {e}")
+                return f"Error for City ID: {city_id}"
 
         # Find people in the same city
-        persons_in_city_cursor = db.person.find({"LocationCityId": city_id}, {"id": 1, "_id": 0})
-        person_ids_in_city = [p["id"] async for p in persons_in_city_cursor if "id" in p]
+        async def fetch_person_ids_in_city():
+            persons_in_city_cursor = mongo_client.db.person.find({"LocationCityId": city_id}, {"id": 1, "_id": 0})
+            return [p["id"] async for p in persons_in_city_cursor if "id" in p]
+
+        city_name_display, person_ids_in_city = await run_concurrently(
+            fetch_city_name(), fetch_person_ids_in_city()
+        )
 
         if not person_ids_in_city:
             return MostUsedTagsResponse(user_email=user_email, city_name=city_name_display, tags=[],
                                         message=f"User '{user_email}' is in {city_name_display}, but no other persons found in this city.")
 
         tag_counts_from_neo4j = []
-        neo4j_query = """
-        MATCH (p:Person)-[:HAS_INTEREST]->(t:Tag)
-        WHERE p.id IN $personIds
-        RETURN t.id AS tagId, count(t) AS interestCount
-        ORDER BY interestCount DESC, t.id ASC
-        LIMIT $limit
-        """
         try:
-            with driver.session(database="neo4j") as session:
-                results = session.run(neo4j_query, personIds=person_ids_in_city, limit=top_n)
-                for record in results:
+            async with neo4j_async_client.async_driver.session(database="neo4j") as session:
+                results = await session.run(CITY_TAG_INTERESTS_QUERY, personIds=person_ids_in_city, limit=top_n)
+                async for record in results:
                     tag_counts_from_neo4j.append({
                         "tag_id": record["tagId"],
                         "count": record["interestCount"]
@@ -163,7 +176,7 @@ async def get_tags_by_city_interest(
 
         if tag_ids_to_fetch_details:
             try:
-                with pg_conn.cursor(cursor_factory=DictCursor) as cursor:
+                async with pg_conn.cursor() as cursor:
                     placeholders = ', '.join(['%s'] * len(tag_ids_to_fetch_details))
                     pg_query = f"""
                     SELECT t.id, t.name AS tag_name, t.url AS tag_url, tc.name AS tag_class_name
@@ -171,22 +184,22 @@ async def get_tags_by_city_interest(
                     LEFT JOIN tagclass tc ON t."TypeTagClassId" = tc.id
                     WHERE t.id IN ({placeholders})
                     """
-                    cursor.execute(pg_query, tuple(tag_ids_to_fetch_details))
-                    fetched_rows = cursor.fetchall()
+                    await cursor.execute(pg_query, tuple(tag_ids_to_fetch_details))
+                    fetched_rows = await cursor.fetchall()
                     for row in fetched_rows:
                         tag_details_map[row["id"]] = {
                             "name": row["tag_name"],
                             "url": row["tag_url"],
                             "class_name": row["tag_class_name"]
                         }
-            except psycopg2.Error as e:
+            except psycopg.Error as e:
                 pg_error_message = f"PostgreSQL error fetching tag details: {str(e)}"
                 print(pg_error_message)
-                if pg_conn: pg_conn.rollback()
+                if pg_conn: await pg_conn.rollback()
             except Exception as e:
                 pg_error_message = f"Unexpected PostgreSQL error: {str(e)}"
                 print(pg_error_message)
-                if pg_conn: pg_conn.rollback()
+                if pg_conn: await pg_conn.rollback()
 
         final_tags_usage: List[TagUsage] = []
         for tc_info in tag_counts_from_neo4j:
@@ -224,50 +237,62 @@ async def get_tags_by_city_interest(
 
     except HTTPException:
         raise
-    except psycopg2.Error as e:
+    except psycopg.Error as e:
         print(f"ERROR: PostgreSQL error in endpoint: {e}")
         if pg_conn:
-            pg_conn.rollback()
+            await pg_conn.rollback()
         raise HTTPException(status_code=500, detail=f"PostgreSQL error: {str(e)}")
     except Exception as e:
         print(f"Unexpected error in /tags/most-used-by-city-interest for {user_email}: {type(e).__name__} - {str(e)}")
         if pg_conn:
-            pg_conn.rollback()
+            await pg_conn.rollback()
         raise HTTPException(status_code=500, detail=f"Unexpected server error: {str(e)}")
 
 
 # --- 8. Endpoint for finding top 10 most used tags by people in same organisation. ---
+ORGANISATION_MEMBERS_QUERY = """
+MATCH (p:Person)-[:STUDY_AT|WORK_AT]->(o)
+WHERE o.id IN $org_ids
+RETURN p.id AS person_id
+"""
+
+ACTIVE_MEMBER_INTERESTS_QUERY = """
+MATCH (p:Person)-[:HAS_INTEREST]->(t:Tag)
+WHERE p.id IN $active_ids
+RETURN t.id AS tag_id, COUNT(*) AS usage_count
+ORDER BY usage_count DESC
+LIMIT 10
+"""
+
+
 @router.get("/common_interests_among_active_people/{organisation_name}",
          response_model=List[TagResponse],
          summary="Findi the top 10 most used tags by people who work or study in the same organsation.",
          tags=["Analysis"])
+@cached_endpoint("common_interests_by_organisation")
 async def get_organisation_name(
     organisation_name: str = Path(..., description="Name of the organisation to analyze", example="UniTO"),
-    pg_conn: psycopg2.extensions.connection = Depends(get_db_connection)
+    pg_conn: LazyAsyncConnection = Depends(get_async_db_connection)
 ):
     try:
         # Get the id list for an organization name because for example the same university could have n id
-        with pg_conn.cursor() as cursor:
-            cursor.execute("""
+        async with pg_conn.cursor() as cursor:
+            await cursor.execute("""
                 SELECT id, "LocationPlaceId"
                 FROM organization
                 WHERE name = %s;
             """, (organisation_name,))
-            organisationList = cursor.fetchall()
+            organisationList = await cursor.fetchall()
        
         if not organisationList:
             raise HTTPException(status_code=404,detail="Organisation not found.")
         
-        organisation_ids = [row[0] for row in organisationList]  
+        organisation_ids = [row["id"] for row in organisationList]  
 
         # Neo's organisation is a union of 'Company' and 'University'
-        with driver.session() as session: 
-            result = session.run("""
-                MATCH (p:Person)-[:STUDY_AT|WORK_AT]->(o) 
-                WHERE o.id IN $org_ids
-                RETURN p.id AS person_id
-            """, {"org_ids": organisation_ids})
-            personInOrganisation = list(result)  
+        async with neo4j_async_client.async_driver.session() as session:
+            result = await session.run(ORGANISATION_MEMBERS_QUERY, {"org_ids": organisation_ids})
+            personInOrganisation = [record async for record in result]
         
         if not personInOrganisation:
             raise HTTPException(status_code=404,detail="Person in organisation not found.")
@@ -280,7 +305,7 @@ async def get_organisation_name(
                 {"$match": {"post_count": {"$gte": 10}}},
                 {"$project": {"_id": 1}}
             ]
-            cursor = db.post.aggregate(pipeline)
+            cursor = mongo_client.db.post.aggregate(pipeline)
             results = []
             async for doc in cursor:
                 results.append(doc["_id"])
@@ -290,15 +315,9 @@ async def get_organisation_name(
         if not active_person_ids:
             raise HTTPException(status_code=404, detail="No active persons with ≥10 posts found.")
 
-        with driver.session() as session:
-            result = session.run("""
-                MATCH (p:Person)-[:HAS_INTEREST]->(t:Tag)
-                WHERE p.id IN $active_ids
-                RETURN t.id AS tag_id, COUNT(*) AS usage_count
-                ORDER BY usage_count DESC
-                LIMIT 10
-            """, {"active_ids": active_person_ids})
-            interest_tag = [record.data() for record in result]
+        async with neo4j_async_client.async_driver.session() as session:
+            result = await session.run(ACTIVE_MEMBER_INTERESTS_QUERY, {"active_ids": active_person_ids})
+            interest_tag = await result.data()
         tag_ids = [tag["tag_id"] for tag in interest_tag]
         query = """
              SELECT 
@@ -311,9 +330,9 @@ async def get_organisation_name(
             FROM tag t JOIN tagclass tc ON t."TypeTagClassId" = tc.id
             WHERE t.id = ANY(%s);
         """
-        with pg_conn.cursor(cursor_factory=DictCursor) as cursor:
-            cursor.execute(query, (tag_ids,))
-            tag_details = cursor.fetchall()
+        async with pg_conn.cursor() as cursor:
+            await cursor.execute(query, (tag_ids,))
+            tag_details = await cursor.fetchall()
 
         # Maps tag_id → usage_count
         usage_map = {tag["tag_id"]: tag["usage_count"] for tag in interest_tag}
@@ -339,56 +358,107 @@ async def get_organisation_name(
 
 
 # --- 9. Endpoint for finding forums of member interested in same tag class ---
+TAGCLASS_FORUMS_QUERY = """
+MATCH (p:Person)-[:HAS_INTEREST]->(t:Tag)
+WHERE t.id IN $tag_ids
+MATCH (p)-[:MEMBER_OF]->(f:Forum)
+WITH f.id AS forum_id, COUNT(DISTINCT p) AS interested_members
+WHERE interested_members >= $min_members
+  AND ($after_id IS NULL OR forum_id > $after_id)
+RETURN forum_id, interested_members
+ORDER BY forum_id
+"""
+TAGCLASS_FORUMS_PAGE_QUERY = TAGCLASS_FORUMS_QUERY + "LIMIT $page_limit"
+
+# Forums read from Neo4j and MongoDB per page when /find-forum/by-tagclass streams NDJSON
+STREAM_FORUM_PAGE_SIZE = 500
+
+
+async def fetch_interested_forums(tag_ids, min_members, after_id, page_limit):
+    """Returns one page of [(forum_id, interested_members)] ordered by forum id, after after_id"""
+    async with neo4j_async_client.async_driver.session(database="neo4j") as session:
+        result = await session.run(
+            TAGCLASS_FORUMS_PAGE_QUERY,
+            parameters={"tag_ids": tag_ids, "min_members": min_members, "after_id": after_id,
+                        "page_limit": page_limit}
+        )
+        return [(record["forum_id"], record["interested_members"]) async for record in result]
+
+
+async def forums_with_interest(interested_by_forum):
+    """Yields the MongoDB forums of {forum_id: interested_members} by forum id, with interested_members attached"""
+    forums_cursor = mongo_client.db.forum.find({"id": {"$in": list(interested_by_forum)}}).sort("id", ASCENDING)
+    async for forum in forums_cursor:
+        forum["_id"] = str(forum["_id"])  # Manage ObjectId if necessary
+        forum["interested_members"] = interested_by_forum.get(forum.get("id"), 0)
+        yield forum
+
+
+async def stream_tagclass_forums(tag_ids, min_members, after_id):
+    """
+    Streaming counterpart of the paged response: Neo4j is read in pages of STREAM_FORUM_PAGE_SIZE
+    forums keyed on forum id, and the MongoDB forums of each page are yielded before the next one
+    is read, so no more than one page is held at a time.
+    """
+    while True:
+        page = await fetch_interested_forums(tag_ids, min_members, after_id, STREAM_FORUM_PAGE_SIZE)
+        if not page:
+            return
+        async for forum in forums_with_interest(dict(page)):
+            yield forum
+        if len(page) < STREAM_FORUM_PAGE_SIZE:
+            return
+        after_id = page[-1][0]
+
+
 @router.get("/find-forum/by-tagclass/{tagclass_name}",
             response_model=List[FindForumResponse],
             summary="Find all forums with at least X members interested in tags of the same tagClass",
             tags=["Forums"])
+@cached_endpoint("forums_by_tagclass")
 async def get_forums_by_tagclass_members(
+        request: Request,
+        response: Response,
         tagclass_name: str = Path(..., description="Name of the tagClass of members interested in"),
         min_members: int = Query(..., description="Minimum number of members interested in the same tagClass."),
-        pg_conn: psycopg2.extensions.connection = Depends(get_db_connection)
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description=LIMIT_DESCRIPTION),
+        cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+        pg_conn: LazyAsyncConnection = Depends(get_async_db_connection)
 
 ):
+    """
+    Forums are paged by forum id. Send 'Accept: application/x-ndjson' to stream the forums one per line
+    instead: the stream starts after the cursor, if given, and is not limited to one page.
+    """
+    after = decode_cursor(cursor, "id")
+    streaming = wants_ndjson(request)
     try:
         # 1. Get tag IDs for the given tag class on PostgreSQL
-        with pg_conn.cursor(cursor_factory=DictCursor) as cur:
-            cur.execute('''
+        async with pg_conn.cursor() as cur:
+            await cur.execute('''
                 SELECT t.id
                 FROM "tag" t
                 JOIN "tagclass" tc ON t."TypeTagClassId" = tc.id
                 WHERE tc.name = %s
             ''', (tagclass_name,))
-            tag_rows = cur.fetchall()
+            tag_rows = await cur.fetchall()
             tag_ids = [row["id"] for row in tag_rows]
             if not tag_ids:
                 raise HTTPException(status_code=404, detail=f"No Tag found for TagClass '{tagclass_name}'")
         
-        with driver.session(database="neo4j") as session:
-            result = session.run(
-                '''
-                MATCH (p:Person)-[:HAS_INTEREST]->(t:Tag)
-                WHERE t.id IN $tag_ids
-                MATCH (p)-[:MEMBER_OF]->(f:Forum)
-                WITH f.id AS forum_id, COUNT(DISTINCT p) AS interested_members
-                WHERE interested_members >= $min_members
-                RETURN forum_id, interested_members
-                ''',
-                parameters={"tag_ids": tag_ids, "min_members": min_members}
-            )
-            forum_infos = [{"forum_id": record["forum_id"], "interested_members": record["interested_members"]} for record in result]
-            forum_ids = [info["forum_id"] for info in forum_infos]
-        if not forum_ids:
+        if streaming:
+            return ndjson_response(stream_tagclass_forums(tag_ids, min_members, after["id"]),
+                                   FindForumResponse, "/find-forum/by-tagclass")
+
+        # 2. Forums with at least min_members members interested in the tags (Neo4j), one page
+        forum_infos = await fetch_interested_forums(tag_ids, min_members, after["id"], limit + 1)
+        forum_infos, next_cursor = split_page(forum_infos, limit, lambda info: {"id": info[0]})
+        if not forum_infos:
             return []
-        
-        # 3. Get forum from MongoDB with IDs
-        forum_docs = await db.forum.find({"id": {"$in": forum_ids}}).to_list(length=None)
-        for forum in forum_docs:
-            forum["_id"] = str(forum["_id"])  # Manage ObjectId if necessary
-            forum_id = forum.get("id")
-            # Find interested_members associated at forum_id
-            matching_info = next((info for info in forum_infos if info["forum_id"] == forum_id), None)
-            forum["interested_members"] = matching_info["interested_members"] if matching_info else 0
-        return forum_docs
+
+        # 3. Get forum from MongoDB with IDs, attaching interested_members associated at forum_id
+        set_next_cursor(response, next_cursor)
+        return [forum async for forum in forums_with_interest(dict(forum_infos))]
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal error: {str(e)}")
\ No newline at end of file
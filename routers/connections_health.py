@@ -6,8 +6,7 @@ from psycopg2.extras import DictCursor
 from pymongo.errors import ConnectionFailure
 from neo4j.exceptions import ServiceUnavailable, ClientError
 
-from db.mongo_client import db
-from db.neo4j_client import driver
+from db import mongo_client, neo4j_client
 from db.postgres_client import get_db_connection
 
 
@@ -23,7 +22,7 @@ async def check_mongodb_connection():
     Raises an HTTPException with a 500 status code if the connection fails.
     """
     try:
-        result = await db.command("hello")
+        result = await mongo_client.db.command("hello")
         if result and result.get("ok") == 1:
             return {"status": "MongoDB connection is healthy", "server_info": result.get("me", "N/A")}
         else:
@@ -65,7 +64,7 @@ def check_neo4j_connection():
     Checks the connection to the Neo4j database.
     """
     try:
-        with driver.session(database="neo4j") as session:  # Specify database if not default
+        with neo4j_client.driver.session(database="neo4j") as session:  # Specify database if not default
             result = session.run("CALL dbms.components() YIELD name, versions, edition")
             record = result.single()
             if record:
@@ -1,15 +1,23 @@
-from fastapi import APIRouter, HTTPException, Path, Query, Depends
-
-import psycopg2, math
-from psycopg2.extras import DictCursor
-
-from db.mongo_client import db
-from db.neo4j_client import driver
-from db.postgres_client import get_db_connection
+from fastapi import APIRouter, HTTPException, Path, Query, Depends, Request, Response
+from pymongo import ASCENDING
+
+import psycopg, math
+
+from db import mongo_client
+from db.forum_member_count import MEMBER_COUNT_EXPRESSION
+from db import neo4j_async_client
+from db.postgres_async_client import LazyAsyncConnection, get_async_db_connection
+from utils.cache import cached_endpoint
+from utils.orchestration import run_concurrently
+from utils.pagination import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, LIMIT_DESCRIPTION, CURSOR_DESCRIPTION,
+    decode_cursor, split_page, set_next_cursor
+)
+from utils.streaming import wants_ndjson, ndjson_response
 
 from models.query_1.model import PostResponse
 from models.query_2.model import ForumResponse
-from models.query_3.model import FullResponseItem
+from models.query_3.model import FullResponseItem, PersonBase, PostBase, CommentWithPost, ForumBase
 from models.query_4.model import GroupDetail, MemberInfo
 from models.query_5.model import SecondDegreeCommentResponse
 
@@ -24,11 +32,21 @@ router = APIRouter()
          response_model=List[PostResponse],
          summary="Find all posts created by a person given one of their emails",
          tags=["Posts"])
+@cached_endpoint("posts_by_email")
 async def get_posts_by_user_email(
-        user_email: str = Path(..., description="An email address of the post creator.", example="Jan16@hotmail.com")
+        request: Request,
+        response: Response,
+        user_email: str = Path(..., description="An email address of the post creator.", example="Jan16@hotmail.com"),
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description=LIMIT_DESCRIPTION),
+        cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION)
 ):
+    """
+    Posts are paged by id. Send 'Accept: application/x-ndjson' to stream the posts one per line
+    instead: the stream starts after the cursor, if given, and is not limited to one page.
+    """
+    after = decode_cursor(cursor, "id")
     try:
-        person_document = await db.person.find_one({"email": {"$in": [user_email]}})
+        person_document = await mongo_client.db.person.find_one({"email": {"$in": [user_email]}})
         if not person_document:
             raise HTTPException(status_code=404, detail=f"Person with email '{user_email}' not found.")
         
@@ -36,10 +54,18 @@ async def get_posts_by_user_email(
         if person_id_from_doc is None:
             raise HTTPException(status_code=500, detail="Person record exists but is missing the numeric 'id' field.")
         
-        posts_cursor = db.post.find({"CreatorPersonId": person_id_from_doc})
-        posts_list = [post_doc async for post_doc in posts_cursor]
-
-        return posts_list
+        posts_filter = {"CreatorPersonId": person_id_from_doc}
+        if after["id"] is not None:
+            posts_filter["id"] = {"$gt": after["id"]}
+        posts_cursor = mongo_client.db.post.find(posts_filter).sort("id", ASCENDING)
+        if wants_ndjson(request):
+            return ndjson_response(posts_cursor, PostResponse, "/by-email")
+
+        posts_list = [post_doc async for post_doc in posts_cursor.limit(limit + 1)]
+
+        posts_page, next_cursor = split_page(posts_list, limit, lambda post: {"id": post["id"]})
+        set_next_cursor(response, next_cursor)
+        return posts_page
     
     except HTTPException:
         raise
@@ -49,16 +75,35 @@ async def get_posts_by_user_email(
 
 
 # --- 2. Endpoint for finding forum by user email ---
+FORUM_MEMBERSHIPS_QUERY = f"""
+MATCH (p:Person {{id: $person_id}})-[r:MEMBER_OF]->(f:Forum)
+WHERE $after_date IS NULL
+   OR r.creationDate > $after_date
+   OR (r.creationDate = $after_date AND f.id > $after_id)
+RETURN f.id AS forum_id,
+r.creationDate AS membership_creation_date,
+{MEMBER_COUNT_EXPRESSION} AS member_count
+ORDER BY membership_creation_date, forum_id
+LIMIT $page_limit
+"""
+
+
 @router.get("/forumsEmail/{user_email}",
  response_model=List[ForumResponse],
             summary="Find all forums a person belongs to, given their email",
             tags=["Forum"])
+@cached_endpoint("forums_by_email")
 async def get_forums_by_user_email(
-        user_email: str = Path(..., description="An email address of the forum member.", example="Jan16@hotmail.com")
+        response: Response,
+        user_email: str = Path(..., description="An email address of the forum member.", example="Jan16@hotmail.com"),
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description=LIMIT_DESCRIPTION),
+        cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION)
 ):
+    """Forums are paged by membership creation date (then forum id)."""
+    after = decode_cursor(cursor, "date", "id")
     try:
         # If email is an array field in MongoDB
-        person_document = await db.person.find_one({"email": {"$in": [user_email]}})
+        person_document = await mongo_client.db.person.find_one({"email": {"$in": [user_email]}})
         if not person_document:
             raise HTTPException(status_code=404, detail=f"Person with email '{user_email}' not found.")
 
@@ -66,38 +111,33 @@ async def get_forums_by_user_email(
         if not person_id:
             raise HTTPException(status_code=500, detail=f"Person record exists but is missing an 'id'.")
 
-        # Found membership user-forums
-        with driver.session(database="neo4j") as session:
-            query = """
-            MATCH (p:Person {id: $person_id})-[r:MEMBER_OF]->(f:Forum)
-            RETURN f.id AS forum_id,
-            r.creationDate AS membership_creation_date
-            """
-            neo4j_results = list(session.run(query, person_id=person_id))
+        # Found membership user-forums with their stored member count, one page at a time
+        async with neo4j_async_client.async_driver.session(database="neo4j") as session:
+            result = await session.run(FORUM_MEMBERSHIPS_QUERY, person_id=person_id, after_date=after["date"],
+                                       after_id=after["id"], page_limit=limit + 1)
+            neo4j_results = [record async for record in result]
         if not neo4j_results:
+            if cursor:
+                return []
             raise HTTPException(status_code=404, detail=f"No forum memberships found for person ID {person_id}.")
 
-        # Recover the forums
+        neo4j_results, next_cursor = split_page(
+            neo4j_results, limit,
+            lambda record: {"date": record["membership_creation_date"], "id": record["forum_id"]}
+        )
         forum_ids = [record["forum_id"] for record in neo4j_results]
-        forum_docs = await db.forum.find({"id": {"$in": forum_ids}}).to_list(length=None)
 
-        # Maps {forum_id: creation_date}
+        # Maps {forum_id: creation_date} and {forum_id: member_count}
         membership_dates = {
             record["forum_id"]: record["membership_creation_date"]
             for record in neo4j_results
         }
+        member_counts = {record["forum_id"]: record["member_count"] for record in neo4j_results}
 
-        # Count number for each forum 
-        member_counts = {}
-        with driver.session(database="neo4j") as session:
-            count_query = """
-                MATCH (p:Person)-[:MEMBER_OF]->(f:Forum)
-                WHERE f.id IN $forum_ids
-                RETURN f.id AS forum_id, count(p) AS member_count
-             """
-            count_results = session.run(count_query, forum_ids=forum_ids)
-            for record in count_results:
-                member_counts[record["forum_id"]] = record["member_count"]
+        # Recover the forums
+        forum_docs = await mongo_client.db.forum.find(
+            {"id": {"$in": forum_ids}}, {"id": 1, "title": 1, "_id": 0}
+        ).to_list(length=None)
 
         results = []
         for forum in forum_docs:
@@ -108,41 +148,172 @@ async def get_forums_by_user_email(
                 "membership_creation_date": membership_dates.get(fid),
                 "member_count": member_counts.get(fid, 0)
             })
-        results.sort(key=lambda x: x["membership_creation_date"])
+        results.sort(key=lambda x: (x["membership_creation_date"], x["forum_id"]))
+        set_next_cursor(response, next_cursor)
         return results
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal error: {str(e)}")
 
 
+# --- Projections limited to the fields FullResponseItem needs (query 3) ---
+PERSON_PROJECTION = {**dict.fromkeys(PersonBase.model_fields, 1), "_id": 0}
+POST_PROJECTION = {**dict.fromkeys(PostBase.model_fields, 1), "_id": 0}
+COMMENT_PROJECTION = {**{field: 1 for field in CommentWithPost.model_fields if field != "post"}, "_id": 0}
+FORUM_PROJECTION = {**dict.fromkeys(ForumBase.model_fields, 1), "_id": 0}
+
+
+async def fetch_posts_and_comments(mongo_db, target_id):
+    """Fetches the posts of the target person, then all the comments on them. Returns (posts, comments)."""
+    target_posts = await mongo_db.post.find({"CreatorPersonId": target_id}, POST_PROJECTION).to_list(length=None)
+    post_ids = [post["id"] for post in target_posts]
+    if not post_ids:
+        return target_posts, []
+    comments = await mongo_db.comment.find(
+        {"ParentPostId": {"$in": post_ids}}, COMMENT_PROJECTION
+    ).to_list(length=None)
+    return target_posts, comments
+
+
+async def fetch_knowing_people_and_forums(mongo_db, known_ids, forum_ids_by_person):
+    """
+    Fetches the knowing persons and the forums of every person in two concurrent round trips,
+    instead of one forum lookup per person. Returns ({person_id: person}, {forum_id: forum}).
+    """
+    all_forum_ids = list({fid for forum_ids in forum_ids_by_person.values() for fid in forum_ids})
+    knowing_people, forums = await run_concurrently(
+        mongo_db.person.find({"id": {"$in": known_ids}}, PERSON_PROJECTION).to_list(length=None),
+        mongo_db.forum.find({"id": {"$in": all_forum_ids}}, FORUM_PROJECTION).to_list(length=None)
+    )
+    return {p["id"]: p for p in knowing_people}, {f["id"]: f for f in forums}
+
+
+def forum_ids_of(comments, post_map):
+    return sorted({
+        post_map[c["ParentPostId"]]["ContainerForumId"]
+        for c in comments
+        if c["ParentPostId"] in post_map and post_map[c["ParentPostId"]].get("ContainerForumId")
+    })
+
+
+async def compose_person_items(mongo_db, target_person, known_comments, post_map):
+    """
+    Builds the FullResponseItem dicts for {commenter_id: comments} of the persons who know the target,
+    fetching their person documents and forums in bulk.
+    """
+    forum_ids_by_person = {cid: forum_ids_of(comments, post_map) for cid, comments in known_comments.items()}
+    knowing_people_map, forum_map = await fetch_knowing_people_and_forums(
+        mongo_db, list(known_comments), forum_ids_by_person
+    )
+
+    results = []
+    for commenter_id, user_comments in known_comments.items():
+        knowing_person = knowing_people_map.get(commenter_id)
+        if not knowing_person:
+            continue
+        forums = [forum_map[fid] for fid in forum_ids_by_person[commenter_id] if fid in forum_map]
+
+        results.append({
+            "target_person": target_person,
+            "knowing_person": knowing_person,
+            "comments": [
+                {
+                    **comment,
+                    "post": {
+                        **post_map.get(comment["ParentPostId"], {}),
+                        "forum_id": post_map.get(comment["ParentPostId"], {}).get("ContainerForumId")
+                    }
+                }
+                for comment in user_comments
+            ],
+            "forums": forums
+        })
+    return results
+
+
+# Knowing persons composed per batch when /find-person/by-email streams NDJSON
+STREAM_PERSON_BATCH_SIZE = 100
+
+
+async def stream_person_items(mongo_db, target_person, post_map, friend_ids):
+    """
+    Streaming counterpart of compose_person_items: the friends' comments on the target's posts are
+    read sorted by commenter, and composed in batches of STREAM_PERSON_BATCH_SIZE persons.
+    """
+    if not post_map or not friend_ids:
+        return
+    comments_cursor = mongo_db.comment.find(
+        {"ParentPostId": {"$in": list(post_map)}, "CreatorPersonId": {"$in": list(friend_ids)}},
+        COMMENT_PROJECTION,
+        allow_disk_use=True
+    ).sort("CreatorPersonId", ASCENDING)
+
+    batch = {}
+    async for comment in comments_cursor:
+        commenter_id = comment["CreatorPersonId"]
+        if commenter_id not in batch and len(batch) >= STREAM_PERSON_BATCH_SIZE:
+            for item in await compose_person_items(mongo_db, target_person, batch, post_map):
+                yield item
+            batch = {}
+        batch.setdefault(commenter_id, []).append(comment)
+
+    if batch:
+        for item in await compose_person_items(mongo_db, target_person, batch, post_map):
+            yield item
+
+
 # --- 3. Endpoint for finding persons who know and commented by user email ---
+KNOWN_PERSON_IDS_QUERY = """
+MATCH (a:Person {id: $target_id})-[:KNOWS]->(b:Person)
+RETURN b.id AS id
+"""
+
+
 @router.get("/find-person/by-email/{target_email}",
             response_model=List[FullResponseItem],
             summary="Find all person who know and have commented a user target post",
             tags=["Persons"])
+@cached_endpoint("persons_who_know_and_commented")
 async def find_person_who_know_and_commented(
+        request: Request,
         target_email: str = Path(..., description="An email address of the target user.", example="Jeorge74@gmail.com")
 ):
+    """Send 'Accept: application/x-ndjson' to stream the result items one per line."""
     try:
         # 1. Find target person
-        target_person = await db.person.find_one({"email": target_email})
+        target_person = await mongo_client.db.person.find_one({"email": target_email}, PERSON_PROJECTION)
         if not target_person:
             raise HTTPException(status_code=404, detail=f"Person with email '{target_email}' not found.")
         
-        target_id = target_person.get("id") or str(target_person.get("_id"))
-        if not target_id:
+        target_id = target_person.get("id")
+        if target_id is None:
             raise HTTPException(status_code=500, detail="Person record exists but is missing an 'id'.")
 
-        # 2. Find all posts created by target user
-        target_posts = await db.post.find({"CreatorPersonId": target_id}).to_list(length=None)
-        post_ids = [post["id"] for post in target_posts]
-        if not post_ids:
+        # 2. Find all posts created by target user, then all comments on them (MongoDB, fetch_posts_and_comments)
+        # 3. Meanwhile, use Neo4j to find who the target person knows
+        async def fetch_known_ids():
+            async with neo4j_async_client.async_driver.session(database="neo4j") as session:
+                result = await session.run(KNOWN_PERSON_IDS_QUERY, {"target_id": target_id})
+                return {record["id"] async for record in result}
+
+        if wants_ndjson(request):
+            # Streaming: only the target's posts are loaded up front, comments are streamed by commenter
+            target_posts, friend_ids = await run_concurrently(
+                mongo_client.db.post.find({"CreatorPersonId": target_id}, POST_PROJECTION).to_list(length=None),
+                fetch_known_ids()
+            )
+            post_map = {post["id"]: post for post in target_posts}
+            return ndjson_response(stream_person_items(mongo_client.db, target_person, post_map, friend_ids),
+                                   FullResponseItem, "/find-person/by-email")
+
+        (target_posts, comments), friend_ids = await run_concurrently(
+            fetch_posts_and_comments(mongo_client.db, target_id), fetch_known_ids()
+        )
+        if not target_posts:
             return []
 
         post_map = {post["id"]: post for post in target_posts}
 
-        # 3. Find all comments on target posts
-        comments = await db.comment.find({"ParentPostId": {"$in": post_ids}}).to_list(length=None)
         commenter_map = {}
         for comment in comments:
             commenter_id = comment["CreatorPersonId"]
@@ -150,77 +321,53 @@ async def find_person_who_know_and_commented(
 
         if not commenter_map:
             return []
-        commenter_ids = list(commenter_map.keys())
-
-        # 4. Use Neo4j to find which commenters know the target person
-        with driver.session(database="neo4j") as session:
-            query = """
-            MATCH (a:Person {id: $target_id})-[:KNOWS]->(b:Person)
-            WHERE b.id IN $commenter_ids
-            RETURN b.id AS id
-            """
-            result = session.run(query, {
-                "target_id": target_id,
-                "commenter_ids": commenter_ids
-            })
-            known_ids = {record["id"] for record in result}
-        if not known_ids:
-            return []
 
-        # 5. Get knowing persons from MongoDB in bulk
-        knowing_people = await db.person.find({"id": {"$in": list(known_ids)}}).to_list(length=None)
-        knowing_people_map = {p["id"]: p for p in knowing_people}
-
-        # 6. Compose results
-        results = []
-        for commenter_id in known_ids:
-            knowing_person = knowing_people_map.get(commenter_id)
-            if not knowing_person:
-                continue
-            user_comments = commenter_map.get(commenter_id, [])
-            commented_post_ids = [c["ParentPostId"] for c in user_comments]
-
-            forum_ids = list({
-                post_map[pid]["ContainerForumId"]
-                for pid in commented_post_ids
-                if pid in post_map and post_map[pid].get("ContainerForumId")
-            })
-            forums = await db.forum.find({"id": {"$in": forum_ids}}).to_list(length=None)
+        # 4. Keep the commenters who know the target person
+        known_comments = {cid: c for cid, c in commenter_map.items() if cid in friend_ids}
+        if not known_comments:
+            return []
 
-            results.append({
-                "target_person": target_person,
-                "knowing_person": knowing_person,
-                "comments": [
-                    {
-                        **comment,
-                        "post": {
-                            **post_map.get(comment["ParentPostId"], {}),
-                            "forum_id": post_map.get(comment["ParentPostId"], {}).get("ContainerForumId")
-                        }
-                    }
-                    for comment in user_comments
-                ],
-                "forums": forums
-            })
-        return results
+        # 5. Get knowing persons and the forums of their commented posts in bulk, then compose results
+        return await compose_person_items(mongo_client.db, target_person, known_comments, post_map)
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal error: {str(e)}")
 
 
 # --- Helper function for Neo4j results ---
-def get_neo4j_results(tx, query, params):
-    result = tx.run(query, params)
-    return [record.data() for record in result]
+async def get_neo4j_results(tx, query, params):
+    result = await tx.run(query, params)
+    return [record.data() async for record in result]
 
 
 # --- 4. Endpoint for finding Find Groups by Work & Forum ---
+# Two-stage query which worked well without problematic indexes but now filtered for $companyIdParam
+COMPANY_FORUM_GROUPS_QUERY = """
+MATCH (person:Person)-[workRel:WORK_AT]->(company:Company {id: $companyIdParam}),
+      (person)-[:MEMBER_OF]->(forum:Forum)
+WHERE workRel.workFrom IS NOT NULL AND workRel.workFrom <= $targetYear
+WITH company, forum, count(person) AS groupSizeCalc
+WHERE groupSizeCalc > 1
+
+MATCH (p:Person)-[w:WORK_AT]->(company), // company è già filtrata per id
+      (p)-[:MEMBER_OF]->(forum)
+WHERE w.workFrom IS NOT NULL AND w.workFrom <= $targetYear
+WITH company, forum, collect(p.id) AS personMongoIds // groupSizeCalc non serve più qui
+ORDER BY forum.id // Ordina per ID del forum per risultati consistenti
+RETURN company.id AS companyPsqlId, // Sarà sempre $companyIdParam
+       forum.id AS forumMongoId,
+       personMongoIds
+LIMIT $limitParam
+"""
+
+
 @router.get(
     "/groups/by-company/{company_name}/year/{target_year}",  # URL più RESTful
     response_model=List[GroupDetail],
     summary="Find groups of people by specific company (from yean) and shared forum",
     tags=["Complex Queries - Specific Company"]
 )
+@cached_endpoint("groups_by_company")
 async def find_groups_for_specific_company(
         company_name: str = Path(..., description="Name of target company"),
         target_year: int = Path(...,
@@ -228,44 +375,26 @@ async def find_groups_for_specific_company(
                                 ge=1900, le=2100),
         limit: Optional[int] = Query(50, description="Maximium number of forum groups to return for this company",
                                      ge=1, le=1000),
-        pg_conn: psycopg2.extensions.connection = Depends(get_db_connection)
+        pg_conn: LazyAsyncConnection = Depends(get_async_db_connection)
 ):
 
     company_psql_id = None
     try:
-        with pg_conn.cursor(cursor_factory=DictCursor) as cursor:
-            cursor.execute("SELECT id FROM organization WHERE name = %s", (company_name,))
-            company_row = cursor.fetchone()
+        async with pg_conn.cursor() as cursor:
+            await cursor.execute("SELECT id FROM organization WHERE name = %s", (company_name,))
+            company_row = await cursor.fetchone()
             if company_row:
                 company_psql_id = company_row["id"]
             else:
                 raise HTTPException(status_code=404, detail=f"Azienda con nome '{company_name}' non trovata.")
-        pg_conn.commit()  # Commit dopo la lettura, buona pratica
+        await pg_conn.commit()  # Commit dopo la lettura, buona pratica
 
-    except psycopg2.Error as e:
+    except psycopg.Error as e:
         print(f"ERROR: PostgreSQL error while searching for company ID of '{company_name}': {e}")
-        if pg_conn: pg_conn.rollback()
+        if pg_conn: await pg_conn.rollback()
         raise HTTPException(status_code=500, detail=f"Database error while comapny research: {e}")
 
     # Step 2: executing Neo4j Query
-    # Using two-stage query which worked well without problematic indexes but now filtered for $companyIdParam
-    cypher_query_specific_company = """
-    MATCH (person:Person)-[workRel:WORK_AT]->(company:Company {id: $companyIdParam}),
-          (person)-[:MEMBER_OF]->(forum:Forum)
-    WHERE workRel.workFrom IS NOT NULL AND workRel.workFrom <= $targetYear
-    WITH company, forum, count(person) AS groupSizeCalc
-    WHERE groupSizeCalc > 1
-
-    MATCH (p:Person)-[w:WORK_AT]->(company), // company è già filtrata per id
-          (p)-[:MEMBER_OF]->(forum)
-    WHERE w.workFrom IS NOT NULL AND w.workFrom <= $targetYear
-    WITH company, forum, collect(p.id) AS personMongoIds // groupSizeCalc non serve più qui
-    ORDER BY forum.id // Ordina per ID del forum per risultati consistenti
-    RETURN company.id AS companyPsqlId, // Sarà sempre $companyIdParam
-           forum.id AS forumMongoId,
-           personMongoIds
-    LIMIT $limitParam
-    """
     neo4j_params = {
         "companyIdParam": company_psql_id,
         "targetYear": target_year,
@@ -275,9 +404,9 @@ async def find_groups_for_specific_company(
     final_group_details_specific = []
 
     try:
-        with driver.session(database="neo4j") as session:
-            raw_groups_from_neo4j = session.read_transaction(get_neo4j_results, cypher_query_specific_company,
-                                                             neo4j_params)
+        async with neo4j_async_client.async_driver.session(database="neo4j") as session:
+            raw_groups_from_neo4j = await session.execute_read(get_neo4j_results, COMPANY_FORUM_GROUPS_QUERY,
+                                                               neo4j_params)
 
         if not raw_groups_from_neo4j:
             return []  
@@ -287,20 +416,26 @@ async def find_groups_for_specific_company(
         all_person_ids_flat = list(set(pid for g in raw_groups_from_neo4j for pid in g["personMongoIds"]))
 
 
-        forum_details_map = {}
-        if all_forum_ids:
-            forum_cursor = db.forum.find({"id": {"$in": all_forum_ids}}, {"id": 1, "title": 1})
-            async for forum_doc in forum_cursor:
-                forum_details_map[forum_doc["id"]] = forum_doc.get("title", "Forum Sconosciuto")
+        async def fetch_forum_titles():
+            forum_details_map = {}
+            if all_forum_ids:
+                forum_cursor = mongo_client.db.forum.find({"id": {"$in": all_forum_ids}}, {"id": 1, "title": 1})
+                async for forum_doc in forum_cursor:
+                    forum_details_map[forum_doc["id"]] = forum_doc.get("title", "Forum Sconosciuto")
+            return forum_details_map
 
-        person_details_map = {}
-        if all_person_ids_flat:
-            person_cursor = db.person.find(
-                {"id": {"$in": all_person_ids_flat}},
-                {"id": 1, "firstName": 1, "lastName": 1, "email": 1, "_id": 0}
-            )
-            async for person_doc in person_cursor:
-                person_details_map[person_doc["id"]] = MemberInfo(**person_doc)
+        async def fetch_members():
+            person_details_map = {}
+            if all_person_ids_flat:
+                person_cursor = mongo_client.db.person.find(
+                    {"id": {"$in": all_person_ids_flat}},
+                    {"id": 1, "firstName": 1, "lastName": 1, "email": 1, "_id": 0}
+                )
+                async for person_doc in person_cursor:
+                    person_details_map[person_doc["id"]] = MemberInfo(**person_doc)
+            return person_details_map
+
+        forum_details_map, person_details_map = await run_concurrently(fetch_forum_titles(), fetch_members())
 
         # Assembling final results
         for group_skeleton in raw_groups_from_neo4j:
@@ -332,17 +467,34 @@ async def find_groups_for_specific_company(
 
 
 # --- 5. Endpoint for finding 2nd-degree connections who commented on posts liked by a user ---
+SECOND_DEGREE_QUERY = """
+MATCH (p1:Person {id: $person_id})-[:KNOWS*2..2]-(p2:Person)
+RETURN DISTINCT p2.id AS second_person_id
+"""
+
+LIKED_POSTS_QUERY = """
+MATCH (p1:Person {id: $person_id})-[:LIKES]->(post:Post)
+RETURN DISTINCT post.id AS liked_post_id
+"""
+
+
 @router.get("/second_degree_commenters_on_liked_posts/{user_email}",
     response_model=List[SecondDegreeCommentResponse],
     summary="Find 2nd-degree connections who commented on posts liked by a user",
     tags=["Analysis"]
 )
+@cached_endpoint("second_degree_commenters")
 async def get_second_degree_commenters_on_liked_posts(
-    user_email: str = Path(..., description="Email of the person to analyze", example="Jan16@hotmail.com")
+    response: Response,
+    user_email: str = Path(..., description="Email of the person to analyze", example="Jan16@hotmail.com"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description=LIMIT_DESCRIPTION),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION)
 ):
+    """Results are paged by comment id."""
+    after = decode_cursor(cursor, "id")
     try:
         # Find id user by mail
-        person_document = await db.person.find_one({"email": {"$in": [user_email]}})
+        person_document = await mongo_client.db.person.find_one({"email": {"$in": [user_email]}})
         if not person_document:
             raise HTTPException(status_code=404, detail=f"Person with email '{user_email}' not found.")
 
@@ -351,44 +503,57 @@ async def get_second_degree_commenters_on_liked_posts(
             raise HTTPException(status_code=500, detail="Person record exists but is missing an 'id'.")
 
         # Find second-degree connection
-        with driver.session(database="neo4j") as session:
-            second_degree_query = """
-                MATCH (p1:Person {id: $person_id})-[:KNOWS*2..2]-(p2:Person)
-                RETURN DISTINCT p2.id AS second_person_id
-             """
-            second_degree_results = list(session.run(second_degree_query, person_id=person_id))
+        async def fetch_second_degree():
+            async with neo4j_async_client.async_driver.session(database="neo4j") as session:
+                result = await session.run(SECOND_DEGREE_QUERY, person_id=person_id)
+                return [record async for record in result]
+
+        # Find posts liked by user
+        async def fetch_liked_posts():
+            async with neo4j_async_client.async_driver.session(database="neo4j") as session:
+                result = await session.run(LIKED_POSTS_QUERY, person_id=person_id)
+                return [record async for record in result]
+
+        second_degree_results, liked_posts_results = await run_concurrently(
+            fetch_second_degree(), fetch_liked_posts()
+        )
 
         if not second_degree_results:
             raise HTTPException(status_code=404, detail=f"No second-degree connections found for person with ID '{user_email}'.")
 
-        # Find posts liked by user
-        with driver.session(database="neo4j") as session:
-            liked_posts_query = """
-                MATCH (p1:Person {id: $person_id})-[:LIKES]->(post:Post)
-                RETURN DISTINCT post.id AS liked_post_id
-            """
-            liked_posts_results = list(session.run(liked_posts_query, person_id=person_id))
-
         if not liked_posts_results:
             raise HTTPException(status_code=404,detail=f"No liked posts found for person with ID '{person_id}'.")
 
         second_degree_ids = [record["second_person_id"] for record in second_degree_results]
         liked_post_ids = [record["liked_post_id"] for record in liked_posts_results]
 
-        # Find comments write by second-degree connections on posts liked by user
-        comments = await db.comment.find({
+        # Find comments write by second-degree connections on posts liked by user (one page)
+        comments_filter = {
             "CreatorPersonId": {"$in": second_degree_ids},
             "ParentPostId": {"$in": liked_post_ids}
-        }).to_list(length=None)
+        }
+        if after["id"] is not None:
+            comments_filter["id"] = {"$gt": after["id"]}
+        comments_cursor = mongo_client.db.comment.find(comments_filter).sort("id", ASCENDING).limit(limit + 1)
+        comments = await comments_cursor.to_list(length=None)
 
         if not comments:
+            if cursor:
+                return []
             raise HTTPException(status_code=404,detail="No comments found from second-degree connections on liked posts.")
 
+        comments, next_cursor = split_page(comments, limit, lambda comment: {"id": comment["id"]})
+
         results = []
-        # Retrieve post once
+        # Retrieve posts and people once, concurrently
         post_ids_set = list(set(comment["ParentPostId"] for comment in comments))
-        posts = await db.post.find({"id": {"$in": post_ids_set}}).to_list(length=None)
+        commenter_ids = list(set(comment["CreatorPersonId"] for comment in comments))
+        posts, people = await run_concurrently(
+            mongo_client.db.post.find({"id": {"$in": post_ids_set}}).to_list(length=None),
+            mongo_client.db.person.find({"id": {"$in": commenter_ids}}).to_list(length=None)
+        )
         post_map = {post["id"]: post for post in posts}
+        person_map = {p["id"]: p.get("firstName", "") + " " + p.get("lastName", "") for p in people}
 
         def is_empty(value):
             return (
@@ -397,11 +562,6 @@ async def get_second_degree_commenters_on_liked_posts(
                 (isinstance(value, float) and math.isnan(value))
             )
 
-        # Retrieve people once
-        commenter_ids = list(set(comment["CreatorPersonId"] for comment in comments))
-        people = await db.person.find({"id": {"$in": commenter_ids}}).to_list(length=None)
-        person_map = {p["id"]: p.get("firstName", "") + " " + p.get("lastName", "") for p in people}
-
         for comment in comments:
             commenter_id = comment["CreatorPersonId"]
             post_id = comment["ParentPostId"]
@@ -421,6 +581,7 @@ async def get_second_degree_commenters_on_liked_posts(
                 "second_person_name": person_name,
                 "comment_content": comment.get("content"),
             })
+        set_next_cursor(response, next_cursor)
         return results
 
     except Exception as e:
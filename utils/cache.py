@@ -0,0 +1,307 @@
+import functools
+import inspect
+import json
+import pickle
+import threading
+import time
+from typing import NamedTuple
+
+from cachetools import TTLCache
+from fastapi import Request, Response
+from pymongo import MongoClient, ReturnDocument
+
+from config import settings
+from db import mongo_client
+from utils.streaming import wants_ndjson
+
+
+# Generation counter shared by every API process: the init scripts bump it, and the cache drops
+# whatever it stored under an older generation.
+CACHE_META_COLLECTION = "cache_meta"
+CACHE_META_ID = "query_cache"
+
+# Parameter types that take part in the cache key (dependencies such as DB connections are skipped)
+_KEY_PARAM_TYPES = (str, int, float, bool, type(None))
+
+
+class _ResultWithHeaders(NamedTuple):
+    """Cached value of an endpoint that also sets headers (e.g. the pagination cursor)."""
+    value: object
+    headers: dict
+
+
+class _CountingTTLCache(TTLCache):
+    """TTLCache (LRU + per-entry TTL) that counts size evictions and TTL expirations."""
+
+    def __init__(self, maxsize, ttl):
+        super().__init__(maxsize=maxsize, ttl=ttl)
+        self.evictions = 0
+        self.expirations = 0
+
+    def popitem(self):
+        item = super().popitem()
+        self.evictions += 1
+        return item
+
+    def expire(self, time=None):
+        expired = super().expire(time)
+        self.expirations += len(expired)
+        return expired
+
+
+class LRUCacheBackend:
+    """In-process backend: bounded by number of entries and by TTL."""
+
+    name = "memory"
+
+    def __init__(self, max_entries, ttl_seconds):
+        self._cache = _CountingTTLCache(maxsize=max_entries, ttl=ttl_seconds)
+        self._lock = threading.Lock()
+
+    # Async like the Redis backend, although nothing here waits
+    async def get(self, key):
+        with self._lock:
+            try:
+                return True, self._cache[key]
+            except KeyError:
+                return False, None
+
+    async def set(self, key, value):
+        with self._lock:
+            self._cache[key] = value
+
+    async def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    async def close(self):
+        pass
+
+    async def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._cache),
+                "max_size": int(self._cache.maxsize),
+                "ttl_seconds": self._cache.ttl,
+                "evictions": self._cache.evictions,
+                "expirations": self._cache.expirations
+            }
+
+
+class RedisCacheBackend:
+    """
+    Shared backend for multi-process deployments. Requires the optional 'redis' package.
+    Uses the asyncio client, so cache lookups never block the event loop.
+    """
+
+    name = "redis"
+
+    def __init__(self, redis_url, ttl_seconds, prefix="maadb:query_cache:"):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("The redis cache backend requires the 'redis' package to be installed.") from e
+        self._client = redis.Redis.from_url(redis_url)
+        self._ttl = ttl_seconds
+        self._prefix = prefix
+
+    async def _keys(self):
+        return [key async for key in self._client.scan_iter(match=self._prefix + "*")]
+
+    async def get(self, key):
+        raw = await self._client.get(self._prefix + key)
+        if raw is None:
+            return False, None
+        return True, pickle.loads(raw)
+
+    async def set(self, key, value):
+        await self._client.set(self._prefix + key, pickle.dumps(value), ex=self._ttl)
+
+    async def clear(self):
+        keys = await self._keys()
+        if keys:
+            await self._client.delete(*keys)
+
+    async def close(self):
+        await self._client.aclose()
+
+    async def stats(self):
+        # Evictions are done by Redis itself (maxmemory policy), so they are read from the server
+        info = await self._client.info("stats")
+        return {
+            "size": len(await self._keys()),
+            "ttl_seconds": self._ttl,
+            "evictions": info.get("evicted_keys", 0),
+            "expirations": info.get("expired_keys", 0)
+        }
+
+
+class QueryCache:
+    """
+    Response cache for the query endpoints, keyed on endpoint name and normalized parameters.
+    Entries are tagged with the data generation stored in MongoDB, so a reload by any init
+    script invalidates them (checked at most every generation_check_seconds).
+    """
+
+    def __init__(self, backend, generation_check_seconds):
+        self.backend = backend
+        self.enabled = True
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._generation = None
+        self._generation_checked_at = 0.0
+        self._generation_check_seconds = generation_check_seconds
+
+    async def _current_generation(self):
+        now = time.monotonic()
+        if self._generation is None or now - self._generation_checked_at >= self._generation_check_seconds:
+            meta = await mongo_client.db[CACHE_META_COLLECTION].find_one({"_id": CACHE_META_ID}, {"generation": 1})
+            generation = meta.get("generation", 0) if meta else 0
+            if self._generation is not None and generation != self._generation:
+                await self.backend.clear()
+                self.invalidations += 1
+            self._generation = generation
+            self._generation_checked_at = now
+        return self._generation
+
+    @staticmethod
+    def make_key(endpoint, params, generation):
+        normalized = {
+            name: value.strip() if isinstance(value, str) else value
+            for name, value in params.items()
+            if isinstance(value, _KEY_PARAM_TYPES)
+        }
+        return f"{generation}:{endpoint}:{json.dumps(normalized, sort_keys=True, default=str)}"
+
+    async def get_or_compute(self, endpoint, params, compute):
+        try:
+            key = self.make_key(endpoint, params, await self._current_generation())
+            found, value = await self.backend.get(key)
+        except Exception as e:
+            # The cache must never break a query: fall back to computing the response
+            print(f"WARNING: query cache lookup failed for {endpoint}: {e}")
+            return await compute()
+
+        if found:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        value = await compute()
+        if isinstance(value, Response):
+            # Streamed/raw responses are consumed once and cannot be replayed
+            return value
+        try:
+            await self.backend.set(key, value)
+        except Exception as e:
+            print(f"WARNING: query cache store failed for {endpoint}: {e}")
+        return value
+
+    async def clear(self):
+        await self.backend.clear()
+        self.invalidations += 1
+
+    async def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "backend": self.backend.name,
+            "generation": self._generation,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "invalidations": self.invalidations,
+            **await self.backend.stats()
+        }
+
+
+def create_query_cache():
+    """Query cache with the backend of the settings (the Redis client does not connect until first used)"""
+    if settings.query_cache_backend == "redis":
+        backend = RedisCacheBackend(settings.query_cache_redis_url, settings.query_cache_ttl_seconds)
+    else:
+        backend = LRUCacheBackend(settings.query_cache_max_entries, settings.query_cache_ttl_seconds)
+    cache = QueryCache(backend, settings.query_cache_generation_check_seconds)
+    cache.enabled = settings.query_cache_enabled
+    return cache
+
+
+# Created in the application lifespan (open_query_cache), in every worker process;
+# read it as cache.query_cache, not imported by name. Until then cached endpoints are not cached.
+query_cache = None
+
+
+def open_query_cache():
+    global query_cache
+    query_cache = create_query_cache()
+
+
+async def close_query_cache():
+    global query_cache
+    if query_cache is not None:
+        await query_cache.backend.close()
+        query_cache = None
+
+
+def cached_endpoint(endpoint):
+    """
+    Decorator for async FastAPI endpoints: serves the response from query_cache when possible.
+    Only plain path/query parameters are part of the key; injected dependencies are ignored.
+    Exceptions (e.g. 404 HTTPException) are never cached, and NDJSON streaming requests bypass the cache.
+    Headers the endpoint sets on an injected Response are cached too, and replayed on hits.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            params = signature.bind_partial(*args, **kwargs).arguments
+            streaming = any(isinstance(value, Request) and wants_ndjson(value) for value in params.values())
+            if query_cache is None or not query_cache.enabled or streaming:
+                return await func(*args, **kwargs)
+
+            sub_response = next((value for value in params.values() if isinstance(value, Response)), None)
+            if sub_response is None:
+                return await query_cache.get_or_compute(endpoint, params, lambda: func(*args, **kwargs))
+
+            async def compute_with_headers():
+                value = await func(*args, **kwargs)
+                if isinstance(value, Response):
+                    return value
+                return _ResultWithHeaders(value, dict(sub_response.headers))
+
+            result = await query_cache.get_or_compute(endpoint, params, compute_with_headers)
+            if isinstance(result, _ResultWithHeaders):
+                sub_response.headers.update(result.headers)
+                return result.value
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def invalidate_query_cache(mongo_db=None):
+    """
+    Bumps the cache generation so every API process drops its cached responses.
+    Called by the init scripts after (re)loading data; takes a sync pymongo Database,
+    or connects with MONGODB_URI when none is given.
+    """
+    client = None
+    if mongo_db is None:
+        client = MongoClient(settings.mongodb_uri)
+        mongo_db = client.get_default_database()
+    try:
+        meta = mongo_db[CACHE_META_COLLECTION].find_one_and_update(
+            {"_id": CACHE_META_ID},
+            {"$inc": {"generation": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        print(f"Query cache invalidated (generation {meta['generation']}).")
+    except Exception as e:
+        print(f"WARNING: Could not invalidate the query cache: {e}")
+    finally:
+        if client:
+            client.close()
@@ -0,0 +1,23 @@
+import asyncio
+
+
+async def run_concurrently(*stages):
+    """
+    Runs independent query stages (coroutines) concurrently and returns their results in order.
+    As soon as one stage fails, the others are cancelled and the first error is re-raised, so a
+    request costs the latency of its slowest stage instead of the sum of every round trip.
+    Each stage must use its own Neo4j session: sessions are not safe for concurrent use.
+    """
+    tasks = [asyncio.ensure_future(stage) for stage in stages]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        for task in tasks:
+            if task in done and not task.cancelled() and task.exception() is not None:
+                raise task.exception()
+        return [task.result() for task in tasks]
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+        # Let cancelled stages release their sessions/cursors before returning
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,53 @@
+import base64
+import json
+
+from fastapi import HTTPException, Response
+
+
+# Keyset pagination for the list endpoints: the body stays a plain JSON list, and the opaque cursor
+# of the next page (if any) is returned in this header. Pass it back as ?cursor=... to continue.
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+LIMIT_DESCRIPTION = "Maximum number of items per page."
+CURSOR_DESCRIPTION = f"Opaque cursor from the {NEXT_CURSOR_HEADER} header of the previous page."
+
+
+def encode_cursor(position: dict) -> str:
+    """Encodes the sort key of the last item of a page as an opaque, URL-safe string."""
+    raw = json.dumps(position, separators=(",", ":"), sort_keys=True).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor, *keys) -> dict:
+    """
+    Decodes a cursor produced by encode_cursor, checking it carries the given sort keys.
+    Returns a dict with every key set to None when there is no cursor (first page).
+    """
+    if not cursor:
+        return dict.fromkeys(keys)
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(position, dict) or not all(key in position for key in keys):
+            raise ValueError("missing sort keys")
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {str(e)}")
+    return {key: position[key] for key in keys}
+
+
+def split_page(rows, limit, position_of):
+    """
+    Takes up to limit + 1 rows fetched in sort order and returns (page, next_cursor):
+    the extra row only tells that another page exists, and is not returned.
+    """
+    if len(rows) <= limit:
+        return rows, None
+    page = rows[:limit]
+    return page, encode_cursor(position_of(page[-1]))
+
+
+def set_next_cursor(response: Response, next_cursor):
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
@@ -0,0 +1,57 @@
+"""
+Pre-warm step run in the application lifespan, once the clients are created, so a worker accepts
+requests only once it is ready:
+- waits for the PostgreSQL pool to hold its POSTGRES_POOL_MIN_SIZE connections;
+- connects the MongoDB client and the Neo4j driver;
+- primes the Neo4j query plan cache with EXPLAIN of every Cypher query of the routers. The cache
+  belongs to the Neo4j server, so the first worker to start warms it for all of them.
+A failing step is reported and skipped: the API still starts, and the health checks tell what is down.
+"""
+import time
+
+from config import settings
+from db import neo4j_async_client
+from db.mongo_client import connect_mongo_client
+from db.neo4j_async_client import connect_async_driver
+from db import postgres_async_client
+from routers import analytical_queries, parametric_queries
+
+
+NEO4J_QUERIES = [
+    parametric_queries.FORUM_MEMBERSHIPS_QUERY,
+    parametric_queries.KNOWN_PERSON_IDS_QUERY,
+    parametric_queries.COMPANY_FORUM_GROUPS_QUERY,
+    parametric_queries.SECOND_DEGREE_QUERY,
+    parametric_queries.LIKED_POSTS_QUERY,
+    analytical_queries.CITY_TAG_INTERESTS_QUERY,
+    analytical_queries.ORGANISATION_MEMBERS_QUERY,
+    analytical_queries.ACTIVE_MEMBER_INTERESTS_QUERY,
+    analytical_queries.TAGCLASS_FORUMS_PAGE_QUERY,
+]
+
+
+async def prime_neo4j_plans(queries=NEO4J_QUERIES):
+    """EXPLAIN plans a query and caches the plan without running it; returns the number of queries primed"""
+    driver = neo4j_async_client.async_driver
+    driver = getattr(driver, "_driver", driver)  # not traced: these are not request queries
+    async with driver.session(database="neo4j") as session:
+        for query in queries:
+            result = await session.run(f"EXPLAIN {query}")
+            await result.consume()
+    return len(queries)
+
+
+async def prewarm():
+    steps = [
+        ("PostgreSQL pool", lambda: postgres_async_client.postgres_async_pool.wait(timeout=settings.postgres_pool_timeout)),
+        ("MongoDB client", connect_mongo_client),
+        ("Neo4j driver", connect_async_driver),
+        ("Neo4j query plans", prime_neo4j_plans),
+    ]
+    start_time = time.time()
+    for name, step in steps:
+        try:
+            await step()
+        except Exception as e:
+            print(f"WARNING: Pre-warm step '{name}' failed: {e}")
+    print(f"Pre-warm finished in {time.time() - start_time:.2f} seconds.")
@@ -0,0 +1,249 @@
+"""
+Slow query log: the database calls slower than SLOW_QUERY_THRESHOLD_MS, with their plan.
+
+The spans of utils/tracing.py carry the statement of the call (MongoDB command with its filter or
+pipeline, Cypher text and parameters, SQL and parameters). When a span goes over the threshold it is
+added to a ring buffer holding the last SLOW_QUERY_LOG_SIZE entries (GET /admin/slow-queries), and its
+plan is captured in the background, so the request that was slow is not delayed further:
+- MongoDB: the explain command (executionStats) of find, aggregate, count, distinct and write commands;
+- Neo4j: PROFILE of read queries, EXPLAIN of queries that write;
+- PostgreSQL: EXPLAIN (ANALYZE, BUFFERS) of SELECT statements, EXPLAIN of the others, rolled back.
+Capturing the plan runs the query again (except EXPLAIN), so at most SLOW_QUERY_MAX_CAPTURES plans are
+captured at the same time; the entries beyond that keep the statement only.
+
+Unless SLOW_QUERY_RECORD_PARAMETERS is enabled, the values of the parameters (and of the MongoDB filters
+and pipelines) are replaced by a keyed hash, in the statement and in the plan: equal values get the same
+hash within an API process, so they can still be matched, but the values themselves are not stored.
+"""
+import asyncio
+import collections
+import datetime
+import hashlib
+import itertools
+import json
+import os
+import re
+import threading
+
+from bson import json_util
+
+from config import settings
+
+
+# Command fields added by the driver, not part of the query
+_MONGO_DRIVER_FIELDS = {"lsid", "$clusterTime", "$db", "$readPreference", "txnNumber", "signature", "$readConcern"}
+MONGO_EXPLAINABLE_COMMANDS = {"find", "aggregate", "count", "distinct", "update", "delete", "findAndModify"}
+
+_CYPHER_WRITE = re.compile(r"\b(CREATE|MERGE|SET|DELETE|REMOVE|FOREACH)\b|\bIN\s+TRANSACTIONS\b", re.IGNORECASE)
+
+# Fields of the MongoDB commands holding query values; the others (collection, projection, sort...) are kept
+_MONGO_VALUE_FIELDS = {"filter", "query", "pipeline", "updates", "deletes", "documents", "update", "q", "u"}
+# Fields of the MongoDB explain output repeating the command or the parsed filter
+_MONGO_PLAN_VALUE_FIELDS = {"command", "parsedQuery"}
+
+# Per process, so the hashes cannot be matched against a dictionary of values computed elsewhere
+_REDACTION_KEY = os.urandom(16)
+
+
+def _json_safe(value):
+    """BSON types (ObjectId, datetime...) in extended JSON, anything else unknown as a string"""
+    return json.loads(json_util.dumps(value, default=str))
+
+
+def mongo_statement(command):
+    return {key: value for key, value in command.items() if key not in _MONGO_DRIVER_FIELDS}
+
+
+# --- Redaction of the parameter values ---
+def _is_value(value):
+    """Scalars that are query values: not None, booleans or MongoDB field paths ("$field")"""
+    return not (value is None or isinstance(value, (bool, dict, list, tuple))
+                or (isinstance(value, str) and value.startswith("$")))
+
+
+def _hash_value(value):
+    digest = hashlib.blake2b(json_util.dumps(value).encode(), key=_REDACTION_KEY, digest_size=6).hexdigest()
+    return f"<redacted:{digest}>"
+
+
+def redact_values(value):
+    """Replaces every scalar value of a (nested) statement or parameter structure with its hash"""
+    if isinstance(value, dict):
+        return {key: redact_values(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [redact_values(item) for item in value]
+    return _hash_value(value) if _is_value(value) else value
+
+
+def _redact_statement(db, statement):
+    # Cypher and SQL statements receive their values as parameters
+    if db != "mongo" or not isinstance(statement, dict):
+        return statement
+    return {key: redact_values(value) if key in _MONGO_VALUE_FIELDS else value for key, value in statement.items()}
+
+
+def _parameter_values(span):
+    """The scalar values of the parameters of a span (of the value fields of a MongoDB command)"""
+    if span.db == "mongo":
+        source = [value for key, value in (span.statement or {}).items() if key in _MONGO_VALUE_FIELDS]
+    else:
+        source = span.parameters
+    values = []
+
+    def collect(value):
+        if isinstance(value, dict):
+            value = list(value.values())
+        if isinstance(value, (list, tuple)):
+            for item in value:
+                collect(item)
+        elif _is_value(value):
+            values.append(value)
+
+    collect(source)
+    return values
+
+
+def _redact_plan(plan, values):
+    """
+    Hashes the parameter values found in a plan (JSON-safe): in the MongoDB command and parsed filter,
+    and inside the plan strings, e.g. "Index Cond: (name = 'x'::text)" or the index bounds.
+    """
+    literals = {}
+    for value in values:
+        if isinstance(value, str) and value:
+            literals[re.escape(value)] = value
+        elif isinstance(value, (int, float)):
+            literals[rf"(?<![\w.]){re.escape(str(value))}(?![\w.])"] = value
+    pattern = re.compile("|".join(sorted(literals, key=len, reverse=True))) if literals else None
+    by_text = {str(value): value for value in literals.values()}
+
+    def walk(node):
+        if isinstance(node, dict):
+            return {
+                key: (_redact_statement("mongo", item) if key == "command" else redact_values(item))
+                if key in _MONGO_PLAN_VALUE_FIELDS else walk(item)
+                for key, item in node.items()
+            }
+        if isinstance(node, list):
+            return [walk(item) for item in node]
+        if isinstance(node, str) and pattern is not None:
+            return pattern.sub(lambda match: _hash_value(by_text[match.group(0)]), node)
+        return node
+
+    return walk(plan)
+
+
+class SlowQueryLog:
+    """Ring buffer of the slow database calls. Spans are added from the event loop and from Motor's threads."""
+
+    def __init__(self, max_entries):
+        self._entries = collections.deque(maxlen=max_entries)
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._captures = 0
+        self.loop = None  # event loop running the plan captures, set by bind()
+
+    def bind(self, loop):
+        self.loop = loop
+
+    def record(self, span):
+        statement, parameters = span.statement, span.parameters
+        if not settings.slow_query_record_parameters:
+            statement, parameters = _redact_statement(span.db, statement), redact_values(parameters)
+        entry = {
+            "id": next(self._ids),
+            "recordedAt": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "db": span.db,
+            "span": span.name,
+            "endpoint": span._trace.endpoint if span._trace is not None else None,
+            "status": span.status,
+            "durationMs": round(span.duration * 1000, 2),
+            "rows": span.rows,
+            "bytes": span.bytes,
+            "statement": _json_safe(statement),
+            "parameters": _json_safe(parameters),
+            "plan": None,
+            "planError": None,
+        }
+        if not settings.slow_query_capture_plans:
+            capture = False
+        elif self.loop is None:
+            capture = False
+            entry["planError"] = "Not captured: no event loop bound to the slow query log"
+        else:
+            with self._lock:
+                capture = self._captures < settings.slow_query_max_captures
+                if capture:
+                    self._captures += 1
+            if not capture:
+                entry["planError"] = "Not captured: too many plan captures in progress"
+        with self._lock:
+            self._entries.append(entry)
+        if capture:
+            asyncio.run_coroutine_threadsafe(self._capture(entry, span), self.loop)
+        return entry
+
+    async def _capture(self, entry, span):
+        try:
+            capture = PLAN_CAPTURES[span.db]
+            plan = _json_safe(await capture(span))
+            if not settings.slow_query_record_parameters:
+                plan = _redact_plan(plan, _parameter_values(span))
+            entry["plan"] = plan
+        except Exception as e:
+            entry["planError"] = f"{type(e).__name__}: {e}"
+        finally:
+            with self._lock:
+                self._captures -= 1
+
+    def entries(self, limit=None):
+        """Newest first"""
+        with self._lock:
+            entries = list(reversed(self._entries))
+        return entries[:limit] if limit else entries
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+async def _mongo_plan(span):
+    from db.mongo_client import client
+
+    command_name = next(iter(span.statement), None)
+    if command_name not in MONGO_EXPLAINABLE_COMMANDS:
+        raise ValueError(f"{command_name} cannot be explained")
+    # The tracer ignores the explain command, so it is not itself traced
+    return await client[span.target].command({"explain": span.statement, "verbosity": "executionStats"})
+
+
+async def _neo4j_plan(span):
+    from db.neo4j_async_client import async_driver
+
+    driver = getattr(async_driver, "_driver", async_driver)  # the untraced driver
+    prefix = "EXPLAIN" if _CYPHER_WRITE.search(span.statement) else "PROFILE"
+    async with driver.session(database=span.target) as session:
+        result = await session.run(f"{prefix} {span.statement}", span.parameters)
+        summary = await result.consume()
+    return summary.profile if prefix == "PROFILE" else summary.plan
+
+
+async def _postgres_plan(span):
+    from psycopg import AsyncCursor
+    from db import postgres_async_client
+
+    if not isinstance(span.statement, str):
+        raise ValueError("Composed SQL statements are not explained")
+    options = "ANALYZE, BUFFERS, FORMAT JSON" if span.statement.lstrip().upper().startswith(("SELECT", "WITH")) \
+        else "FORMAT JSON"
+    async with postgres_async_client.postgres_async_pool.connection() as conn:
+        async with conn.transaction(force_rollback=True):
+            async with AsyncCursor(conn) as cursor:  # not the traced cursor of the pool
+                await cursor.execute(f"EXPLAIN ({options}) {span.statement}", span.parameters)
+                row = await cursor.fetchone()
+    return next(iter(row.values())) if isinstance(row, dict) else row[0]
+
+
+PLAN_CAPTURES = {"mongo": _mongo_plan, "neo4j": _neo4j_plan, "postgres": _postgres_plan}
+
+slow_query_log = SlowQueryLog(settings.slow_query_log_size)
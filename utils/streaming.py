@@ -0,0 +1,31 @@
+import json
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def wants_ndjson(request: Request) -> bool:
+    """True when the client opted into streaming with 'Accept: application/x-ndjson'."""
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def ndjson_response(items, model, endpoint_name="") -> StreamingResponse:
+    """
+    Streams an async iterable of documents as NDJSON: every item is validated against the
+    response model and written as soon as it is produced, so memory stays bounded by one item
+    (plus the driver batch) and the first line is sent without waiting for the whole result.
+    An error in the middle of the stream ends it with a final {"detail": ...} line, since the
+    status code has already been sent.
+    """
+    async def body():
+        try:
+            async for item in items:
+                yield model.model_validate(item).model_dump_json(by_alias=True) + "\n"
+        except Exception as e:
+            print(f"Error while streaming {endpoint_name}: {type(e).__name__} - {str(e)}")
+            yield json.dumps({"detail": f"Stream interrupted: {str(e)}"}) + "\n"
+
+    return StreamingResponse(body(), media_type=NDJSON_MEDIA_TYPE)
@@ -0,0 +1,453 @@
+"""
+Per-call latency tracing of the three databases.
+
+Every database call made while serving a request is recorded as a named span (duration, rows
+returned and, where the driver exposes them, bytes returned), e.g. "mongo.post.aggregate",
+"postgres.select.organization" or "neo4j.Person.KNOWS". Spans are collected without touching the
+routers, at the driver level:
+- MongoDB: a pymongo command listener registered on the Motor client (MongoCommandTracer);
+- PostgreSQL: the cursor class of the async pool (TracedAsyncCursor);
+- Neo4j: a wrapper of the async driver whose sessions and transactions trace run() (TracedAsyncDriver).
+
+Spans slower than SLOW_QUERY_THRESHOLD_MS also go to the slow query log (utils/slow_queries.py).
+The spans feed Prometheus-style histograms, exported in the text exposition format by render_metrics()
+(GET /metrics), and the spans of a request can be returned in a Server-Timing header
+(SERVER_TIMING_ENABLED=true). Metrics are kept per API process.
+"""
+import bisect
+import contextvars
+import re
+import threading
+import time
+
+import bson
+from psycopg import AsyncCursor
+from pymongo import monitoring
+
+from config import settings
+from utils.slow_queries import mongo_statement, slow_query_log
+
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+ROWS_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000, 1000000)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+class Histogram:
+    """Cumulative histogram with labels, in the Prometheus sense. Safe to update from any thread."""
+
+    def __init__(self, name, documentation, label_names, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * len(self.buckets) + [0.0, 0]
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((labels, list(values)) for labels, values in self._series.items())
+        for label_values, values in series:
+            labels = ",".join(f'{name}="{_escape_label(value)}"'
+                              for name, value in zip(self.label_names, label_values))
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {values[-1]}')
+            lines.append(f"{self.name}_sum{{{labels}}} {values[-2]}")
+            lines.append(f"{self.name}_count{{{labels}}} {values[-1]}")
+        return "\n".join(lines)
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+class CallbackMetric:
+    """Gauge or counter read when the metrics are rendered: collect() returns [(label values, value), ...]."""
+
+    def __init__(self, name, documentation, metric_type, label_names, collect):
+        self.name = name
+        self.documentation = documentation
+        self.metric_type = metric_type
+        self.label_names = tuple(label_names)
+        self.collect = collect
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        for label_values, value in self.collect():
+            labels = ",".join(f'{name}="{_escape_label(label)}"'
+                              for name, label in zip(self.label_names, label_values))
+            lines.append(f"{self.name}{{{labels}}} {value}")
+        return "\n".join(lines)
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+SPAN_LABELS = ("db", "span", "endpoint", "status")
+SPAN_DURATION = Histogram("maadb_db_span_duration_seconds", "Duration of database calls.",
+                          SPAN_LABELS, DURATION_BUCKETS)
+SPAN_ROWS = Histogram("maadb_db_span_rows", "Rows (documents, records) returned by database calls.",
+                      SPAN_LABELS, ROWS_BUCKETS)
+SPAN_BYTES = Histogram("maadb_db_span_bytes", "Bytes returned by database calls (MongoDB and PostgreSQL).",
+                       SPAN_LABELS, BYTES_BUCKETS)
+REQUEST_DURATION = Histogram("maadb_http_request_duration_seconds", "Duration of HTTP requests.",
+                             ("method", "endpoint", "status_code"), DURATION_BUCKETS)
+
+# Other modules append their metrics (e.g. db/pools.py)
+METRICS = [REQUEST_DURATION, SPAN_DURATION, SPAN_ROWS, SPAN_BYTES]
+
+
+def render_metrics():
+    """All the histograms in the Prometheus text exposition format (version 0.0.4)"""
+    return "\n".join(metric.render() for metric in METRICS) + "\n"
+
+
+# --- Spans ---
+# Endpoint label of the requests that match no route: the raw path would give a series per URL
+UNMATCHED_ENDPOINT = "<unmatched>"
+
+
+class RequestTrace:
+    """Spans of one HTTP request. The endpoint is the route template, known once the request is routed."""
+
+    def __init__(self, scope=None):
+        self.scope = scope or {}
+        self.spans = []  # appended from the Motor executor threads too (list.append is atomic)
+
+    @property
+    def endpoint(self):
+        return getattr(self.scope.get("route"), "path", UNMATCHED_ENDPOINT)
+
+
+_current_trace = contextvars.ContextVar("maadb_request_trace", default=None)
+
+
+class Span:
+    """
+    A database call. Started when created, recorded once by finish(). The statement, its parameters and
+    its target (MongoDB or Neo4j database) are kept for the slow query log.
+    """
+
+    __slots__ = ("db", "name", "statement", "parameters", "target", "rows", "bytes", "status", "duration",
+                 "_start", "_trace")
+
+    def __init__(self, db, name, statement=None, parameters=None, target=None):
+        self.db = db
+        self.name = name
+        self.statement = statement
+        self.parameters = parameters
+        self.target = target
+        self.rows = 0
+        self.bytes = None
+        self.status = "ok"
+        self.duration = None
+        self._trace = _current_trace.get()
+        self._start = time.perf_counter()
+
+    def finish(self, error=False):
+        if self.duration is not None:
+            return
+        self.duration = time.perf_counter() - self._start
+        if error:
+            self.status = "error"
+        record_span(self)
+
+
+def record_span(span):
+    if span._trace is not None:
+        span._trace.spans.append(span)
+    labels = (span.db, span.name, span._trace.endpoint if span._trace is not None else "", span.status)
+    SPAN_DURATION.observe(span.duration, *labels)
+    SPAN_ROWS.observe(span.rows, *labels)
+    if span.bytes is not None:
+        SPAN_BYTES.observe(span.bytes, *labels)
+    if settings.slow_query_log_enabled and span.duration * 1000 >= settings.slow_query_threshold_ms:
+        slow_query_log.record(span)
+
+
+# --- HTTP middleware ---
+_SERVER_TIMING_NAME = re.compile(r"[^A-Za-z0-9_\-]")
+
+
+def server_timing_header(trace, total_seconds):
+    """Spans grouped by name, e.g. 'mongo_post_aggregate;dur=12.3;desc="2 calls, 40 rows", app;dur=15.0'"""
+    grouped = {}
+    for span in list(trace.spans):
+        entry = grouped.setdefault(span.name, [0.0, 0, 0])
+        entry[0] += span.duration
+        entry[1] += 1
+        entry[2] += span.rows
+    metrics = [
+        f'{_SERVER_TIMING_NAME.sub("_", name)};dur={duration * 1000:.1f};desc="{calls} call(s), {rows} row(s)"'
+        for name, (duration, calls, rows) in grouped.items()
+    ]
+    metrics.append(f"app;dur={total_seconds * 1000:.1f}")
+    return ", ".join(metrics)
+
+
+async def trace_request(request, call_next):
+    """HTTP middleware: collects the spans of the request and records its duration"""
+    if not settings.tracing_enabled:
+        return await call_next(request)
+    trace = RequestTrace(request.scope)
+    token = _current_trace.set(trace)
+    start = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        if settings.server_timing_enabled:
+            response.headers["Server-Timing"] = server_timing_header(trace, time.perf_counter() - start)
+        return response
+    finally:
+        REQUEST_DURATION.observe(time.perf_counter() - start, request.method, trace.endpoint, str(status_code))
+        _current_trace.reset(token)
+
+
+# --- MongoDB ---
+class MongoCommandTracer(monitoring.CommandListener):
+    """
+    Records a span per MongoDB command. Motor runs the commands in executor threads with a copy of
+    the caller's context, so the listener sees the request trace.
+    """
+
+    # explain: sent by the slow query log to capture plans
+    IGNORED_COMMANDS = {"hello", "ismaster", "isMaster", "saslStart", "saslContinue", "endSessions", "killCursors",
+                        "explain"}
+
+    def __init__(self):
+        self._commands = {}  # (connection, request id) -> started event, between started and succeeded
+
+    def started(self, event):
+        if event.command_name not in self.IGNORED_COMMANDS:
+            self._commands[(event.connection_id, event.request_id)] = event
+
+    def succeeded(self, event):
+        self._record(event, event.reply)
+
+    def failed(self, event):
+        self._record(event, None)
+
+    def _record(self, event, reply):
+        started = self._commands.pop((event.connection_id, event.request_id), None)
+        if started is None:
+            return
+        command = started.command
+        collection = command.get("collection") if event.command_name == "getMore" else command.get(event.command_name)
+        name = f"mongo.{collection}.{event.command_name}" if isinstance(collection, str) else f"mongo.{event.command_name}"
+        span = Span("mongo", name, mongo_statement(command), target=started.database_name)
+        span.duration = event.duration_micros / 1e6
+        if reply is None:
+            span.status = "error"
+        else:
+            cursor = reply.get("cursor")
+            if isinstance(cursor, dict):
+                span.rows = len(cursor.get("firstBatch", cursor.get("nextBatch", ())))
+            else:
+                span.rows = reply.get("n", 0) if isinstance(reply.get("n"), int) else 0
+            span.bytes = len(bson.encode(reply))
+        record_span(span)
+
+
+# --- PostgreSQL ---
+_SQL_TABLE = re.compile(r'\b(?:FROM|INTO|UPDATE)\s+"?(\w+)', re.IGNORECASE)
+
+
+def postgres_span_name(query):
+    """e.g. 'postgres.select.organization' (first table of the statement)"""
+    if not isinstance(query, str):
+        return "postgres.query"
+    verb = query.split(None, 1)[0].lower() if query.strip() else "query"
+    table = _SQL_TABLE.search(query)
+    return f"postgres.{verb}.{table.group(1).lower()}" if table else f"postgres.{verb}"
+
+
+def _pgresult_bytes(pgresult):
+    if pgresult is None:
+        return None
+    # Size of the values as received from the server (NULLs count 0)
+    return sum(len(pgresult.get_value(row, column) or b"")
+               for row in range(pgresult.ntuples) for column in range(pgresult.nfields))
+
+
+class TracedAsyncCursor(AsyncCursor):
+    """Cursor of the async pool: every execute() is a span (client-side cursors fetch the whole result)."""
+
+    async def execute(self, query, params=None, **kwargs):
+        span = Span("postgres", postgres_span_name(query), query, params)
+        try:
+            await super().execute(query, params, **kwargs)
+        except BaseException:
+            span.finish(error=True)
+            raise
+        span.rows = max(self.rowcount, 0)
+        span.bytes = _pgresult_bytes(self.pgresult)
+        span.finish()
+        return self
+
+
+# --- Neo4j ---
+_CYPHER_LABEL = re.compile(r"\(\s*\w*\s*:\s*`?(\w+)")
+_CYPHER_RELATIONSHIP = re.compile(r"\[\s*\w*\s*:\s*([\w|`]+)")
+
+
+def neo4j_span_name(query):
+    """e.g. 'neo4j.Person.KNOWS' (first node label and relationship type of the query)"""
+    if not isinstance(query, str):
+        query = getattr(query, "text", "")
+    parts = [match.group(1).replace("`", "") for match in (_CYPHER_LABEL.search(query),
+                                                           _CYPHER_RELATIONSHIP.search(query)) if match]
+    return ".".join(["neo4j", *parts]) if parts else "neo4j.query"
+
+
+class _TracedResult:
+    """
+    Wraps an AsyncResult: the span lasts from run() until the records are consumed, which is when
+    Neo4j has finished streaming them.
+    """
+
+    def __init__(self, result, span):
+        self._result = result
+        self._span = span
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        try:
+            async for record in self._result:
+                self._span.rows += 1
+                yield record
+        except GeneratorExit:
+            # The caller stopped iterating early (e.g. break)
+            self._span.finish()
+            raise
+        except BaseException:
+            self._span.finish(error=True)
+            raise
+        self._span.finish()
+
+    async def _finish_with(self, awaitable, rows):
+        try:
+            value = await awaitable
+        except BaseException:
+            self._span.finish(error=True)
+            raise
+        self._span.rows += rows(value)
+        self._span.finish()
+        return value
+
+    async def data(self, *keys):
+        return await self._finish_with(self._result.data(*keys), len)
+
+    async def values(self, *keys):
+        return await self._finish_with(self._result.values(*keys), len)
+
+    async def value(self, key=0, default=None):
+        return await self._finish_with(self._result.value(key, default), len)
+
+    async def single(self, strict=False):
+        return await self._finish_with(self._result.single(strict), lambda record: int(record is not None))
+
+    async def consume(self):
+        return await self._finish_with(self._result.consume(), lambda summary: 0)
+
+    async def fetch(self, n):
+        records = await self._result.fetch(n)
+        self._span.rows += len(records)
+        return records
+
+    def __getattr__(self, name):
+        return getattr(self._result, name)
+
+
+class _TracedRunner:
+    """Wraps an AsyncSession or AsyncManagedTransaction so that run() returns a traced result."""
+
+    def __init__(self, runner, database=None):
+        self._runner = runner
+        self._database = database
+        self._spans = []
+
+    async def run(self, query, parameters=None, **kwargs):
+        span = Span("neo4j", neo4j_span_name(query), getattr(query, "text", query),
+                    {**(parameters or {}), **kwargs}, self._database)
+        try:
+            result = await self._runner.run(query, parameters, **kwargs)
+        except BaseException:
+            span.finish(error=True)
+            raise
+        self._spans.append(span)
+        return _TracedResult(result, span)
+
+    def _finish_open_spans(self):
+        # Results left unconsumed: their records were discarded when the session or transaction ended
+        for span in self._spans:
+            span.finish()
+        self._spans.clear()
+
+    def __getattr__(self, name):
+        return getattr(self._runner, name)
+
+
+class _TracedSession(_TracedRunner):
+
+    async def __aenter__(self):
+        await self._runner.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        try:
+            return await self._runner.__aexit__(*exc_info)
+        finally:
+            self._finish_open_spans()
+
+    async def close(self):
+        try:
+            await self._runner.close()
+        finally:
+            self._finish_open_spans()
+
+    async def _execute(self, execute, transaction_function, args, kwargs):
+        async def traced_function(tx, *function_args, **function_kwargs):
+            traced_tx = _TracedRunner(tx, self._database)
+            try:
+                return await transaction_function(traced_tx, *function_args, **function_kwargs)
+            finally:
+                traced_tx._finish_open_spans()
+        return await execute(traced_function, *args, **kwargs)
+
+    async def execute_read(self, transaction_function, *args, **kwargs):
+        return await self._execute(self._runner.execute_read, transaction_function, args, kwargs)
+
+    async def execute_write(self, transaction_function, *args, **kwargs):
+        return await self._execute(self._runner.execute_write, transaction_function, args, kwargs)
+
+
+class TracedAsyncDriver:
+    """Wraps an AsyncDriver: its sessions trace every query. Everything else is delegated."""
+
+    def __init__(self, driver):
+        self._driver = driver
+
+    def session(self, **config):
+        return _TracedSession(self._driver.session(**config), config.get("database"))
+
+    def __getattr__(self, name):
+        return getattr(self._driver, name)